@@ -0,0 +1,102 @@
+# Cache semantic pentru răspunsurile recomandărilor
+import os
+import copy
+import math
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from backend import telemetry
+
+# Config din .env
+ENABLED = os.getenv("ANSWER_CACHE", "false").lower() == "true"
+SIMILARITY_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL", "900"))
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+
+
+def _unit(vec: Iterable[float]) -> List[float]:
+    v = [float(x) for x in vec]
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return [x / norm for x in v]
+
+
+def _dot(a: List[float], b: List[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+class SemanticAnswerCache:
+    """
+    Reutilizează un rezultat {answer, candidates, full_summary, recommended_title}
+    dacă o întrebare nouă are embedding-ul la similaritate cosinus >= threshold
+    față de una deja răspunsă ȘI setul de candidați RAG este același.
+    Evicție: TTL + LRU (max_entries).
+    """
+
+    def __init__(
+        self,
+        threshold: float = SIMILARITY_THRESHOLD,
+        ttl_seconds: float = TTL_SECONDS,
+        max_entries: int = MAX_ENTRIES,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[List[float], FrozenSet[str], float, Dict[str, Any]]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def candidate_key(candidates: List[Dict[str, Any]]) -> FrozenSet[str]:
+        return frozenset(c["id"] for c in candidates)
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created > self.ttl_seconds
+
+    def get(self, embedding: Iterable[float], candidates: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        q = _unit(embedding)
+        key = self.candidate_key(candidates)
+        now = time.time()
+        with self._lock:
+            best_id, best_sim = None, self.threshold
+            for entry_id, (vec, cand_key, created, _) in list(self._entries.items()):
+                if self._expired(created, now):
+                    del self._entries[entry_id]
+                    continue
+                if cand_key != key:
+                    continue
+                sim = _dot(q, vec)
+                if sim >= best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None:
+                self.misses += 1
+                telemetry.count("cache_requests", cache="answer", result="miss")
+                return None
+            self.hits += 1
+            telemetry.count("cache_requests", cache="answer", result="hit")
+            self._entries.move_to_end(best_id)
+            return copy.deepcopy(self._entries[best_id][3])
+
+    def put(self, embedding: Iterable[float], candidates: List[Dict[str, Any]], result: Dict[str, Any]) -> None:
+        entry = (_unit(embedding), self.candidate_key(candidates), time.time(), copy.deepcopy(result))
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "entries": len(self._entries),
+        }
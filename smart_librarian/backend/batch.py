@@ -0,0 +1,183 @@
+# Rulare în lot: întrebări din JSONL -> recomandări în JSONL (reluabilă după oprire)
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from backend import scheduler
+from backend.filters import moderate_text
+from backend.rag_retriever import embed_queries
+from backend.retrievers import get_retriever
+from backend.openai_chat import recommend_from_candidates, path_stats
+
+# Config din .env
+# câte întrebări trec împreună prin embeddings + interogarea vector store-ului
+CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "256"))
+# câte completări de chat rulează simultan (limita reală e rate limit-ul API)
+CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+
+
+def read_queries(path: str) -> Iterator[Dict[str, str]]:
+    """
+    Linii JSONL de forma {"id": ..., "query": ...} (sau doar un string JSON).
+    Fără "id", se folosește numărul liniei.
+    """
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"query": item}
+            if not item.get("query"):
+                raise ValueError(f"{path}:{n}: lipsește câmpul 'query'")
+            yield {"id": str(item.get("id", n)), "query": item["query"]}
+
+
+def completed_ids(path: str) -> Set[str]:
+    """
+    Id-urile deja rezolvate de o rulare anterioară (cele cu "error" se reiau;
+    pentru un id reluat, ultima linie din fișier e cea valabilă).
+    O ultimă linie neterminată (proces oprit în timpul scrierii) e tăiată din fișier.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        good_end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            good_end += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if "error" not in record:
+                done.add(str(record["id"]))
+        f.truncate(good_end)
+    return done
+
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _answer(query: str, candidates: List[Dict[str, Any]], mode: Optional[str], moderate: bool) -> Dict[str, Any]:
+    if moderate:
+        blocked, msg, _raw = moderate_text(query)
+        if blocked:
+            return {"blocked": True, "message": msg}
+    return {"result": recommend_from_candidates(query, candidates, mode)}
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    top_k: int = 3,
+    mode: Optional[str] = None,
+    moderate: bool = True,
+    concurrency: int = CONCURRENCY,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Pentru fiecare bloc de `chunk_size` întrebări:
+      1) embeddings: un singur request pentru toate (cele din cache sunt sărite)
+      2) top-k: o singură interogare multi-query în vector store
+      3) moderare + chat: în pool-ul de `concurrency` thread-uri
+    Blocul următor e pregătit cât timp rulează chat-urile celui curent; numărul de
+    întrebări în zbor e limitat, deci memoria nu crește cu mărimea fișierului.
+    Fiecare rezultat e scris (și flush-uit) imediat, așa că o rulare repornită
+    continuă de unde a rămas.
+    """
+    done = completed_ids(output_path)
+    stats = {"answered": 0, "blocked": 0, "errors": 0, "skipped": 0}
+    lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(concurrency * 2)
+    started = time.perf_counter()
+
+    def pending() -> Iterator[Dict[str, str]]:
+        for item in read_queries(input_path):
+            if item["id"] in done:
+                stats["skipped"] += 1
+                continue
+            yield item
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+
+        def write(record: Dict[str, Any]) -> None:
+            with lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if "error" in record:
+                    stats["errors"] += 1
+                elif record.get("blocked"):
+                    stats["blocked"] += 1
+                else:
+                    stats["answered"] += 1
+
+        def work(item: Dict[str, str], candidates: List[Dict[str, Any]]) -> None:
+            try:
+                with scheduler.priority("batch"):
+                    record = {**item, **_answer(item["query"], candidates, mode, moderate)}
+            except Exception as e:
+                record = {**item, "error": f"{type(e).__name__}: {e}"}
+            finally:
+                in_flight.release()
+            write(record)
+
+        for chunk in _batched(pending(), chunk_size):
+            try:
+                with scheduler.priority("batch"):
+                    embeddings = embed_queries([item["query"] for item in chunk])
+                results = get_retriever().query(embeddings, top_k)
+            except Exception as e:
+                for item in chunk:
+                    write({**item, "error": f"{type(e).__name__}: {e}"})
+                continue
+            for item, candidates in zip(chunk, results):
+                in_flight.acquire()
+                pool.submit(work, item, candidates)
+
+    elapsed = time.perf_counter() - started
+    processed = stats["answered"] + stats["blocked"] + stats["errors"]
+    stats["seconds"] = round(elapsed, 2)
+    stats["queries_per_minute"] = round(processed * 60 / elapsed, 1) if elapsed else 0.0
+    stats["paths"] = path_stats()
+    stats["scheduler"] = scheduler.stats()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recomandări în lot: întrebări JSONL -> rezultate JSONL.")
+    parser.add_argument("input", help="fișier JSONL cu {\"id\", \"query\"} pe fiecare linie")
+    parser.add_argument("output", help="fișier JSONL de ieșire (reluat dacă există deja)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--mode", choices=["two_step", "single"], default=None)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--no-moderation", action="store_true", help="sare peste moderare (întrebări deja verificate)")
+    args = parser.parse_args()
+
+    summary = run_batch(
+        args.input,
+        args.output,
+        top_k=args.top_k,
+        mode=args.mode,
+        moderate=not args.no_moderation,
+        concurrency=args.concurrency,
+        chunk_size=args.chunk_size,
+    )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
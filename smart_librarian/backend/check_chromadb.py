@@ -1,13 +1,15 @@
 # Test records chromadb
-import chromadb
+from backend import shards
+from backend.clients import get_collection
 
-# Initializeaza clientul cu acelasi path ca la populare
-client = chromadb.PersistentClient(path="chroma_db")
-collection = client.get_or_create_collection("books")
+# Acelasi client/colectie ca la populare (CHROMA_PATH din .env); cu SHARD_KEY, fiecare shard
+for name in shards.shard_names(refresh=True):
+    collection = get_collection(name)
 
-# Obtine toate documentele (maxim 100)
-results = collection.get(limit=100)
+    # Obtine toate documentele (maxim 100)
+    results = collection.get(limit=100)
 
-print(f"Sunt {len(results['ids'])} documente în ChromaDB.\n")
-for doc_id, meta, doc in zip(results['ids'], results['metadatas'], results['documents']):
-    print(f"ID: {doc_id}\nTitlu: {meta['title']}\nRezumat: {doc}\n{'-'*40}")
+    print(f"Sunt {len(results['ids'])} documente în {name}.\n")
+    for doc_id, meta, doc in zip(results['ids'], results['metadatas'], results['documents']):
+        extra = ", ".join(f"{k}={v}" for k, v in meta.items() if k not in ("title", "content_hash"))
+        print(f"ID: {doc_id}\nTitlu: {meta['title']}" + (f"\nMetadate: {extra}" if extra else "") + f"\nRezumat: {doc}\n{'-'*40}")
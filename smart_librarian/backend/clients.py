@@ -0,0 +1,154 @@
+# Registru comun de clienți (OpenAI, ChromaDB), creați leneș la prima folosire
+import os
+import asyncio
+import threading
+import importlib.util
+import weakref
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+from backend import scheduler, telemetry
+
+# .env se încarcă o singură dată per proces, la primul import al registrului
+load_dotenv()
+
+# Config din .env
+CHROMA_PATH = os.getenv("CHROMA_PATH", "chroma_db")
+COLLECTION_NAME = os.getenv("CHROMA_COLLECTION", "books")
+EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
+# dimensiunea cerută modelului (text-embedding-3-*: orice valoare până la cea nativă); 0 = nativă.
+# Colecția Chroma are o dimensiune fixă: după schimbare, o colecție nouă (CHROMA_COLLECTION)
+EMBED_DIMENSIONS = int(os.getenv("EMBED_DIMENSIONS", "0")) or None
+
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+# "auto" = HTTP/2 doar dacă pachetul h2 e instalat
+HTTP2 = os.getenv("OPENAI_HTTP2", "auto").lower()
+
+_lock = threading.Lock()
+_openai: Optional[Any] = None
+_async_openai: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+_embedding_fn: Optional[Any] = None
+_chroma: Optional[Any] = None
+_collections: Dict[str, Any] = {}
+
+
+def _http2_enabled() -> bool:
+    if HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return HTTP2 == "true"
+
+
+def _http_options(is_async: bool = False) -> Dict[str, Any]:
+    import httpx
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    # toate cererile trec prin planificatorul comun (cote per endpoint, priorități, reîncercări)
+    if is_async:
+        transport = httpx.AsyncHTTPTransport(limits=limits, http2=_http2_enabled())
+        if scheduler.ENABLED:
+            transport = scheduler.AsyncScheduledTransport(transport)
+    else:
+        transport = httpx.HTTPTransport(limits=limits, http2=_http2_enabled())
+        if scheduler.ENABLED:
+            transport = scheduler.ScheduledTransport(transport)
+    # hook-ul rulează și cu telemetria oprită (o verificare de bool), ca TELEMETRY
+    # să poată fi pornită la runtime fără a recrea clienții
+    hook = telemetry.ahttp_response_hook if is_async else telemetry.http_response_hook
+    return dict(
+        transport=transport,
+        event_hooks={"response": [hook]},
+        timeout=httpx.Timeout(TIMEOUT, connect=10.0),
+    )
+
+
+def _max_retries() -> int:
+    # cu planificatorul activ, reîncercările se fac o singură dată, în transport
+    return 0 if scheduler.ENABLED else 2
+
+
+def get_openai_client():
+    """Clientul OpenAI sincron, unic per proces, cu pool de conexiuni keep-alive."""
+    global _openai
+    if _openai is None:
+        with _lock:
+            if _openai is None:
+                import httpx
+                from openai import OpenAI
+                _openai = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    max_retries=_max_retries(),
+                    http_client=httpx.Client(**_http_options()),
+                )
+    return _openai
+
+
+def get_async_openai_client():
+    """
+    Clientul AsyncOpenAI pentru event loop-ul curent (conexiunile httpx
+    async sunt legate de loop, deci păstrăm câte unul per loop).
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_openai.get(loop)
+    if client is None:
+        with _lock:
+            client = _async_openai.get(loop)
+            if client is None:
+                import httpx
+                from openai import AsyncOpenAI
+                client = AsyncOpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    max_retries=_max_retries(),
+                    http_client=httpx.AsyncClient(**_http_options(is_async=True)),
+                )
+                _async_openai[loop] = client
+    return client
+
+
+def get_embedding_function():
+    """Embedding function Chroma (OpenAI), folosită la ingestie și la întrebări."""
+    global _embedding_fn
+    if _embedding_fn is None:
+        client = get_openai_client()
+        with _lock:
+            if _embedding_fn is None:
+                from chromadb.utils import embedding_functions
+                embedding_fn = embedding_functions.OpenAIEmbeddingFunction(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    model_name=EMBED_MODEL,
+                    dimensions=EMBED_DIMENSIONS,
+                )
+                # același client (pool, planificator, telemetrie) și pentru embeddings-urile Chroma
+                embedding_fn.client = client
+                _embedding_fn = embedding_fn
+    return _embedding_fn
+
+
+def get_chroma_client():
+    """Un singur PersistentClient per proces."""
+    global _chroma
+    if _chroma is None:
+        with _lock:
+            if _chroma is None:
+                import chromadb
+                _chroma = chromadb.PersistentClient(path=CHROMA_PATH)
+    return _chroma
+
+
+def get_collection(name: str = COLLECTION_NAME):
+    """Handle-ul colecției (creată la nevoie), reutilizat în tot procesul."""
+    collection = _collections.get(name)
+    if collection is None:
+        chroma = get_chroma_client()
+        ef = get_embedding_function()
+        with _lock:
+            collection = _collections.get(name)
+            if collection is None:
+                collection = chroma.get_or_create_collection(name, embedding_function=ef)
+                _collections[name] = collection
+    return collection
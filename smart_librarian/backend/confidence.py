@@ -0,0 +1,80 @@
+# Fast path de încredere: când primul candidat e evident, răspunsul se compune fără LLM
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from backend import telemetry
+from backend.text_norm import tokenize
+from tools.get_summary import get_summary_by_title, SUMMARY_NOT_FOUND
+
+# Config din .env (praguri de ajustat cu python -m bench.tune_confidence)
+ENABLED = os.getenv("CONFIDENCE_GATE", "false").lower() == "true"
+# distanța maximă (L2² pe embeddings normalizate) a primului candidat
+MAX_DISTANCE = float(os.getenv("CONFIDENCE_MAX_DISTANCE", "0.6"))
+# cât de departe trebuie să fie al doilea candidat față de primul
+MIN_MARGIN = float(os.getenv("CONFIDENCE_MIN_MARGIN", "0.25"))
+
+_THEMES = re.compile(r"\s*Tematici:\s*(.+?)\.?\s*$")
+
+
+def passes(candidates: List[Dict[str, Any]], max_distance: Optional[float] = None,
+           min_margin: Optional[float] = None) -> bool:
+    """
+    True dacă primul candidat e destul de aproape de întrebare și destul de
+    departe de al doilea. Scorurile trebuie să fie distanțe (căutarea vectorială).
+    """
+    max_distance = MAX_DISTANCE if max_distance is None else max_distance
+    min_margin = MIN_MARGIN if min_margin is None else min_margin
+    if not candidates:
+        return False
+    top = candidates[0]["score"]
+    if top > max_distance:
+        return False
+    return len(candidates) < 2 or candidates[1]["score"] - top >= min_margin
+
+
+def _split_themes(summary: str):
+    """„… Tematici: a, b, c.” -> (textul fără tematici, [a, b, c])."""
+    m = _THEMES.search(summary)
+    if not m:
+        return summary.strip(), []
+    return summary[:m.start()].strip(), [t.strip() for t in m.group(1).split(",") if t.strip()]
+
+
+def justification(user_query: str, book: Dict[str, Any]) -> str:
+    """Argumentarea șablon: rezumatul scurt + temele cărții care apar și în întrebare."""
+    text, themes = _split_themes(book["summary"])
+    query_words = set(tokenize(user_query))
+    matched = [t for t in themes if query_words & set(tokenize(t))]
+    answer = f"Îți recomand „{book['title']}”. {text}"
+    if matched:
+        answer += f" Se potrivește cu ce cauți prin temele: {', '.join(matched)}."
+    elif themes:
+        answer += f" Temele principale: {', '.join(themes)}."
+    return answer
+
+
+def fast_path_result(user_query: str, candidates: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Rezultatul complet (aceleași chei ca recommend_with_summary) dacă pragurile
+    sunt trecute, altfel None. Nu face niciun apel de rețea.
+    """
+    if not ENABLED:
+        return None
+    ok = passes(candidates)
+    telemetry.count("confidence_gate", result="pass" if ok else "fail")
+    if not ok:
+        return None
+    book = candidates[0]
+    full_summary = get_summary_by_title(book["title"])
+    if full_summary == SUMMARY_NOT_FOUND:
+        full_summary = None
+    answer = justification(user_query, book)
+    if full_summary:
+        answer += f"\n\n**Rezumat complet — {book['title']}:**\n{full_summary}"
+    return {
+        "answer": answer,
+        "candidates": candidates,
+        "full_summary": full_summary,
+        "recommended_title": book["title"],
+    }
@@ -0,0 +1,237 @@
+# Contextul pentru LLM: candidați diversificați (MMR), în limita unui buget de tokeni
+import os
+import re
+import math
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend import telemetry
+from backend.retrievers import get_retriever
+from backend.vector_store import content_hash
+
+# Config din .env
+# bugetul (tokeni) pentru lista de candidați din prompt; 0 = fără limită
+TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "700"))
+# MMR: 1.0 = doar relevanța (ordinea din retriever), 0.0 = doar diversitatea
+MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+# candidații ajung în prompt în ordinea MMR; implicit rămân în ordinea retriever-ului
+# (aproape-duplicatele sunt eliminate oricum)
+MMR_REORDER = os.getenv("CONTEXT_MMR_REORDER", "false").lower() == "true"
+# similaritate cosinus peste care un candidat e considerat duplicat al unuia deja ales
+DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.95"))
+# sub atâția tokeni de rezumat, un candidat nu mai merită inclus
+MIN_SUMMARY_TOKENS = int(os.getenv("CONTEXT_MIN_SUMMARY_TOKENS", "24"))
+# encoding-ul tiktoken al modelelor gpt-4o*
+TOKEN_ENCODING = os.getenv("CONTEXT_TOKEN_ENCODING", "o200k_base")
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+_encoding: Any = None
+_encoding_lock = threading.Lock()
+
+
+def _tiktoken():
+    """Encoder-ul tiktoken, dacă pachetul e instalat (altfel False -> estimare)."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception:
+                    _encoding = False
+    return _encoding
+
+
+def _piece_tokens(piece: str) -> int:
+    # cuvintele scurte sunt de regulă un token; cele lungi (și cele cu diacritice) se sparg
+    return max(1, math.ceil(len(piece) / 4))
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Tokenii unui text: exact cu tiktoken, altfel o estimare pe cuvinte (fără rețea)."""
+    enc = _tiktoken()
+    if enc:
+        return len(enc.encode(text))
+    return sum(_piece_tokens(p) for p in _PIECE.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Primele `max_tokens` tokeni din text, tăiat la final de cuvânt, cu „…” dacă s-a scurtat."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    enc = _tiktoken()
+    if enc:
+        cut = enc.decode(enc.encode(text)[:max_tokens - 1])
+    else:
+        used, end = 0, 0
+        for m in _PIECE.finditer(text):
+            used += _piece_tokens(m.group())
+            if used > max_tokens - 1:
+                break
+            end = m.end()
+        cut = text[:end]
+    # nu lăsăm un cuvânt tăiat la jumătate
+    cut = cut.rsplit(" ", 1)[0] if " " in cut.strip() else cut
+    return cut.rstrip(" ,;:—-") + "…"
+
+
+class Context(NamedTuple):
+    text: str
+    candidates: List[Dict[str, Any]]  # cei incluși, în ordinea din prompt
+    tokens: int
+    duplicates: int                   # eliminați ca aproape identici
+    truncated: int                    # rezumate scurtate pentru buget
+    dropped: int                      # eliminați pentru că nu mai încăpeau
+
+
+# cheia include hash-ul conținutului: o carte re-indexată (rezumat schimbat) nu reia vectorul vechi
+_vectors: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+_vectors_lock = threading.Lock()
+_VECTORS_MAX = 4096
+
+
+def _vector_key(candidate: Dict[str, Any]) -> Tuple[str, str]:
+    return candidate["id"], content_hash(candidate)
+
+
+def _candidate_vectors(candidates: Sequence[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """
+    Embedding-urile stocate ale candidaților (normalizate), din vector store
+    (include=["embeddings"]) și ținute apoi în memorie, per (id, hash-ul titlului și
+    rezumatului): cât timp conținutul cărții e același, și embedding-ul ei e același.
+    """
+    keys = [_vector_key(c) for c in candidates]
+    with _vectors_lock:
+        missing = [k for k in keys if k not in _vectors]
+    if missing:
+        try:
+            fetched = get_retriever().get_embeddings([doc_id for doc_id, _ in missing])
+        except Exception:
+            return None
+        with _vectors_lock:
+            for key, vec in zip(missing, fetched):
+                if vec is None:
+                    continue
+                v = np.asarray(vec, dtype=np.float32)
+                _vectors[key] = v / (np.linalg.norm(v) or 1.0)
+                if len(_vectors) > _VECTORS_MAX:
+                    _vectors.popitem(last=False)
+    with _vectors_lock:
+        if not all(k in _vectors for k in keys):
+            return None
+        return np.stack([_vectors[k] for k in keys])
+
+
+def mmr_order(candidates: List[Dict[str, Any]], query_embedding: Optional[Sequence[float]] = None,
+              lambda_: float = MMR_LAMBDA, duplicate_threshold: float = DUPLICATE_THRESHOLD):
+    """
+    (ordinea MMR, numărul de duplicate eliminate).
+    Relevanța e similaritatea cu întrebarea dacă avem embedding-ul ei, altfel e
+    dedusă din rangul dat de retriever (funcționează și pentru căutarea lexicală/hibridă).
+    """
+    if len(candidates) < 2:
+        return list(candidates), 0
+    vectors = _candidate_vectors(candidates)
+    if vectors is None:
+        return list(candidates), 0
+    n = len(candidates)
+    if query_embedding is not None:
+        # indexul NumPy poate păstra mai puține dimensiuni decât embedding-ul întrebării
+        q = np.asarray(query_embedding, dtype=np.float32)[:vectors.shape[1]]
+        relevance = vectors @ (q / (np.linalg.norm(q) or 1.0))
+    else:
+        relevance = 1.0 - np.arange(n, dtype=np.float32) / n
+    similarity = vectors @ vectors.T
+
+    selected: List[int] = [0] if query_embedding is None else [int(np.argmax(relevance))]
+    remaining = [i for i in range(n) if i != selected[0]]
+    duplicates = 0
+    while remaining:
+        redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+        keep = redundancy < duplicate_threshold
+        duplicates += int((~keep).sum())
+        remaining = [i for i, k in zip(remaining, keep) if k]
+        if not remaining:
+            break
+        scores = lambda_ * relevance[remaining] - (1.0 - lambda_) * redundancy[keep]
+        best = remaining[int(np.argmax(scores))]
+        selected.append(best)
+        remaining.remove(best)
+    return [candidates[i] for i in selected], duplicates
+
+
+def _line(i: int, book: Dict[str, Any], summary: str) -> str:
+    return f"{i}. {book['title']} — {summary}"
+
+
+def build_context(
+    candidates: List[Dict[str, Any]],
+    budget: Optional[int] = None,
+    query_embedding: Optional[Sequence[float]] = None,
+    diversify: bool = True,
+    reorder: Optional[bool] = None,
+) -> Context:
+    """
+    Lista numerotată „titlu — rezumat” pentru prompt:
+      1) fără aproape-duplicate (embedding-urile stocate ale cărților), în ordinea
+         retriever-ului sau, cu `reorder` (implicit CONTEXT_MMR_REORDER), în ordinea MMR
+      2) bugetul e împărțit echitabil: rezumatele scurte rămân întregi, cele lungi
+         sunt tăiate la partea lor; candidații care n-ar mai primi nici
+         MIN_SUMMARY_TOKENS sunt lăsați pe dinafară (primii în ordine rămân)
+    """
+    budget = TOKEN_BUDGET if budget is None else budget
+    reorder = MMR_REORDER if reorder is None else reorder
+    ordered, duplicates = mmr_order(candidates, query_embedding) if diversify else (list(candidates), 0)
+    if not reorder:
+        kept = {id(book) for book in ordered}
+        ordered = [book for book in candidates if id(book) in kept]
+
+    # cost fix per candidat: numărul, titlul, separatorul și linia nouă
+    overhead = [count_tokens(_line(i, b, "")) + 1 for i, b in enumerate(ordered, 1)]
+    wanted = [count_tokens(b["summary"]) for b in ordered]
+    keep = len(ordered)
+    if budget > 0:
+        while keep > 1 and sum(overhead[:keep]) + sum(min(w, MIN_SUMMARY_TOKENS) for w in wanted[:keep]) > budget:
+            keep -= 1
+    dropped = len(ordered) - keep
+    ordered, overhead, wanted = ordered[:keep], overhead[:keep], wanted[:keep]
+
+    allowed = list(wanted)
+    if budget > 0 and sum(overhead) + sum(wanted) > budget:
+        # water-filling: cine cere sub cota egală primește tot, restul împart ce rămâne
+        left = max(0, budget - sum(overhead))
+        pending = sorted(range(keep), key=lambda i: wanted[i])
+        while pending:
+            share = left // len(pending)
+            i = pending[0]
+            if wanted[i] <= share:
+                allowed[i] = wanted[i]
+                left -= wanted[i]
+                pending.pop(0)
+            else:
+                for j in pending:
+                    allowed[j] = max(1, share)
+                break
+
+    lines, truncated = [], 0
+    for i, (book, limit, full) in enumerate(zip(ordered, allowed, wanted), 1):
+        summary = book["summary"]
+        if limit < full:
+            summary = truncate_tokens(summary, limit)
+            truncated += 1
+        lines.append(_line(i, book, summary))
+    text = "\n".join(lines)
+    tokens = count_tokens(text)
+    telemetry.count("context_candidates", len(ordered), outcome="included")
+    for outcome, value in (("duplicate", duplicates), ("truncated", truncated), ("dropped", dropped)):
+        if value:
+            telemetry.count("context_candidates", value, outcome=outcome)
+    return Context(text, ordered, tokens, duplicates, truncated, dropped)
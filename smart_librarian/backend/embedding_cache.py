@@ -0,0 +1,189 @@
+# Cache pe două niveluri pentru embedding-urile întrebărilor
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from backend.text_norm import normalize_query
+from backend import telemetry
+
+# Config din .env
+MEMORY_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+DISK_ENABLED = os.getenv("EMBED_CACHE_DISK", "true").lower() == "true"
+DISK_PATH = os.getenv("EMBED_CACHE_PATH", "outputs/cache/query_embeddings.sqlite")
+DISK_MAX_ROWS = int(os.getenv("EMBED_CACHE_MAX_ROWS", "100000"))
+
+
+def cache_key(text: str, model: str) -> str:
+    """Cheia depinde de textul normalizat și de modelul de embedding."""
+    payload = f"{model}\x1f{normalize_query(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Nivel 1: LRU în proces (OrderedDict).
+    Nivel 2: SQLite pe disc, vectori float32 ca BLOB, evicție după last_used
+    când se depășește max_rows.
+    """
+
+    def __init__(
+        self,
+        memory_size: int = MEMORY_SIZE,
+        disk_path: Optional[str] = DISK_PATH if DISK_ENABLED else None,
+        max_rows: int = DISK_MAX_ROWS,
+    ):
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        self._mem: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._rows = 0
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        if disk_path:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, vec BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+            self._rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    # --- nivel 1 ---
+    def _mem_get(self, key: str) -> Optional[List[float]]:
+        vec = self._mem.get(key)
+        if vec is not None:
+            self._mem.move_to_end(key)
+        return vec
+
+    def _mem_put(self, key: str, vec: List[float]) -> None:
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_size:
+            self._mem.popitem(last=False)
+
+    # --- nivel 2 ---
+    def _disk_get(self, key: str) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT vec FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        return array("f", row[0]).tolist()
+
+    def _disk_put(self, key: str, vec: List[float]) -> None:
+        if self._db is None:
+            return
+        cur = self._db.execute(
+            "INSERT OR REPLACE INTO embeddings(key, vec, last_used) VALUES (?, ?, ?)",
+            (key, array("f", vec).tobytes(), time.time()),
+        )
+        self._rows += cur.rowcount
+        if self._rows > self.max_rows:
+            # eliminăm cele mai vechi ~10% ca să nu facem DELETE la fiecare insert
+            excess = self._rows - self.max_rows + max(1, self.max_rows // 10)
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (excess,),
+            )
+            self._rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._db.commit()
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vec = self._mem_get(key)
+            if vec is not None:
+                self.hits_memory += 1
+                telemetry.count("cache_requests", cache="query_embedding", result="hit_memory")
+                return vec
+            vec = self._disk_get(key)
+            if vec is not None:
+                self.hits_disk += 1
+                telemetry.count("cache_requests", cache="query_embedding", result="hit_disk")
+                self._mem_put(key, vec)
+                return vec
+            self.misses += 1
+            telemetry.count("cache_requests", cache="query_embedding", result="miss")
+            return None
+
+    def _store(self, key: str, vec: List[float]) -> None:
+        with self._lock:
+            self._mem_put(key, vec)
+            self._disk_put(key, vec)
+
+    def peek(self, text: str, model: str) -> Optional[List[float]]:
+        """Embedding-ul din cache, fără să-l calculeze (None dacă lipsește); nu intră în statistici."""
+        key = cache_key(text, model)
+        with self._lock:
+            vec = self._mem_get(key)
+            if vec is None:
+                vec = self._disk_get(key)
+                if vec is not None:
+                    self._mem_put(key, vec)
+            return vec
+
+    def get_or_compute(self, text: str, model: str, compute: Callable[[str], List[float]]) -> List[float]:
+        """Întoarce embedding-ul din cache sau îl calculează cu `compute` și îl salvează."""
+        key = cache_key(text, model)
+        vec = self._lookup(key)
+        if vec is None:
+            vec = [float(x) for x in compute(text)]
+            self._store(key, vec)
+        return vec
+
+    def get_or_compute_many(
+        self, texts: List[str], model: str, compute_batch: Callable[[List[str]], List[List[float]]]
+    ) -> List[List[float]]:
+        """
+        Varianta în bloc: caută fiecare text în cache, iar textele lipsă (deduplicate
+        după cheie) sunt calculate într-un singur apel `compute_batch`.
+        """
+        keys = [cache_key(t, model) for t in texts]
+        found: Dict[str, List[float]] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            vec = self._lookup(key)
+            if vec is None:
+                missing[key] = text
+            else:
+                found[key] = vec
+        if missing:
+            computed = compute_batch(list(missing.values()))
+            for key, vec in zip(missing, computed):
+                found[key] = [float(x) for x in vec]
+                self._store(key, found[key])
+        return [found[key] for key in keys]
+
+    async def aget_or_compute(
+        self, text: str, model: str, acompute: Callable[[str], Awaitable[List[float]]]
+    ) -> List[float]:
+        """Ca get_or_compute, dar `acompute` e o corutină (ex. AsyncOpenAI)."""
+        key = cache_key(text, model)
+        vec = self._lookup(key)
+        if vec is None:
+            vec = [float(x) for x in await acompute(text)]
+            self._store(key, vec)
+        return vec
+
+    def stats(self) -> dict:
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "memory_entries": len(self._mem),
+            "disk_rows": self._rows,
+        }
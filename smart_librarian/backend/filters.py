@@ -1,11 +1,13 @@
 # Filtru limbaj nepotrivit
 import os
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Tuple, Dict, Any
-from dotenv import load_dotenv
-from openai import OpenAI
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from backend.clients import get_openai_client, get_async_openai_client
+from backend.text_norm import normalize_query
+from backend import telemetry
 
 # Config din .env
 STRICT = os.getenv("MODERATION_STRICT", "true").lower() == "true"
@@ -16,6 +18,13 @@ BLOCK_CATS = {
 }
 # control separat pentru profanitate via LLM-classifier
 PROFANITY_BLOCK = os.getenv("PROFANITY_BLOCK", "true").lower() == "true"
+# cache pentru verdicte (0 = dezactivat)
+VERDICT_CACHE_SIZE = int(os.getenv("MODERATION_CACHE_SIZE", "2048"))
+
+# pool comun pentru cele două verificări rulate în paralel
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="moderation")
+_verdict_cache: "OrderedDict[tuple, Tuple[bool, str, Dict[str, Any]]]" = OrderedDict()
+_verdict_lock = threading.Lock()
 
 SAFE_RESPONSE = (
     "Îți mulțumesc! Din motive de siguranță, nu pot procesa întrebarea exact așa cum a fost formulată. "
@@ -40,12 +49,7 @@ def _to_dict(obj: Any) -> Dict[str, Any]:
             out[name] = val
     return out
 
-def _moderation_block(text: str) -> Tuple[bool, Dict[str, Any]]:
-    resp = client.moderations.create(
-        model="omni-moderation-latest",
-        input=text
-    )
-    r = resp.results[0]
+def _moderation_verdict(r: Any) -> Tuple[bool, Dict[str, Any]]:
     flagged = bool(getattr(r, "flagged", False))
     cats = getattr(r, "categories", None)
     cats_dict: Dict[str, Any] = _to_dict(cats) if cats is not None else {}
@@ -61,45 +65,177 @@ def _moderation_block(text: str) -> Tuple[bool, Dict[str, Any]]:
 
     return False, {"results": [_to_dict(r)]}
 
-def _profanity_block_via_llm(text: str) -> Tuple[bool, Dict[str, Any]]:
-    """
-    Clasificator LLM minim: răspunde STRICT doar cu ALLOW sau BLOCK.
-    Blocăm dacă detectează injurii/profanitate/vulgaritate clară.
-    """
-    if not PROFANITY_BLOCK:
-        return False, {"skipped": True}
+def _moderation_block(text: str) -> Tuple[bool, Dict[str, Any]]:
+    with telemetry.span("moderation.api") as s:
+        resp = get_openai_client().moderations.create(
+            model="omni-moderation-latest",
+            input=text
+        )
+        blocked, details = _moderation_verdict(resp.results[0])
+        s.set(blocked=blocked)
+    return blocked, details
 
-    system = (
-        "You are a strict profanity detector for user queries to a book-recommendation assistant. "
-        "If the text contains clear profanity, slurs, or vulgar language (any language), respond exactly 'BLOCK'. "
-        "If it is acceptable (even if critical but not profane), respond exactly 'ALLOW'. "
-        "No explanation. Only one token: ALLOW or BLOCK."
-    )
-    completion = client.chat.completions.create(
+async def _amoderation_block(text: str) -> Tuple[bool, Dict[str, Any]]:
+    with telemetry.span("moderation.api") as s:
+        resp = await get_async_openai_client().moderations.create(
+            model="omni-moderation-latest",
+            input=text
+        )
+        blocked, details = _moderation_verdict(resp.results[0])
+        s.set(blocked=blocked)
+    return blocked, details
+
+PROFANITY_SYSTEM = (
+    "You are a strict profanity detector for user queries to a book-recommendation assistant. "
+    "If the text contains clear profanity, slurs, or vulgar language (any language), respond exactly 'BLOCK'. "
+    "If it is acceptable (even if critical but not profane), respond exactly 'ALLOW'. "
+    "No explanation. Only one token: ALLOW or BLOCK."
+)
+
+def _profanity_request(text: str) -> Dict[str, Any]:
+    return dict(
         model="gpt-4o-mini",
         messages=[
-            {"role": "system", "content": system},
+            {"role": "system", "content": PROFANITY_SYSTEM},
             {"role": "user", "content": text}
         ],
         temperature=0,
         max_tokens=3
     )
+
+def _profanity_verdict(completion: Any) -> Tuple[bool, Dict[str, Any]]:
     verdict = (completion.choices[0].message.content or "").strip().upper()
     return (verdict == "BLOCK"), {"verdict": verdict}
 
+def _profanity_block_via_llm(text: str) -> Tuple[bool, Dict[str, Any]]:
+    """
+    Clasificator LLM minim: răspunde STRICT doar cu ALLOW sau BLOCK.
+    Blocăm dacă detectează injurii/profanitate/vulgaritate clară.
+    """
+    if not PROFANITY_BLOCK:
+        return False, {"skipped": True}
+    with telemetry.span("moderation.llm") as s:
+        completion = get_openai_client().chat.completions.create(**_profanity_request(text))
+        telemetry.record_usage("moderation.llm", getattr(completion, "usage", None))
+        blocked, details = _profanity_verdict(completion)
+        s.set(blocked=blocked)
+    return blocked, details
+
+async def _aprofanity_block_via_llm(text: str) -> Tuple[bool, Dict[str, Any]]:
+    if not PROFANITY_BLOCK:
+        return False, {"skipped": True}
+    with telemetry.span("moderation.llm") as s:
+        completion = await get_async_openai_client().chat.completions.create(**_profanity_request(text))
+        telemetry.record_usage("moderation.llm", getattr(completion, "usage", None))
+        blocked, details = _profanity_verdict(completion)
+        s.set(blocked=blocked)
+    return blocked, details
+
+def _verdict_key(text: str) -> tuple:
+    """Cheia include configurația curentă, ca schimbarea ei să invalideze verdictele."""
+    return (normalize_query(text), STRICT, frozenset(BLOCK_CATS), PROFANITY_BLOCK)
+
+def _cache_get(key: tuple):
+    with _verdict_lock:
+        hit = _verdict_cache.get(key)
+        if hit is not None:
+            _verdict_cache.move_to_end(key)
+        return hit
+
+def _cache_put(key: tuple, verdict: Tuple[bool, str, Dict[str, Any]]) -> None:
+    if VERDICT_CACHE_SIZE <= 0:
+        return
+    with _verdict_lock:
+        _verdict_cache[key] = verdict
+        _verdict_cache.move_to_end(key)
+        while len(_verdict_cache) > VERDICT_CACHE_SIZE:
+            _verdict_cache.popitem(last=False)
+
+def _run_checks(text: str) -> Tuple[bool, str, Dict[str, Any]]:
+    """
+    Pornește Moderation API și clasificatorul LLM simultan.
+    Primul care blochează decide; verificarea rămasă e abandonată
+    (anulată dacă n-a pornit, altfel rezultatul ei e ignorat).
+    """
+    futures = {
+        _executor.submit(telemetry.propagate(_moderation_block), text): "moderation",
+        _executor.submit(telemetry.propagate(_profanity_block_via_llm), text): "profanity",
+    }
+    raw: Dict[str, Any] = {"moderation": None, "profanity": None}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                blocked, details = fut.result()
+                raw[futures[fut]] = details
+                if blocked:
+                    return True, SAFE_RESPONSE, raw
+    finally:
+        for fut in pending:
+            fut.cancel()
+    return False, "", raw
+
 def moderate_text(text: str) -> Tuple[bool, str, Dict[str, Any]]:
     """
     Returnează:
       - blocked (bool)
       - message (str) pentru UI
       - raw (dict) cu detalii
+    Verdictele se păstrează într-un LRU pe text normalizat + config,
+    deci întrebările repetate nu mai fac apeluri de rețea.
     """
-    blocked_mod, raw_mod = _moderation_block(text)
-    if blocked_mod:
-        return True, SAFE_RESPONSE, {"moderation": raw_mod, "profanity": None}
+    with telemetry.span("moderation") as s:
+        key = _verdict_key(text)
+        cached = _cache_get(key)
+        telemetry.count("cache_requests", cache="moderation", result="miss" if cached is None else "hit")
+        if cached is not None:
+            s.set(cache="hit", blocked=cached[0])
+            return cached
+
+        verdict = _run_checks(text)
+        _cache_put(key, verdict)
+        s.set(cache="miss", blocked=verdict[0])
+    return verdict
+
+async def amoderate_text(text: str) -> Tuple[bool, str, Dict[str, Any]]:
+    """
+    Varianta asyncio a moderate_text: ambele verificări rulează ca task-uri,
+    iar cea rămasă e anulată efectiv dacă prima blochează.
+    """
+    with telemetry.span("moderation") as s:
+        verdict = await _amoderate(text)
+        s.set(blocked=verdict[0])
+    return verdict
+
+async def _amoderate(text: str) -> Tuple[bool, str, Dict[str, Any]]:
+    key = _verdict_key(text)
+    cached = _cache_get(key)
+    telemetry.count("cache_requests", cache="moderation", result="miss" if cached is None else "hit")
+    if cached is not None:
+        return cached
 
-    blocked_prof, raw_prof = _profanity_block_via_llm(text)
-    if blocked_prof:
-        return True, SAFE_RESPONSE, {"moderation": raw_mod, "profanity": raw_prof}
+    tasks = {
+        asyncio.ensure_future(_amoderation_block(text)): "moderation",
+        asyncio.ensure_future(_aprofanity_block_via_llm(text)): "profanity",
+    }
+    raw: Dict[str, Any] = {"moderation": None, "profanity": None}
+    verdict: Tuple[bool, str, Dict[str, Any]] = (False, "", raw)
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                blocked, details = task.result()
+                raw[tasks[task]] = details
+                if blocked:
+                    verdict = (True, SAFE_RESPONSE, raw)
+                    pending = set()  # restul e anulat în finally
+                    break
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
 
-    return False, "", {"moderation": raw_mod, "profanity": raw_prof}
+    _cache_put(key, verdict)
+    return verdict
@@ -0,0 +1,261 @@
+# Ingestie în flux pentru cataloage mari: citire incrementală, embeddings în paralel, reluare exactă
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend import scheduler, shards, telemetry
+from backend.clients import CHROMA_PATH, COLLECTION_NAME, get_embedding_function
+from backend.vector_store import (
+    EMBED_BATCH_SIZE,
+    BOOKS_PATH,
+    apply_writes,
+    book_id,
+    diff_catalog,
+    existing_metadata,
+    iter_books,
+    prepare_writes,
+)
+
+# Config din .env
+# câte batch-uri de embeddings sunt în zbor simultan (limita reală e cota TPM, impusă de planificator)
+WORKERS = int(os.getenv("INGEST_WORKERS", "8"))
+# punctul de reluare; implicit lângă vector store, câte unul per colecție
+CHECKPOINT_PATH = os.getenv("INGEST_CHECKPOINT", os.path.join(CHROMA_PATH, f"ingest_{COLLECTION_NAME}.json"))
+# la câte secunde se afișează progresul
+PROGRESS_EVERY = float(os.getenv("INGEST_PROGRESS_EVERY", "10"))
+
+
+def _batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _source_identity(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"source": os.path.abspath(path), "size": st.st_size, "mtime": st.st_mtime}
+
+
+class Checkpoint:
+    """
+    Batch-urile deja scrise în colecție, identificate prin numărul lor de ordine în
+    catalog: `next_batch` = prefixul complet, `done` = cele terminate după el (workerii
+    termină în altă ordine decât au pornit). Valabil doar pentru același fișier sursă
+    și aceeași mărime de batch; fișierul e rescris atomic după fiecare batch.
+    """
+
+    def __init__(self, path: str, identity: Dict[str, Any], batch_size: int):
+        self.path = path
+        self.identity = identity
+        self.batch_size = batch_size
+        self.next_batch = 0
+        self.done: set = set()
+        self.counts = {"embedded": 0, "unchanged": 0}
+
+    @classmethod
+    def load(cls, path: str, identity: Dict[str, Any], batch_size: int) -> "Checkpoint":
+        cp = cls(path, identity, batch_size)
+        if not os.path.exists(path):
+            return cp
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except ValueError:
+            print(f"[ingest] checkpoint ilizibil, se pornește de la început: {path}")
+            return cp
+        if {k: state.get(k) for k in identity} != identity:
+            print(f"[ingest] catalogul s-a schimbat de la checkpoint, se pornește de la început "
+                  f"(cărțile neschimbate sunt oricum sărite)")
+            return cp
+        cp.batch_size = int(state["batch_size"])
+        cp.next_batch = int(state["next_batch"])
+        cp.done = set(state.get("done", []))
+        cp.counts.update(state.get("counts", {}))
+        return cp
+
+    def is_done(self, n: int) -> bool:
+        return n < self.next_batch or n in self.done
+
+    def mark(self, n: int, counts: Dict[str, int]) -> None:
+        self.done.add(n)
+        while self.next_batch in self.done:
+            self.done.remove(self.next_batch)
+            self.next_batch += 1
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+        self.save()
+
+    def save(self) -> None:
+        state = {
+            **self.identity,
+            "batch_size": self.batch_size,
+            "next_batch": self.next_batch,
+            "done": sorted(self.done),
+            "counts": self.counts,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _prepare(books: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
+    """
+    Scrierile pentru un batch (același diff ca vector_store, limitat la id-urile din batch):
+    doar cărțile noi sau cu conținut modificat primesc embeddings; cele cu metadate noi
+    sunt doar actualizate, iar cele mutate în alt shard își păstrează embedding-ul.
+    """
+    diff = diff_catalog(books, existing_metadata(list({book_id(b) for b in books})), complete=False)
+    with telemetry.span("ingest.embed", books=len(diff.embed)), scheduler.priority("batch"):
+        writes = prepare_writes(diff, get_embedding_function())
+    return writes, {"embedded": len(diff.embed), "unchanged": len(books) - len(diff.embed)}
+
+
+def ingest(
+    source: str = BOOKS_PATH,
+    workers: int = WORKERS,
+    batch_size: int = EMBED_BATCH_SIZE,
+    checkpoint_path: str = CHECKPOINT_PATH,
+    restart: bool = False,
+) -> Dict[str, Any]:
+    """
+    Încarcă un catalog oricât de mare cu memorie constantă:
+      1) cărțile sunt citite incremental (array JSON sau JSONL) și grupate în batch-uri fixe
+      2) `workers` thread-uri cer embeddings în paralel, doar pentru cărțile noi/modificate;
+         planificatorul comun le ține în cota RPM/TPM (prioritate "batch")
+      3) un singur thread scrie în colecție (upsert), în fundal, și bifează batch-ul în checkpoint
+    Numărul de batch-uri în zbor e limitat, deci memoria nu crește cu mărimea catalogului.
+    După o oprire (crash, 429 persistent, Ctrl+C), aceeași comandă reia exact de unde
+    a rămas; checkpoint-ul e șters la final. Nu șterge cărțile dispărute din catalog
+    (pentru asta: python -m backend.vector_store).
+    """
+    identity = _source_identity(source)
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    cp = Checkpoint.load(checkpoint_path, identity, batch_size)
+    if cp.next_batch or cp.done:
+        print(f"[ingest] reluare de la batch-ul {cp.next_batch} ({len(cp.done)} terminate după el), "
+              f"batch_size={cp.batch_size}")
+
+    writes: "queue.Queue[Optional[Tuple[int, Dict[str, Dict[str, Any]], Dict[str, int]]]]" = queue.Queue(maxsize=workers)
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    stats = {"books": 0, "embedded": 0, "unchanged": 0, "batches": 0, "skipped_batches": 0}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    last_report = [started]
+
+    def report(force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - last_report[0] < PROGRESS_EVERY:
+            return
+        last_report[0] = now
+        elapsed = now - started
+        print(f"[ingest] {stats['books']} cărți ({stats['embedded']} cu embeddings noi), "
+              f"{stats['books'] / elapsed if elapsed else 0.0:.0f}/s, {writes.qsize()} batch-uri de scris")
+
+    def writer() -> None:
+        while True:
+            item = writes.get()
+            if item is None:
+                return
+            if errors:
+                continue  # golim coada ca workerii să nu rămână blocați
+            n, batch_writes, counts = item
+            try:
+                with telemetry.span("ingest.write", rows=counts["embedded"]):
+                    apply_writes(batch_writes)
+                cp.mark(n, counts)
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+                continue
+            with lock:
+                stats["batches"] += 1
+                stats["books"] += counts["embedded"] + counts["unchanged"]
+                for key in counts:
+                    stats[key] += counts[key]
+            for key, value in counts.items():
+                telemetry.count("ingest_books", value, result=key)
+            report()
+
+    def work(n: int, books: List[Dict[str, Any]]) -> None:
+        try:
+            if not stop.is_set():
+                batch_writes, counts = _prepare(books)
+                writes.put((n, batch_writes, counts))
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            in_flight.release()
+
+    write_thread = threading.Thread(target=writer, name="ingest-writer", daemon=True)
+    write_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest") as pool:
+            try:
+                for n, books in enumerate(_batches(iter_books(source), cp.batch_size)):
+                    if stop.is_set():
+                        break
+                    if cp.is_done(n):
+                        stats["skipped_batches"] += 1
+                        continue
+                    in_flight.acquire()
+                    pool.submit(work, n, books)
+            except BaseException:
+                # Ctrl+C / eroare de citire: batch-urile pornite se termină și intră în checkpoint,
+                # cele încă nepornite nu mai cer embeddings
+                stop.set()
+                raise
+    finally:
+        writes.put(None)
+        write_thread.join()
+
+    shards.shard_names(refresh=True)
+    if errors:
+        raise RuntimeError(
+            f"ingestie oprită după {stats['batches']} batch-uri; rulați din nou comanda pentru reluare "
+            f"(checkpoint: {checkpoint_path})"
+        ) from errors[0]
+
+    cp.remove()
+    report(force=True)
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 2)
+    stats["books_per_second"] = round(stats["books"] / elapsed, 1) if elapsed else 0.0
+    stats["total"] = dict(cp.counts)
+    stats["scheduler"] = scheduler.stats()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestie în flux (reluabilă) a unui catalog mare în vector store.")
+    parser.add_argument("source", nargs="?", default=BOOKS_PATH, help="array JSON sau JSONL cu {\"title\", \"summary\"}")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true", help="ignoră checkpoint-ul existent")
+    args = parser.parse_args()
+
+    try:
+        summary = ingest(args.source, args.workers, args.batch_size, args.checkpoint, args.restart)
+    except KeyboardInterrupt:
+        print(f"\n[ingest] oprit; rulați din nou aceeași comandă pentru reluare (checkpoint: {args.checkpoint})")
+        raise SystemExit(130)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
@@ -0,0 +1,181 @@
+# Index lexical local (BM25 pe titluri + rezumate), fără apeluri de rețea
+import os
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.text_norm import tokenize
+from backend.metadata_filter import matches, normalize_where
+
+# Config din .env
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# un termen găsit în titlu cântărește cât TITLE_BOOST apariții în rezumat
+TITLE_BOOST = float(os.getenv("LEXICAL_TITLE_BOOST", "3"))
+# potrivire „decisivă” fără titlu: primul rezultat acoperă aproape toți termenii
+# întrebării și are scorul de cel puțin DECISIVE_RATIO ori mai mare decât al doilea
+DECISIVE_COVERAGE = float(os.getenv("LEXICAL_DECISIVE_COVERAGE", "0.8"))
+DECISIVE_RATIO = float(os.getenv("LEXICAL_DECISIVE_RATIO", "2.0"))
+
+# cuvinte fără valoare de căutare (deja fără diacritice, vezi text_norm.fold)
+STOPWORDS = frozenset("""
+a ai al ale am ar as asa au ca care cat ce cea cel cele cei cu cum da dar de
+deci despre din e este eu fi fie in ii il imi la le li lui ma mai mi ne nu o
+ori pe pentru prin sa sau se si sunt te tu un una unei unui unor vreau vrea
+ceva cineva carte carti recomanda recomandati recomanzi iubesc iubeste place
+mie the of and to
+""".split())
+
+
+def _terms(text: str) -> List[str]:
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+def _contains(haystack: Sequence[str], needle: Sequence[str]) -> bool:
+    """needle apare ca secvență continuă în haystack."""
+    n = len(needle)
+    if n == 0 or n > len(haystack):
+        return False
+    return any(haystack[i:i + n] == list(needle) for i in range(len(haystack) - n + 1))
+
+
+class LexicalIndex:
+    """
+    Index inversat în memorie cu scor BM25 (câmpul titlu ponderat cu TITLE_BOOST).
+    Tokenii sunt fold-uiți, deci „tiganiada” găsește și „Țiganiada”.
+    """
+
+    def __init__(self, books: Sequence[Dict[str, Any]], ids: Sequence[str]):
+        self.ids = list(ids)
+        self.titles = [b["title"] for b in books]
+        self.summaries = [b["summary"] for b in books]
+        # câmpurile opționale (genre, language, ...) pentru filtrele `where`
+        self.metadatas = [{k: v for k, v in b.items() if k not in ("title", "summary")} for b in books]
+        # toți tokenii titlului (inclusiv stopwords), pentru potrivirea de titlu în întrebare
+        self.title_tokens = [tokenize(t) for t in self.titles]
+
+        self.postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        # termenii fiecărei cărți, pentru acoperirea întrebării de către primul rezultat
+        self.doc_terms: List[frozenset] = []
+        self.lengths: List[float] = []
+        for doc, book in enumerate(books):
+            tf: Counter = Counter(_terms(book["summary"]))
+            for term in _terms(book["title"]):
+                tf[term] += TITLE_BOOST
+            for term, freq in tf.items():
+                self.postings[term].append((doc, freq))
+            self.doc_terms.append(frozenset(tf))
+            self.lengths.append(float(sum(tf.values())))
+        self.avg_len = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        self.title_index = self._build_title_index()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1.0 + (len(self) - df + 0.5) / (df + 0.5))
+
+    def _bm25(self, terms: List[str]) -> Dict[int, float]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for doc, freq in postings:
+                norm = 1.0 - BM25_B + BM25_B * self.lengths[doc] / (self.avg_len or 1.0)
+                scores[doc] += idf * freq * (BM25_K1 + 1.0) / (freq + BM25_K1 * norm)
+        return scores
+
+    def _build_title_index(self) -> Dict[str, List[int]]:
+        """
+        Fiecare titlu (cu cel puțin un cuvânt relevant) e indexat după cel mai rar cuvânt
+        relevant al lui: un titlu citat în întrebare are sigur acel cuvânt în ea, deci
+        candidații se găsesc din tokenii întrebării, fără a parcurge toate titlurile.
+        """
+        df: Counter = Counter()
+        for tokens in self.title_tokens:
+            df.update({t for t in tokens if t not in STOPWORDS})
+        index: Dict[str, List[int]] = defaultdict(list)
+        for doc, tokens in enumerate(self.title_tokens):
+            relevant = [t for t in tokens if t not in STOPWORDS]
+            if relevant:
+                index[min(relevant, key=lambda t: df[t])].append(doc)
+        return dict(index)
+
+    def _title_matches(self, query_tokens: List[str]) -> List[int]:
+        """Cărțile al căror titlu (cu cel puțin un cuvânt relevant) apare întreg în întrebare."""
+        return [
+            doc
+            for token in set(query_tokens)
+            for doc in self.title_index.get(token, ())
+            if _contains(query_tokens, self.title_tokens[doc])
+        ]
+
+    def search(self, query: str, top_k: int = 3,
+               where: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Întoarce (rezultate, decisive). Rezultatele au câmpurile din search_books
+        ({id, title, summary, score}, score = BM25, mai mare = mai relevant).
+        decisive=True când potrivirea e suficient de clară încât embedding-ul
+        întrebării nu mai e necesar. `where` păstrează doar cărțile cu metadatele potrivite.
+        """
+        where = normalize_where(where)
+        query_tokens = tokenize(query)
+        terms = _terms(query)
+        scores = self._bm25(terms)
+        titled = self._title_matches(query_tokens)
+        if where:
+            scores = defaultdict(float, {doc: s for doc, s in scores.items() if matches(self.metadatas[doc], where)})
+            titled = [doc for doc in titled if matches(self.metadatas[doc], where)]
+
+        # titlul cel mai lung citat în întrebare trece primul ("Harry Potter" < "Harry Potter și ...")
+        titled = sorted(titled, key=lambda d: (-len(self.title_tokens[d]), d))
+        decisive = False
+        if titled:
+            best = len(self.title_tokens[titled[0]])
+            decisive = sum(1 for d in titled if len(self.title_tokens[d]) == best) == 1
+            top_score = max(scores.values(), default=0.0)
+            for rank, doc in enumerate(titled):
+                scores[doc] = top_score + len(titled) - rank
+
+        ranked = sorted(scores.items(), key=lambda kv: -kv[1])[:max(top_k, 2)]
+        if not decisive and ranked and terms:
+            first, first_score = ranked[0]
+            second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+            matched = len(set(terms) & self.doc_terms[first])
+            decisive = (
+                matched / len(set(terms)) >= DECISIVE_COVERAGE
+                and first_score >= DECISIVE_RATIO * second_score
+            )
+
+        results = [
+            {"id": self.ids[doc], "title": self.titles[doc], "summary": self.summaries[doc], "score": score}
+            for doc, score in ranked[:top_k]
+        ]
+        return results, decisive
+
+
+_index: Optional[LexicalIndex] = None
+_index_mtime: Optional[float] = None
+_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """
+    Indexul construit din catalogul JSON (aceleași id-uri ca în colecția Chroma),
+    reconstruit automat dacă fișierul catalogului s-a modificat.
+    """
+    global _index, _index_mtime
+    from backend.vector_store import BOOKS_PATH, book_id, load_books
+
+    mtime = os.path.getmtime(BOOKS_PATH)
+    if _index is None or mtime != _index_mtime:
+        with _lock:
+            if _index is None or mtime != _index_mtime:
+                books = load_books()
+                _index = LexicalIndex(books, [book_id(b) for b in books])
+                _index_mtime = mtime
+    return _index
@@ -0,0 +1,142 @@
+# Filtre pe metadatele cărților (sintaxa `where` din Chroma), evaluate și local
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+class FilterError(ValueError):
+    """Filtru `where` invalid (API-ul răspunde 422)."""
+
+
+def _same(a: Any, b: Any) -> bool:
+    # ca în Chroma: True nu e egal cu 1, iar "1990" nu e egal cu 1990
+    return a == b and isinstance(a, bool) == isinstance(b, bool)
+
+
+_COMPARE = {
+    "$eq": _same,
+    "$ne": lambda a, b: not _same(a, b),
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: any(_same(a, v) for v in b),
+    "$nin": lambda a, b: not any(_same(a, v) for v in b),
+}
+_SCALAR = (str, int, float, bool)
+
+
+def _check_operand(key: str, op: str, value: Any) -> None:
+    """Tipurile acceptate de Chroma; altfel FilterError (API-ul răspunde 422, nu 500)."""
+    if op in ("$in", "$nin"):
+        if not isinstance(value, list) or not value:
+            raise FilterError(f"{key}: {op} cere o listă nevidă de valori")
+        if not isinstance(value[0], _SCALAR) or any(type(v) is not type(value[0]) for v in value):
+            raise FilterError(f"{key}: valorile din {op} trebuie să fie de același tip (text, număr sau bool)")
+    elif op in ("$gt", "$gte", "$lt", "$lte"):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise FilterError(f"{key}: {op} cere un număr")
+    elif not isinstance(value, _SCALAR):
+        raise FilterError(f"{key}: valoarea trebuie să fie text, număr sau bool")
+
+
+def _combine(op: str, clauses: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # Chroma cere cel puțin două clauze în $and/$or: una singură devine clauza însăși
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {op: clauses}
+
+
+def normalize_where(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Forma acceptată de Chroma, cu un singur câmp și un singur operator per nivel:
+    {"genre": "fantasy", "year": {"$gte": 1950, "$lt": 2000}} devine
+    {"$and": [{"genre": "fantasy"}, {"year": {"$gte": 1950}}, {"year": {"$lt": 2000}}]}.
+    Un filtru gol înseamnă fără filtru; un $and/$or cu o singură clauză devine clauza.
+    Operatorii și tipurile operanzilor sunt validați (FilterError), aceleași reguli
+    pentru Chroma și pentru indexurile locale. Idempotentă.
+    """
+    if not where:
+        return None
+    if not isinstance(where, dict):
+        raise FilterError("filtrul trebuie să fie un obiect")
+    clauses: List[Dict[str, Any]] = []
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            if not isinstance(value, list) or not all(isinstance(part, dict) for part in value):
+                raise FilterError(f"{key} cere o listă de filtre")
+            parts = [p for p in (normalize_where(part) for part in value) if p]
+            combined = _combine(key, parts)
+            if combined is not None:
+                clauses.append(combined)
+        elif key.startswith("$"):
+            raise FilterError(f"operator necunoscut în filtru: {key}")
+        elif isinstance(value, dict):
+            if not value:
+                raise FilterError(f"{key}: condiție goală")
+            for op, operand in value.items():
+                if op not in _COMPARE:
+                    raise FilterError(f"operator necunoscut în filtru: {op}")
+                _check_operand(key, op, operand)
+                clauses.append({key: {op: operand}})
+        else:
+            _check_operand(key, "$eq", value)
+            clauses.append({key: value})
+    return _combine("$and", clauses)
+
+
+def matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """
+    Aceeași semantică ca filtrul Chroma, pentru indexurile locale (NumPy, BM25);
+    `where` trebuie să treacă întâi prin normalize_where (aceleași reguli de validare).
+    """
+    if not where:
+        return True
+    for key, value in where.items():
+        if key == "$and":
+            if not all(matches(metadata, part) for part in value):
+                return False
+        elif key == "$or":
+            if not any(matches(metadata, part) for part in value):
+                return False
+        else:
+            conditions = value if isinstance(value, dict) else {"$eq": value}
+            actual = metadata.get(key)
+            try:
+                if not all(_COMPARE[op](actual, expected) for op, expected in conditions.items()):
+                    return False
+            except TypeError:
+                # ex. "$gt" între un număr și un string: nu se potrivește
+                return False
+    return True
+
+
+def key_values(where: Optional[Dict[str, Any]], key: str) -> Optional[Set[Any]]:
+    """
+    Valorile posibile ale câmpului `key` impuse de filtru (prin egalitate sau $in),
+    sau None dacă filtrul nu îl restrânge. Folosit de router pentru a alege shard-urile.
+    """
+    if not where:
+        return None
+    allowed: Optional[Set[Any]] = None
+
+    def narrow(values: Iterable[Any]) -> None:
+        nonlocal allowed
+        values = set(values)
+        allowed = values if allowed is None else allowed & values
+
+    for k, value in where.items():
+        if k == "$and":
+            for part in value:
+                found = key_values(part, key)
+                if found is not None:
+                    narrow(found)
+        elif k == "$or":
+            branches = [key_values(part, key) for part in value]
+            if branches and all(b is not None for b in branches):
+                narrow(set().union(*branches))
+        elif k == key:
+            if not isinstance(value, dict):
+                narrow([value])
+            elif "$eq" in value:
+                narrow([value["$eq"]])
+            elif "$in" in value:
+                narrow(value["$in"])
+    return allowed
@@ -0,0 +1,329 @@
+# Index vectorial în proces (NumPy + fișiere memory-mapped)
+import os
+import json
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.metadata_filter import matches, normalize_where
+
+# Config din .env
+INDEX_DIR = os.getenv("NUMPY_INDEX_DIR", "numpy_index")
+INDEX_DTYPE = os.getenv("NUMPY_INDEX_DTYPE", "float32")  # float32 | float16 | int8 | binary
+# câte dimensiuni păstrăm (text-embedding-3-* sunt Matryoshka: primele d dimensiuni,
+# renormalizate, ≈ embedding-ul cerut direct cu dimensions=d); 0 = toate
+INDEX_DIM = int(os.getenv("NUMPY_INDEX_DIM", "0"))
+# int8/binary: copia float (pe disc, citită doar pentru candidați) folosită la rescoring; "none" = fără
+RERANK_DTYPE = os.getenv("NUMPY_INDEX_RERANK_DTYPE", "float16")  # float32 | float16 | none
+# int8/binary: câți candidați (top_k × factor) trec din prima trecere la rescoring
+RESCORE_FACTOR = int(os.getenv("NUMPY_INDEX_RESCORE_FACTOR", "4"))
+# câte rânduri procesăm deodată (limitează memoria temporară la cataloage mari)
+BLOCK_ROWS = int(os.getenv("NUMPY_INDEX_BLOCK_ROWS", "65536"))
+# la formatele convertite în float32 înainte de produs, blocuri mici (rămân în cache-ul CPU)
+_CAST_BLOCK_ROWS = 2048
+
+_COLUMNS = ("ids", "titles", "summaries", "metadatas")
+DTYPES = ("float32", "float16", "int8", "binary")
+RERANK_DTYPES = ("float32", "float16", "none")
+
+
+def normalize_rows(emb: np.ndarray, dim: int = 0) -> np.ndarray:
+    """Primele `dim` coloane (0 = toate), fiecare rând adus la normă 1."""
+    emb = np.asarray(emb, dtype=np.float32)
+    if dim:
+        if dim > emb.shape[1]:
+            raise ValueError(f"dim={dim} e mai mare decât dimensiunea embeddings-urilor ({emb.shape[1]})")
+        emb = emb[:, :dim]
+    norms = np.linalg.norm(emb, axis=1, keepdims=True)
+    return emb / np.where(norms == 0, 1.0, norms)
+
+
+def quantize_int8(emb: np.ndarray):
+    """Cuantizare simetrică per vector: (coduri int8, scări float32), x ≈ cod · scară."""
+    scales = np.abs(emb).max(axis=1) / 127.0
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    codes = np.clip(np.rint(emb / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def pack_signs(emb: np.ndarray) -> np.ndarray:
+    """Un bit per dimensiune (semnul), împachetat: dim/8 octeți per vector."""
+    return np.packbits(emb > 0, axis=1)
+
+
+def _write_strings(path: Path, values: Sequence[str]) -> None:
+    """Coloană de stringuri: un blob UTF-8 + offset-uri int64 (ambele mmap-abile)."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    with open(path.with_suffix(".bin"), "wb") as f:
+        for b in encoded:
+            f.write(b)
+    np.save(path.with_suffix(".offsets.npy"), offsets)
+
+
+class _StringColumn:
+    def __init__(self, path: Path):
+        self.offsets = np.load(path.with_suffix(".offsets.npy"), mmap_mode="r")
+        blob = path.with_suffix(".bin")
+        # np.memmap nu acceptă fișiere goale
+        self.blob = np.memmap(blob, dtype=np.uint8, mode="r") if blob.stat().st_size else np.zeros(0, np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+
+class NumpyIndex:
+    """
+    Căutare flat pe embeddings normalizate. Embeddings și coloanele de text sunt
+    memory-mapped, deci pornirea e instantanee, iar paginile sunt partajate între
+    procesele worker. Formatul vectorilor (meta.json):
+      - float32 / float16: produs matriceal exact
+      - int8: cod int8 + o scară per vector (4× mai mic decât float32)
+      - binary: doar semnul fiecărei dimensiuni (32× mai mic), distanță Hamming
+    La int8/binary, prima trecere alege top_k × RESCORE_FACTOR candidați, recalculați
+    apoi exact cu copia float de pe disc (rerank.npy), din care se citesc doar acele rânduri.
+    """
+
+    def __init__(self, directory: str = INDEX_DIR):
+        d = Path(directory)
+        self.meta: Dict[str, Any] = json.loads((d / "meta.json").read_text(encoding="utf-8"))
+        self.dtype = self.meta.get("dtype", "float32")
+        self.dim = int(self.meta["dim"])
+        self.embeddings = np.load(d / "embeddings.npy", mmap_mode="r")
+        self.scales = np.load(d / "scales.npy", mmap_mode="r") if self.dtype == "int8" else None
+        rerank = d / "rerank.npy"
+        self.rerank = np.load(rerank, mmap_mode="r") if rerank.exists() else None
+        self.ids = _StringColumn(d / "ids")
+        self.titles = _StringColumn(d / "titles")
+        self.summaries = _StringColumn(d / "summaries")
+        # metadatele (JSON per rând) lipsesc din indexurile construite înainte de filtre
+        self.metadatas = _StringColumn(d / "metadatas") if (d / "metadatas.bin").exists() else None
+        self._rows: Optional[Dict[str, int]] = None  # id -> rând, construit la nevoie
+        self._parsed: Optional[List[Dict[str, Any]]] = None
+        self._masks: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    @staticmethod
+    def build(
+        directory: str,
+        ids: Sequence[str],
+        titles: Sequence[str],
+        summaries: Sequence[str],
+        embeddings: Any,
+        dtype: str = INDEX_DTYPE,
+        dim: int = INDEX_DIM,
+        rerank_dtype: str = RERANK_DTYPE,
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> None:
+        """Scrie indexul atomic: într-un director temporar, apoi redenumit peste cel vechi."""
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype necunoscut: {dtype} (alege: {', '.join(DTYPES)})")
+        if rerank_dtype not in RERANK_DTYPES:
+            raise ValueError(f"rerank_dtype necunoscut: {rerank_dtype} (alege: {', '.join(RERANK_DTYPES)})")
+        emb = np.asarray(embeddings, dtype=np.float32)
+        if emb.ndim != 2 or emb.shape[0] != len(ids):
+            raise ValueError("embeddings trebuie să fie o matrice (n, dim) cu n = len(ids)")
+        emb = normalize_rows(emb, dim)
+        meta: Dict[str, Any] = {"count": len(ids), "dim": int(emb.shape[1]), "dtype": dtype}
+
+        target = Path(directory)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=target.name + ".", dir=target.parent))
+        try:
+            if dtype == "int8":
+                codes, scales = quantize_int8(emb)
+                np.save(tmp / "embeddings.npy", codes)
+                np.save(tmp / "scales.npy", scales)
+            elif dtype == "binary":
+                np.save(tmp / "embeddings.npy", pack_signs(emb))
+            else:
+                np.save(tmp / "embeddings.npy", emb.astype(dtype))
+            if dtype in ("int8", "binary") and rerank_dtype != "none":
+                np.save(tmp / "rerank.npy", emb.astype(rerank_dtype))
+                meta["rerank_dtype"] = rerank_dtype
+            metadata_json = [json.dumps(m or {}, ensure_ascii=False) for m in (metadatas or [{}] * len(ids))]
+            for name, values in zip(_COLUMNS, (ids, titles, summaries, metadata_json)):
+                _write_strings(tmp / name, values)
+            (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+            if target.exists():
+                old = target.with_name(target.name + ".old")
+                shutil.rmtree(old, ignore_errors=True)
+                target.rename(old)
+                tmp.rename(target)
+                shutil.rmtree(old, ignore_errors=True)
+            else:
+                tmp.rename(target)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def get_embeddings(self, ids: Sequence[str]) -> List[Optional[List[float]]]:
+        """Vectorii (normalizați) stocați pentru id-urile date, None pentru cele lipsă."""
+        if self._rows is None:
+            self._rows = {self.ids[i]: i for i in range(len(self))}
+        rows = [self._rows.get(doc_id) for doc_id in ids]
+        return [None if r is None else self._vectors(np.array([r]))[0].tolist() for r in rows]
+
+    def _mask(self, where: Dict[str, Any]) -> np.ndarray:
+        """Rândurile care trec filtrul (calculat o dată per filtru, apoi păstrat)."""
+        key = json.dumps(where, sort_keys=True, ensure_ascii=False)
+        mask = self._masks.get(key)
+        if mask is None:
+            if self._parsed is None:
+                column = self.metadatas
+                self._parsed = [json.loads(column[i]) for i in range(len(self))] if column else [{}] * len(self)
+            mask = np.fromiter((matches(m, where) for m in self._parsed), dtype=bool, count=len(self))
+            if len(self._masks) >= 64:
+                self._masks.pop(next(iter(self._masks)))
+            self._masks[key] = mask
+        return mask
+
+    def _vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Vectorii float (normalizați) ai rândurilor date, cât de exact permite formatul."""
+        if self.rerank is not None:
+            return np.asarray(self.rerank[rows], dtype=np.float32)
+        stored = np.asarray(self.embeddings[rows])
+        if self.dtype == "int8":
+            vectors = stored.astype(np.float32) * np.asarray(self.scales[rows])[:, None]
+        elif self.dtype == "binary":
+            vectors = np.where(np.unpackbits(stored, axis=1, count=self.dim), 1.0, -1.0).astype(np.float32)
+        else:
+            return stored.astype(np.float32)
+        return normalize_rows(vectors)
+
+    def _similarities(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Scorurile primei treceri (n_queries, n_docs), pe blocuri de rânduri: cosinus
+        (exact la float, aproximat la int8) sau 1 - 2·Hamming/dim la binary.
+        """
+        n = len(self)
+        out = np.empty((queries.shape[0], n), dtype=np.float32)
+        if self.dtype == "binary":
+            bits = pack_signs(queries)
+        rows = BLOCK_ROWS if self.dtype in ("float32", "binary") else min(BLOCK_ROWS, _CAST_BLOCK_ROWS)
+        for start in range(0, n, rows):
+            block = np.asarray(self.embeddings[start:start + rows])
+            end = start + block.shape[0]
+            if self.dtype == "binary":
+                for i, q in enumerate(bits):
+                    hamming = np.bitwise_count(block ^ q).sum(axis=1, dtype=np.int32)
+                    out[i, start:end] = 1.0 - 2.0 * hamming / self.dim
+            elif self.dtype == "int8":
+                out[:, start:end] = (queries @ block.astype(np.float32).T) * np.asarray(self.scales[start:end])
+            else:
+                out[:, start:end] = queries @ block.astype(np.float32, copy=False).T
+        return out
+
+    def _prepare_queries(self, query_embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        if q.shape[1] < self.dim:
+            raise ValueError(f"embedding-ul întrebării are {q.shape[1]} dimensiuni, indexul {self.dim}")
+        # întrebarea vine la dimensiunea modelului; indexul poate păstra mai puține
+        q = q[:, :self.dim]
+        return q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+
+    def search(self, query_embeddings: Sequence[Sequence[float]], top_k: int = 3,
+               where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Top-k pentru mai multe întrebări deodată. Întoarce aceleași câmpuri ca
+        search_books: {id, title, summary, score}, unde score = distanța L2²
+        (2 - 2·cos pe vectori unitari), ca la colecția Chroma implicită.
+        `where` (sintaxa Chroma) exclude rândurile nepotrivite înainte de top-k.
+        """
+        n = len(self)
+        where = normalize_where(where)
+        mask = self._mask(where) if where else None
+        allowed = int(mask.sum()) if mask is not None else n
+        if allowed == 0 or top_k <= 0:
+            return [[] for _ in query_embeddings]
+        q = self._prepare_queries(query_embeddings)
+        sims = self._similarities(q)
+        if mask is not None:
+            sims[:, ~mask] = -np.inf
+
+        k = min(top_k, allowed)
+        rescore = self.dtype in ("int8", "binary")
+        depth = min(allowed, k * max(1, RESCORE_FACTOR)) if rescore else k
+        results: List[List[Dict[str, Any]]] = []
+        for qi, row in enumerate(sims):
+            top = np.argpartition(-row, depth - 1)[:depth] if depth < n else np.arange(n)
+            scores = row[top]
+            if rescore:
+                # rândurile în ordine crescătoare: citiri secvențiale din fișierul mmap
+                top = np.sort(top)
+                scores = self._vectors(top) @ q[qi]
+            order = np.argsort(-scores)[:k]
+            results.append([
+                {
+                    "id": self.ids[i],
+                    "title": self.titles[i],
+                    "summary": self.summaries[i],
+                    "score": float(2.0 - 2.0 * s),
+                }
+                for i, s in zip(top[order], scores[order])
+            ])
+        return results
+
+
+def read_chroma(page_size: int = 5000):
+    """(ids, titluri, rezumate, embeddings float32, metadate) din colecția Chroma, pagină cu pagină."""
+    from backend import shards
+    from backend.clients import get_collection
+
+    ids: List[str] = []
+    titles: List[str] = []
+    summaries: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    embeddings: List[Any] = []
+    # cu sharding, indexul NumPy reunește toate shard-urile
+    for name in shards.shard_names(refresh=True):
+        collection = get_collection(name)
+        offset = 0
+        while True:
+            page = collection.get(
+                include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset
+            )
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            titles.extend(m["title"] for m in page["metadatas"])
+            summaries.extend(page["documents"])
+            metadatas.extend({k: v for k, v in m.items() if k not in ("title", "content_hash")}
+                             for m in page["metadatas"])
+            embeddings.extend(page["embeddings"])
+            offset += len(page["ids"])
+    if not ids:
+        raise RuntimeError("Colecția Chroma e goală; rulează întâi python -m backend.vector_store")
+    return ids, titles, summaries, np.asarray(embeddings, dtype=np.float32), metadatas
+
+
+def export_from_chroma(directory: str = INDEX_DIR, dtype: str = INDEX_DTYPE, dim: int = INDEX_DIM,
+                       rerank_dtype: str = RERANK_DTYPE) -> int:
+    """Construiește indexul NumPy din colecția Chroma existentă (fără re-embedding)."""
+    ids, titles, summaries, embeddings, metadatas = read_chroma()
+    NumpyIndex.build(directory, ids, titles, summaries, embeddings, dtype=dtype, dim=dim,
+                     rerank_dtype=rerank_dtype, metadatas=metadatas)
+    return len(ids)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construiește indexul NumPy din colecția Chroma.")
+    parser.add_argument("--dir", default=INDEX_DIR)
+    parser.add_argument("--dtype", choices=DTYPES, default=INDEX_DTYPE)
+    parser.add_argument("--dim", type=int, default=INDEX_DIM, help="dimensiuni păstrate (0 = toate)")
+    parser.add_argument("--rerank-dtype", choices=RERANK_DTYPES, default=RERANK_DTYPE,
+                        help="copia float pentru rescoring la int8/binary")
+    args = parser.parse_args()
+    count = export_from_chroma(args.dir, args.dtype, args.dim, args.rerank_dtype)
+    print(f"Index NumPy scris în {args.dir}: {count} cărți ({args.dtype}, dim={args.dim or 'toate'}).")
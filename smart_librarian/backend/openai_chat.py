@@ -1,14 +1,27 @@
 # Chat cu OpenAI GPT
 import os
+import copy
+import asyncio
 import json
-from typing import Optional, Dict, Any, List
-from dotenv import load_dotenv
-from openai import OpenAI
-from backend.rag_retriever import search_books
-from tools.get_summary import get_summary_by_title
+import time
+import threading
+from collections import Counter
+from typing import Optional, Dict, Any, List, Iterator, Generator
+from backend.clients import get_openai_client, get_async_openai_client
+from backend.rag_retriever import search_books, asearch_books, cached_query_embedding, SEARCH_MODE
+from backend import answer_cache, confidence, telemetry
+from backend.context_builder import build_context
+from tools.get_summary import get_summary_by_title, resolve_title, SUMMARY_NOT_FOUND
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Cache semantic opțional (ANSWER_CACHE=true în .env)
+semantic_cache = answer_cache.SemanticAnswerCache()
+
+# Mod implicit: "two_step" (tool auto + al doilea apel) sau "single" (un singur apel)
+RECOMMEND_MODE = os.getenv("RECOMMEND_MODE", "two_step").lower()
+
+# De câte ori a fost luată fiecare cale prin pipeline
+_path_counts: Counter = Counter()
+_path_lock = threading.Lock()
 
 SYSTEM_PROMPT = (
     "Ești un asistent bibliotecar prietenos. Primești o întrebare a utilizatorului "
@@ -39,12 +52,92 @@ GET_SUMMARY_TOOL = {
 }
 
 
+# Tool forțat pentru modul "single": modelul întoarce direct titlul + argumentarea
+RECOMMEND_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "recommend_book",
+        "description": "Întoarce cartea recomandată și argumentarea pentru utilizator.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "title": {
+                    "type": "string",
+                    "description": "Titlul exact al cărții recomandate, din lista de candidați."
+                },
+                "justification": {
+                    "type": "string",
+                    "description": "Argumentarea recomandării în 2–4 fraze, în limba română."
+                }
+            },
+            "required": ["title", "justification"]
+        }
+    }
+}
+
+
+def _record_path(path: str) -> None:
+    with _path_lock:
+        _path_counts[path] += 1
+    telemetry.count("recommend_path", path=path)
+
+
+def _chat(stage: str, **request: Any) -> Any:
+    """chat.completions.create cronometrat ca etapă `stage` (pentru stream: _stream_chat)."""
+    with telemetry.span(stage, model=request.get("model"), stream=False):
+        completion = get_openai_client().chat.completions.create(**request)
+    telemetry.record_usage(stage, getattr(completion, "usage", None))
+    return completion
+
+
+def _stream_chat(stage: str, cancel_event: Optional[threading.Event], **request: Any) -> Iterator[Any]:
+    """
+    chat.completions.create cu stream=True, ca etapă `stage` care durează până la
+    ultimul chunk; tokenii vin în chunk-ul final (stream_options.include_usage).
+    """
+    chunks = _iter_chunks(stage, cancel_event, request)
+    return telemetry.span_iter(stage, chunks, model=request.get("model"), stream=True)
+
+
+async def _achat(stage: str, **request: Any) -> Any:
+    with telemetry.span(stage, model=request.get("model"), stream=False):
+        completion = await get_async_openai_client().chat.completions.create(**request)
+    telemetry.record_usage(stage, getattr(completion, "usage", None))
+    return completion
+
+
+def _answer_cache_embedding(user_query: str, bypass_cache: bool) -> Optional[List[float]]:
+    """
+    Cheia cache-ului semantic de răspunsuri: embedding-ul întrebării, dacă a fost deja
+    calculat de căutare. După o căutare fără embedding (lexical, hybrid decisiv) cache-ul
+    e sărit, ca să nu se plătească un apel de embeddings doar pentru el.
+    """
+    if not answer_cache.ENABLED or bypass_cache:
+        return None
+    return cached_query_embedding(user_query)
+
+
+def path_stats() -> Dict[str, int]:
+    """Contoare per cale: single, two_step, no_tool, fast_path, cache, no_candidates."""
+    with _path_lock:
+        return dict(_path_counts)
+
+
+class PipelineCancelled(Exception):
+    """Recomandarea a fost abandonată (ex. moderarea a blocat întrebarea între timp)."""
+
+
+def _check_cancelled(cancel_event: Optional[threading.Event]) -> None:
+    if cancel_event is not None and cancel_event.is_set():
+        raise PipelineCancelled()
+
+
 def _format_context(candidates: List[Dict[str, Any]]) -> str:
-    """Formatează candidații (titlu + rezumat scurt) pentru a fi oferiți modelului."""
-    lines = []
-    for i, b in enumerate(candidates, 1):
-        lines.append(f"{i}. {b['title']} — {b['summary']}")
-    return "\n".join(lines)
+    """
+    Formatează candidații (titlu + rezumat scurt) pentru a fi oferiți modelului:
+    fără aproape-duplicate și în limita CONTEXT_TOKEN_BUDGET (backend/context_builder.py).
+    """
+    return build_context(candidates).text
 
 
 def _guess_title_from_answer(answer: str, candidates: List[Dict[str, Any]]) -> Optional[str]:
@@ -61,38 +154,261 @@ def _guess_title_from_answer(answer: str, candidates: List[Dict[str, Any]]) -> O
     return candidates[0]["title"] if candidates else None
 
 
-def recommend_with_summary(user_query: str, top_k: int = 3) -> Dict[str, Any]:
+NO_CANDIDATES_RESULT: Dict[str, Any] = {
+    "answer": "Nu am găsit cărți relevante în colecție. Poți reformula sau adăuga alte teme?",
+    "candidates": [],
+    "full_summary": None,
+    "recommended_title": None,
+}
+
+
+def _build_messages(user_query: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Mesajele pentru primul pas LLM: întrebarea + candidații RAG."""
+    context = _format_context(candidates)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content":
+            f"Întrebarea utilizatorului: {user_query}\n\n"
+            f"Cărți candidate (titlu + rezumat scurt):\n{context}\n\n"
+            "Alege un singur titlu ca recomandare principală. "
+            "Dacă e potrivit, apelează tool-ul get_summary_by_title cu titlul exact."
+        }
+    ]
+
+
+def _run_tool_call(call: Dict[str, Any]) -> None:
+    """Execută local tool-ul cerut; completează call["title"] și call["result"]."""
+    call["title"], call["result"] = None, None
+    if call["name"] == "get_summary_by_title":
+        args = json.loads(call["arguments"] or "{}")
+        # titlul trimis de model poate diferi ușor de cel din catalog
+        with telemetry.span("tool.get_summary") as s:
+            call["title"] = resolve_title(args.get("title") or "") or args.get("title")
+            call["result"] = get_summary_by_title(call["title"] or "")
+            s.set(title=call["title"], found=call["result"] != SUMMARY_NOT_FOUND)
+
+
+def _append_tool_messages(messages: List[Dict[str, Any]], content: Optional[str],
+                          calls: List[Dict[str, Any]]):
+    """
+    Adaugă în conversație eco-ul "assistant" cu tool_calls + răspunsurile tool-ului
+    (apelurile sunt deja executate de _run_tool_call).
+    Întoarce (recommended_title, full_summary).
+    """
+    full_summary: Optional[str] = None
+    recommended_title: Optional[str] = None
+
+    # notă: content poate fi None când sunt doar tool_calls
+    assistant_msg: Dict[str, Any] = {
+        "role": "assistant",
+        "content": content or "",
+        "tool_calls": []
+    }
+    tool_msgs: List[Dict[str, Any]] = []
+    for call in calls:
+        if call["name"] == "get_summary_by_title":
+            recommended_title = call["title"]
+            full_summary = call["result"]
+
+            # păstrăm eco-ul tool_call-ului și adăugăm răspunsul tool-ului
+            assistant_msg["tool_calls"].append({
+                "id": call["id"],
+                "type": "function",
+                "function": {
+                    "name": call["name"],
+                    "arguments": call["arguments"],
+                },
+            })
+            tool_msgs.append({
+                "role": "tool",
+                "tool_call_id": call["id"],
+                "name": "get_summary_by_title",
+                "content": call["result"]
+            })
+    messages.append(assistant_msg)
+    messages.extend(tool_msgs)
+    return recommended_title, full_summary
+
+
+def _apply_tool_calls(msg: Any, messages: List[Dict[str, Any]]):
+    """Execută tool_calls dintr-un răspuns non-streaming și le adaugă în conversație."""
+    calls = []
+    for tc in msg.tool_calls:
+        call = {"id": tc.id, "name": tc.function.name, "arguments": tc.function.arguments}
+        _run_tool_call(call)
+        calls.append(call)
+    return _append_tool_messages(messages, msg.content, calls)
+
+
+def _result(answer: str, candidates: List[Dict[str, Any]], full_summary: Optional[str],
+            recommended_title: Optional[str]) -> Dict[str, Any]:
+    if not recommended_title:
+        recommended_title = _guess_title_from_answer(answer, candidates)
+    return {
+        "answer": answer,
+        "candidates": candidates,
+        "full_summary": full_summary,
+        "recommended_title": recommended_title,
+    }
+
+
+def _build_single_messages(user_query: str, context: str) -> List[Dict[str, Any]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content":
+            f"Întrebarea utilizatorului: {user_query}\n\n"
+            f"Cărți candidate (titlu + rezumat scurt):\n{context}\n\n"
+            "Alege un singur titlu ca recomandare principală și apelează recommend_book "
+            "cu titlul exact și argumentarea."
+        }
+    ]
+
+
+def _single_request(user_query: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Un singur apel cu tool forțat; titlul e restrâns la candidați prin enum."""
+    context = build_context(candidates)
+    tool = copy.deepcopy(RECOMMEND_TOOL)
+    # doar titlurile care au ajuns în prompt (fără duplicatele eliminate)
+    tool["function"]["parameters"]["properties"]["title"]["enum"] = [c["title"] for c in context.candidates]
+    return dict(
+        model="gpt-4o-mini",
+        messages=_build_single_messages(user_query, context.text),
+        tools=[tool],
+        tool_choice={"type": "function", "function": {"name": "recommend_book"}},
+        temperature=0.5,
+    )
+
+
+def _single_result(completion: Any, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Atașează local rezumatul complet la titlul ales — fără al doilea apel LLM."""
+    msg = completion.choices[0].message
+    args: Dict[str, Any] = {}
+    if getattr(msg, "tool_calls", None):
+        args = json.loads(msg.tool_calls[0].function.arguments or "{}")
+    justification = (args.get("justification") or msg.content or "Recomandare generată.").strip()
+    recommended_title = args.get("title")
+    if recommended_title:
+        recommended_title = resolve_title(recommended_title) or recommended_title
+
+    full_summary = get_summary_by_title(recommended_title) if recommended_title else None
+    if full_summary == SUMMARY_NOT_FOUND:
+        full_summary = None
+    answer = justification
+    if full_summary:
+        answer += f"\n\n**Rezumat complet — {recommended_title}:**\n{full_summary}"
+    return _result(answer, candidates, full_summary, recommended_title)
+
+
+def _recommend_single(
+    user_query: str,
+    candidates: List[Dict[str, Any]],
+    cancel_event: Optional[threading.Event] = None,
+) -> Dict[str, Any]:
+    """Modul "single": o singură completare, rezumatul complet e adăugat local."""
+    completion = _chat("llm.single", **_single_request(user_query, candidates))
+    _check_cancelled(cancel_event)
+    _record_path("single")
+    return _single_result(completion, candidates)
+
+
+async def _arecommend_single(user_query: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # contextul citește embedding-urile candidaților din vector store: în afara event loop-ului
+    request = await asyncio.to_thread(_single_request, user_query, candidates)
+    completion = await _achat("llm.single", **request)
+    _record_path("single")
+    return _single_result(completion, candidates)
+
+
+def recommend_with_summary(
+    user_query: str,
+    top_k: int = 3,
+    bypass_cache: bool = False,
+    mode: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
     """
     Pipeline complet:
       1) RAG: căutăm candidați în ChromaDB
       2) LLM: recomandare conversațională
       3) Function calling: obține rezumatul complet pentru titlul ales
       4) Returnăm răspunsul final + candidații + full_summary + recommended_title
+
+    `where` (ex. {"language": "en", "audience": "adolescenți"}) restrânge candidații
+    după metadatele din catalog; vezi search_books.
+
+    Cu ANSWER_CACHE=true, o întrebare aproape identică (aceiași candidați, embedding
+    peste prag) reutilizează răspunsul anterior; `bypass_cache=True` forțează LLM-ul.
+
+    `cancel_event` e verificat între etape; dacă e setat, ridică PipelineCancelled
+    (folosit de pipeline-ul speculativ din backend/pipeline.py).
+
+    `mode` ("two_step" / "single", implicit RECOMMEND_MODE): în modul "single" se
+    face o singură completare cu tool forțat (titlu + argumentare), iar rezumatul
+    complet e atașat local, fără al doilea apel.
     """
     # 1) RAG
-    candidates = search_books(user_query, top_k=top_k)
+    candidates = search_books(user_query, top_k=top_k, where=where)
+    _check_cancelled(cancel_event)
     if not candidates:
-        return {
-            "answer": "Nu am găsit cărți relevante în colecție. Poți reformula sau adăuga alte teme?",
-            "candidates": [],
-            "full_summary": None,
-            "recommended_title": None,
-        }
+        _record_path("no_candidates")
+        return dict(NO_CANDIDATES_RESULT)
 
-    context = _format_context(candidates)
+    query_emb = _answer_cache_embedding(user_query, bypass_cache)
+    use_cache = query_emb is not None
+    if use_cache:
+        cached = semantic_cache.get(query_emb, candidates)
+        if cached is not None:
+            _record_path("cache")
+            return cached
 
-    # 2) Primul pas LLM: recomandare + potențial tool call
-    messages: List[Dict[str, Any]] = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content":
-            f"Întrebarea utilizatorului: {user_query}\n\n"
-            f"Cărți candidate (titlu + rezumat scurt):\n{context}\n\n"
-            "Alege un singur titlu ca recomandare principală. "
-            "Dacă e potrivit, apelează tool-ul get_summary_by_title cu titlul exact."
-        }
-    ]
+    result = recommend_from_candidates(user_query, candidates, mode, cancel_event,
+                                       fast_path=SEARCH_MODE == "vector")
+    _check_cancelled(cancel_event)
+    if use_cache:
+        semantic_cache.put(query_emb, candidates, result)
+    return result
+
+
+def recommend_from_candidates(
+    user_query: str,
+    candidates: List[Dict[str, Any]],
+    mode: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+    fast_path: bool = True,
+) -> Dict[str, Any]:
+    """
+    Pașii LLM pentru candidați deja găsiți (fără RAG și fără cache semantic),
+    folosit și de rularea în lot din backend/batch.py.
+
+    Cu CONFIDENCE_GATE=true și `fast_path=True` (scorurile sunt distanțe vectoriale),
+    un prim candidat evident e returnat direct, cu argumentare șablon, fără LLM.
+    """
+    if not candidates:
+        _record_path("no_candidates")
+        return dict(NO_CANDIDATES_RESULT)
+    if fast_path:
+        fast = confidence.fast_path_result(user_query, candidates)
+        if fast is not None:
+            _record_path("fast_path")
+            return fast
+    mode = mode or RECOMMEND_MODE
+    with telemetry.span("recommend", mode=mode, candidates=len(candidates)):
+        if mode == "single":
+            return _recommend_single(user_query, candidates, cancel_event)
+        return _recommend_from_candidates(user_query, candidates, cancel_event)
 
-    first = client.chat.completions.create(
+
+def _recommend_from_candidates(
+    user_query: str,
+    candidates: List[Dict[str, Any]],
+    cancel_event: Optional[threading.Event] = None,
+) -> Dict[str, Any]:
+    """Pașii LLM + tool pentru o listă de candidați deja găsită."""
+    # 2) Primul pas LLM: recomandare + potențial tool call
+    messages = _build_messages(user_query, candidates)
+    first = _chat(
+        "llm.first",
         model="gpt-4o-mini",
         messages=messages,
         tools=[GET_SUMMARY_TOOL],
@@ -100,75 +416,246 @@ def recommend_with_summary(user_query: str, top_k: int = 3) -> Dict[str, Any]:
         temperature=0.5,
     )
 
+    _check_cancelled(cancel_event)
     msg = first.choices[0].message
 
     # 3) Dacă a cerut tool call, executăm local funcția și trimitem rezultatul înapoi
-    full_summary: Optional[str] = None
-    recommended_title: Optional[str] = None
-
     if getattr(msg, "tool_calls", None):
-        # atașăm în conversație "assistant" message-ul care a făcut tool_calls (eco)
-        # notă: msg.content poate fi None când sunt doar tool_calls
-        assistant_msg: Dict[str, Any] = {
-            "role": "assistant",
-            "content": msg.content or "",
-            "tool_calls": []
-        }
-
-        import json as _json
-        for call in msg.tool_calls:
-            if call.function.name == "get_summary_by_title":
-                args = _json.loads(call.function.arguments or "{}")
-                recommended_title = args.get("title")
-
-                # execută tool-ul local
-                tool_result = get_summary_by_title(recommended_title or "")
-                full_summary = tool_result
-
-                # păstrăm eco-ul tool_call-ului și adăugăm răspunsul tool-ului
-                assistant_msg["tool_calls"].append({
-                    "id": call.id,
-                    "type": "function",
-                    "function": {
-                        "name": call.function.name,
-                        "arguments": call.function.arguments,
-                    },
-                })
-                messages.append(assistant_msg)
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": call.id,
-                    "name": "get_summary_by_title",
-                    "content": tool_result
-                })
+        _record_path("two_step")
+        recommended_title, full_summary = _apply_tool_calls(msg, messages)
 
         # 4) Pas final LLM: compune răspunsul final folosind și rezumatul complet
-        second = client.chat.completions.create(
+        second = _chat(
+            "llm.second",
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.4,
         )
         final_answer = second.choices[0].message.content.strip()
+        return _result(final_answer, candidates, full_summary, recommended_title)
 
-        if not recommended_title:
-            recommended_title = _guess_title_from_answer(final_answer, candidates)
+    # Fallback: nu a apelat tool-ul — returnăm măcar recomandarea
+    _record_path("no_tool")
+    base_answer = msg.content.strip() if msg.content else "Recomandare generată."
+    return _result(base_answer, candidates, None, None)
 
-        return {
-            "answer": final_answer,
-            "candidates": candidates,
-            "full_summary": full_summary,
-            "recommended_title": recommended_title,
-        }
 
-    # Fallback: nu a apelat tool-ul — returnăm măcar recomandarea
+def _iter_chunks(stage: str, cancel_event: Optional[threading.Event], request: Dict[str, Any]) -> Iterator[Any]:
+    """
+    Pornește stream-ul și îi iterează chunk-urile, închizându-l imediat dacă pipeline-ul
+    e anulat. Timpul până la primul chunk, durata totală și tokenii ajung în telemetrie.
+    """
+    started = time.perf_counter()
+    stream = get_openai_client().chat.completions.create(
+        stream=True, stream_options={"include_usage": True}, **request
+    )
+    first_chunk = True
+    try:
+        for chunk in stream:
+            if first_chunk:
+                telemetry.observe("llm_first_chunk_seconds", time.perf_counter() - started, stage=stage)
+                first_chunk = False
+            if cancel_event is not None and cancel_event.is_set():
+                raise PipelineCancelled()
+            if getattr(chunk, "usage", None) is not None:
+                telemetry.record_usage(stage, chunk.usage)
+            if chunk.choices:
+                yield chunk.choices[0]
+    finally:
+        stream.close()
+    telemetry.observe("llm_stream_seconds", time.perf_counter() - started, stage=stage)
+
+
+def _stream_from_candidates(
+    user_query: str,
+    candidates: List[Dict[str, Any]],
+    cancel_event: Optional[threading.Event] = None,
+) -> Generator[Dict[str, Any], None, Dict[str, Any]]:
+    """
+    Ca _recommend_from_candidates, dar cu stream=True: emite delta-urile de text
+    pe măsură ce sosesc. Tool call-urile sunt asamblate din delta-uri și executate
+    de îndată ce argumentele lor sunt complete (începe următorul sau se termină stream-ul).
+    """
+    messages = _build_messages(user_query, candidates)
+    first = _stream_chat(
+        "llm.first",
+        cancel_event,
+        model="gpt-4o-mini",
+        messages=messages,
+        tools=[GET_SUMMARY_TOOL],
+        tool_choice="auto",
+        temperature=0.5,
+    )
+
+    parts: List[str] = []
+    calls: Dict[int, Dict[str, Any]] = {}
+
+    def finish_calls(below: Optional[int] = None) -> None:
+        for idx, call in calls.items():
+            if "result" not in call and (below is None or idx < below):
+                _run_tool_call(call)
+
+    for choice in first:
+        delta = choice.delta
+        if delta.content:
+            parts.append(delta.content)
+            yield {"type": "delta", "text": delta.content}
+        for tc in delta.tool_calls or []:
+            # a început alt tool call -> cele anterioare au argumentele complete
+            finish_calls(below=tc.index)
+            call = calls.setdefault(tc.index, {"id": None, "name": "", "arguments": ""})
+            if tc.id:
+                call["id"] = tc.id
+            if tc.function and tc.function.name:
+                call["name"] += tc.function.name
+            if tc.function and tc.function.arguments:
+                call["arguments"] += tc.function.arguments
+        if choice.finish_reason:
+            finish_calls()
+
+    if not calls:
+        # Fallback: nu a apelat tool-ul — returnăm măcar recomandarea
+        _record_path("no_tool")
+        base_answer = "".join(parts).strip() or "Recomandare generată."
+        return _result(base_answer, candidates, None, None)
+
+    finish_calls()
+    _record_path("two_step")
+    recommended_title, full_summary = _append_tool_messages(
+        messages, "".join(parts), [calls[i] for i in sorted(calls)]
+    )
+    second = _stream_chat(
+        "llm.second",
+        cancel_event,
+        model="gpt-4o-mini",
+        messages=messages,
+        temperature=0.4,
+    )
+    for choice in second:
+        if choice.delta.content:
+            parts.append(choice.delta.content)
+            yield {"type": "delta", "text": choice.delta.content}
+    return _result("".join(parts).strip(), candidates, full_summary, recommended_title)
+
+
+def stream_recommend_with_summary(
+    user_query: str,
+    top_k: int = 3,
+    bypass_cache: bool = False,
+    mode: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Varianta streaming a recommend_with_summary. Emite evenimente:
+      - {"type": "delta", "text": ...}  fragmente din răspuns, pe măsură ce sosesc
+      - {"type": "done", "result": {...}}  rezultatul complet (aceleași chei ca la
+        recommend_with_summary), mereu ultimul eveniment
+    """
+    candidates = search_books(user_query, top_k=top_k, where=where)
+    _check_cancelled(cancel_event)
+    if not candidates:
+        _record_path("no_candidates")
+        result = dict(NO_CANDIDATES_RESULT)
+        yield {"type": "delta", "text": result["answer"]}
+        yield {"type": "done", "result": result}
+        return
+
+    query_emb = _answer_cache_embedding(user_query, bypass_cache)
+    use_cache = query_emb is not None
+    if use_cache:
+        cached = semantic_cache.get(query_emb, candidates)
+        if cached is not None:
+            _record_path("cache")
+            yield {"type": "delta", "text": cached["answer"]}
+            yield {"type": "done", "result": cached}
+            return
+
+    fast = confidence.fast_path_result(user_query, candidates) if SEARCH_MODE == "vector" else None
+    if fast is not None:
+        _record_path("fast_path")
+        result = fast
+        yield {"type": "delta", "text": result["answer"]}
+    elif (mode or RECOMMEND_MODE) == "single":
+        # argumentarea vine în argumentele tool-ului forțat; o emitem dintr-o bucată
+        with telemetry.span("recommend", mode="single", candidates=len(candidates), stream=True):
+            result = _recommend_single(user_query, candidates, cancel_event)
+        yield {"type": "delta", "text": result["answer"]}
+    else:
+        result = yield from telemetry.span_iter(
+            "recommend", _stream_from_candidates(user_query, candidates, cancel_event),
+            mode="two_step", candidates=len(candidates), stream=True,
+        )
+    _check_cancelled(cancel_event)
+    if use_cache:
+        semantic_cache.put(query_emb, candidates, result)
+    yield {"type": "done", "result": result}
+
+
+async def arecommend_with_summary(
+    user_query: str,
+    top_k: int = 3,
+    bypass_cache: bool = False,
+    mode: Optional[str] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Varianta asyncio a recommend_with_summary (AsyncOpenAI, Chroma în thread separat)."""
+    candidates = await asearch_books(user_query, top_k=top_k, where=where)
+    if not candidates:
+        _record_path("no_candidates")
+        return dict(NO_CANDIDATES_RESULT)
+
+    query_emb = _answer_cache_embedding(user_query, bypass_cache)
+    use_cache = query_emb is not None
+    if use_cache:
+        cached = semantic_cache.get(query_emb, candidates)
+        if cached is not None:
+            _record_path("cache")
+            return cached
+
+    fast = confidence.fast_path_result(user_query, candidates) if SEARCH_MODE == "vector" else None
+    if fast is not None:
+        _record_path("fast_path")
+        return fast
+
+    mode = mode or RECOMMEND_MODE
+    with telemetry.span("recommend", mode=mode, candidates=len(candidates)):
+        if mode == "single":
+            result = await _arecommend_single(user_query, candidates)
+        else:
+            result = await _arecommend_from_candidates(user_query, candidates)
+    if use_cache:
+        semantic_cache.put(query_emb, candidates, result)
+    return result
+
+
+async def _arecommend_from_candidates(user_query: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    messages = await asyncio.to_thread(_build_messages, user_query, candidates)
+    first = await _achat(
+        "llm.first",
+        model="gpt-4o-mini",
+        messages=messages,
+        tools=[GET_SUMMARY_TOOL],
+        tool_choice="auto",
+        temperature=0.5,
+    )
+    msg = first.choices[0].message
+
+    if getattr(msg, "tool_calls", None):
+        _record_path("two_step")
+        recommended_title, full_summary = _apply_tool_calls(msg, messages)
+        second = await _achat(
+            "llm.second",
+            model="gpt-4o-mini",
+            messages=messages,
+            temperature=0.4,
+        )
+        final_answer = second.choices[0].message.content.strip()
+        return _result(final_answer, candidates, full_summary, recommended_title)
+
+    _record_path("no_tool")
     base_answer = msg.content.strip() if msg.content else "Recomandare generată."
-    recommended_title = _guess_title_from_answer(base_answer, candidates)
-    return {
-        "answer": base_answer,
-        "candidates": candidates,
-        "full_summary": None,
-        "recommended_title": recommended_title,
-    }
+    return _result(base_answer, candidates, None, None)
 
 
 # Opțional: menținem și o funcție simplă (din pasul 3) dacă vrei doar recomandarea scurtă
@@ -190,7 +677,7 @@ def recommend_book(user_query: str, top_k: int = 3) -> Dict[str, Any]:
             f"Cărți candidate:\n{context}\n\nAlege și argumentează scurt."
         }
     ]
-    completion = client.chat.completions.create(
+    completion = get_openai_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=messages,
         temperature=0.5
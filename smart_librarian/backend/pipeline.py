@@ -0,0 +1,198 @@
+# Pipeline moderare + recomandare (cu execuție speculativă)
+import os
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from backend import telemetry
+from backend.filters import moderate_text, amoderate_text
+from backend.openai_chat import (
+    recommend_with_summary,
+    arecommend_with_summary,
+    stream_recommend_with_summary,
+    PipelineCancelled,
+)
+
+# Config din .env: pornește recomandarea în paralel cu moderarea (opt-in: întrebările
+# blocate plătesc și ele căutarea și primul apel LLM, iar textul nemoderat ajunge la model)
+SPECULATIVE = os.getenv("SPECULATIVE_PIPELINE", "false").lower() == "true"
+# Config din .env: frontend-urile afișează răspunsul token cu token
+STREAMING = os.getenv("STREAM_ANSWERS", "true").lower() == "true"
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="pipeline")
+
+
+def moderated_recommend(
+    user_query: str,
+    top_k: int = 3,
+    speculative: Optional[bool] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+    """
+    Returnează (blocked, message, out):
+      - blocked=True  -> message e răspunsul sigur pentru UI, out=None
+      - blocked=False -> out e rezultatul recommend_with_summary
+
+    În modul speculativ, moderarea, căutarea RAG și primul apel LLM pornesc
+    simultan. Dacă moderarea blochează, recomandarea e anulată la următorul
+    punct de control și rezultatul ei nu este returnat niciodată.
+    """
+    if speculative is None:
+        speculative = SPECULATIVE
+
+    # span-ul rădăcină: moderarea și recomandarea (chiar și din executor) sunt copiii lui
+    with telemetry.span("request", speculative=speculative) as root:
+        blocked, msg, out = _moderated_recommend(user_query, top_k, speculative, where)
+        root.set(blocked=blocked)
+        return blocked, msg, out
+
+
+def _moderated_recommend(
+    user_query: str,
+    top_k: int,
+    speculative: bool,
+    where: Optional[Dict[str, Any]] = None,
+) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+    if not speculative:
+        blocked, msg, _raw = moderate_text(user_query)
+        if blocked:
+            return True, msg, None
+        return False, "", recommend_with_summary(user_query, top_k=top_k, where=where)
+
+    cancel = threading.Event()
+    rec_future = _executor.submit(
+        telemetry.propagate(recommend_with_summary), user_query, top_k, cancel_event=cancel, where=where
+    )
+    try:
+        blocked, msg, _raw = moderate_text(user_query)
+    except Exception:
+        cancel.set()
+        raise
+    if blocked:
+        cancel.set()
+        rec_future.cancel()
+        return True, msg, None
+
+    return False, "", rec_future.result()
+
+
+_STREAM_END = object()
+
+
+def stream_moderated_recommend(
+    user_query: str,
+    top_k: int = 3,
+    speculative: Optional[bool] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Varianta streaming a moderated_recommend. Emite fie un singur
+    {"type": "blocked", "message": ...}, fie evenimentele din
+    stream_recommend_with_summary ("delta"... apoi "done").
+
+    În modul speculativ, stream-ul pornește imediat, dar delta-urile sunt
+    ținute într-o coadă până trece moderarea; dacă aceasta blochează,
+    stream-ul e anulat și nimic din el nu ajunge la apelant.
+    """
+    if speculative is None:
+        speculative = SPECULATIVE
+    # span-ul rădăcină durează până la ultimul eveniment (sau până când apelantul abandonează)
+    events = _stream_moderated_recommend(user_query, top_k, speculative, where)
+    return telemetry.span_iter("request", events, speculative=speculative, stream=True)
+
+
+def _stream_moderated_recommend(
+    user_query: str,
+    top_k: int,
+    speculative: bool,
+    where: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    if not speculative:
+        blocked, msg, _raw = moderate_text(user_query)
+        telemetry.annotate(blocked=blocked)
+        if blocked:
+            yield {"type": "blocked", "message": msg}
+            return
+        yield from stream_recommend_with_summary(user_query, top_k=top_k, where=where)
+        return
+
+    cancel = threading.Event()
+    events: "queue.Queue[Any]" = queue.Queue()
+
+    def produce() -> None:
+        try:
+            for event in stream_recommend_with_summary(user_query, top_k, cancel_event=cancel, where=where):
+                events.put(event)
+        except PipelineCancelled:
+            pass
+        except Exception as e:
+            events.put({"type": "error", "error": e})
+        finally:
+            events.put(_STREAM_END)
+
+    _executor.submit(telemetry.propagate(produce))
+    try:
+        blocked, msg, _raw = moderate_text(user_query)
+    except Exception:
+        cancel.set()
+        raise
+    telemetry.annotate(blocked=blocked)
+    if blocked:
+        cancel.set()
+        yield {"type": "blocked", "message": msg}
+        return
+
+    try:
+        while True:
+            event = events.get()
+            if event is _STREAM_END:
+                return
+            if event["type"] == "error":
+                raise event["error"]
+            yield event
+    finally:
+        # apelantul poate abandona generatorul înainte de final
+        cancel.set()
+
+
+async def amoderated_recommend(
+    user_query: str,
+    top_k: int = 3,
+    speculative: Optional[bool] = None,
+    where: Optional[Dict[str, Any]] = None,
+) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+    """Varianta asyncio: în modul speculativ, task-ul de recomandare e anulat direct la blocare."""
+    if speculative is None:
+        speculative = SPECULATIVE
+
+    # task-ul de recomandare copiază contextul la creare, deci e tot copilul span-ului rădăcină
+    with telemetry.span("request", speculative=speculative) as root:
+        blocked, msg, out = await _amoderated_recommend(user_query, top_k, speculative, where)
+        root.set(blocked=blocked)
+        return blocked, msg, out
+
+
+async def _amoderated_recommend(
+    user_query: str,
+    top_k: int,
+    speculative: bool,
+    where: Optional[Dict[str, Any]] = None,
+) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+    if not speculative:
+        blocked, msg, _raw = await amoderate_text(user_query)
+        if blocked:
+            return True, msg, None
+        return False, "", await arecommend_with_summary(user_query, top_k=top_k, where=where)
+
+    rec_task = asyncio.ensure_future(arecommend_with_summary(user_query, top_k=top_k, where=where))
+    try:
+        blocked, msg, _raw = await amoderate_text(user_query)
+    except BaseException:
+        rec_task.cancel()
+        raise
+    if blocked:
+        rec_task.cancel()
+        return True, msg, None
+    return False, "", await rec_task
@@ -1,44 +1,180 @@
 # Funcții de RAG, interogare vector store
 import os
-import openai
-import chromadb
-from chromadb.utils import embedding_functions
-from dotenv import load_dotenv
-
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
-
-# Embedding function
-openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-    api_key=openai.api_key,
-    model_name="text-embedding-3-small"
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from backend.clients import (
+    EMBED_MODEL,
+    EMBED_DIMENSIONS,
+    get_async_openai_client,
+    get_embedding_function,
 )
+from backend.embedding_cache import EmbeddingCache
+from backend.retrievers import get_retriever
+from backend.lexical_index import get_lexical_index
+from backend.metadata_filter import normalize_where
+from backend import telemetry
 
-client = chromadb.PersistentClient(path="chroma_db")
-collection = client.get_or_create_collection(
-    "books",
-    embedding_function=openai_ef
-)
+# Config din .env: vector (implicit) | hybrid (BM25 + vector, cu fast path local) | lexical
+SEARCH_MODE = os.getenv("SEARCH_MODE", "vector").lower()
+# câți candidați din fiecare listă intră în fuziune, și constanta k din RRF
+HYBRID_DEPTH = int(os.getenv("HYBRID_DEPTH", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# cheia de cache include dimensiunea: vectorii de 512 și de 1536 nu se amestecă
+_CACHE_MODEL = f"{EMBED_MODEL}@{EMBED_DIMENSIONS}" if EMBED_DIMENSIONS else EMBED_MODEL
+
+# De câte ori a fost luată fiecare cale de căutare ("lexical_fast" = fără embedding)
+_search_counts: Counter = Counter()
+_search_lock = threading.Lock()
+
+# Cache pentru embedding-urile întrebărilor (LRU în proces + SQLite pe disc),
+# deschis la prima întrebare, nu la import
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+def query_embedding_cache() -> EmbeddingCache:
+    global _query_cache
+    if _query_cache is None:
+        with _query_cache_lock:
+            if _query_cache is None:
+                _query_cache = EmbeddingCache()
+    return _query_cache
+
+def _embed_api(texts):
+    with telemetry.span("embedding.api", model=EMBED_MODEL, inputs=len(texts)):
+        return get_embedding_function()(texts)
+
+def embed_query(query):
+    """Embedding-ul întrebării, din cache dacă a mai fost văzută."""
+    with telemetry.span("embedding"):
+        return query_embedding_cache().get_or_compute(
+            query, _CACHE_MODEL, lambda text: _embed_api([text])[0]
+        )
+
+def cached_query_embedding(query):
+    """
+    Embedding-ul întrebării doar dacă e deja în cache (calculat de căutarea vectorială
+    sau văzut anterior), fără apel de rețea; None după o căutare pur lexicală.
+    """
+    return query_embedding_cache().peek(query, _CACHE_MODEL)
+
+def embed_queries(queries):
+    """Embedding-uri pentru mai multe întrebări: cele lipsă din cache, într-un singur request."""
+    queries = list(queries)
+    with telemetry.span("embedding.batch", queries=len(queries)):
+        return query_embedding_cache().get_or_compute_many(queries, _CACHE_MODEL, _embed_api)
+
+async def aembed_query(query):
+    """Varianta async a embed_query (AsyncOpenAI), cu același cache."""
+    async def _embed(text):
+        with telemetry.span("embedding.api", model=EMBED_MODEL, inputs=1):
+            extra = {"dimensions": EMBED_DIMENSIONS} if EMBED_DIMENSIONS else {}
+            resp = await get_async_openai_client().embeddings.create(model=EMBED_MODEL, input=[text], **extra)
+            telemetry.record_usage("embedding.api", getattr(resp, "usage", None))
+        return resp.data[0].embedding
+    with telemetry.span("embedding"):
+        return await query_embedding_cache().aget_or_compute(query, _CACHE_MODEL, _embed)
+
+def _record_search(path: str) -> None:
+    with _search_lock:
+        _search_counts[path] += 1
+    telemetry.count("search_path", path=path)
+
+def search_stats() -> Dict[str, int]:
+    """Numărul de căutări pe fiecare cale, pentru a urmări ponderea fast path-ului."""
+    with _search_lock:
+        return dict(_search_counts)
+
+def rrf_fuse(rankings: List[List[Dict[str, Any]]], top_k: int, k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Reciprocal-rank fusion: scor = Σ 1 / (k + rang). Nu depinde de scara
+    scorurilor (distanță vs BM25), doar de poziții. score = scorul RRF (mai mare = mai bun).
+    """
+    fused: Dict[str, float] = {}
+    books: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, book in enumerate(ranking, 1):
+            fused[book["id"]] = fused.get(book["id"], 0.0) + 1.0 / (k + rank)
+            books.setdefault(book["id"], book)
+    top = sorted(fused, key=lambda doc_id: -fused[doc_id])[:top_k]
+    return [{**books[doc_id], "score": fused[doc_id]} for doc_id in top]
+
+def _retrieve(query_embeddings, top_k, where=None):
+    """Interogarea vector store-ului (Chroma sau NumPy), cronometrată separat de embedding."""
+    retriever = get_retriever()
+    with telemetry.span("retrieval", backend=retriever.name, queries=len(query_embeddings), top_k=top_k,
+                        filtered=bool(where)):
+        return retriever.query(query_embeddings, top_k, where=where)
+
+def _anchor_embedding(lexical: List[Dict[str, Any]]) -> Optional[List[float]]:
+    """
+    Pentru o potrivire lexicală decisivă, embedding-ul deja stocat al primei cărți
+    ține loc de embedding al întrebării („ceva ca Fahrenheit 451” -> vecinii ei).
+    """
+    if not lexical:
+        return None
+    return get_retriever().get_embeddings([lexical[0]["id"]])[0]
+
+def _lexical_first(query, top_k, where=None):
+    """Pasul lexical comun variantelor sync/async: (rezultate, embedding ancoră sau None)."""
+    lexical, decisive = get_lexical_index().search(query, max(top_k, HYBRID_DEPTH), where=where)
+    anchor = _anchor_embedding(lexical) if decisive else None
+    return lexical, anchor
+
+def search_books(query, top_k=3, mode=None, where=None):
+    """
+    Top-k cărți pentru întrebare, ca listă de {id, title, summary, score}.
+
+    `where` filtrează după metadatele din catalog, înainte de top-k, în sintaxa Chroma:
+    {"language": "en", "year": {"$gte": 1950}}, {"genre": {"$in": ["fantasy", "distopie"]}}.
+    Cu SHARD_KEY, un filtru pe câmpul de partiționare interoghează doar shard-urile lui.
+
+    `mode` (implicit SEARCH_MODE):
+      - "vector":  embedding + vector store; score = distanță (mai mic = mai bun)
+      - "lexical": doar BM25 local, fără niciun apel de rețea; score = BM25
+      - "hybrid":  BM25 + vector, combinate prin RRF; score = RRF. Dacă potrivirea
+                   lexicală e decisivă, embedding-ul întrebării nu se mai calculează
+                   (se folosește vectorul stocat al cărții găsite).
+    """
+    mode = (mode or SEARCH_MODE).lower()
+    where = normalize_where(where)
+    with telemetry.span("search", mode=mode, top_k=top_k):
+        if mode == "lexical":
+            _record_search("lexical")
+            return get_lexical_index().search(query, top_k, where=where)[0]
+        if mode == "hybrid":
+            lexical, anchor = _lexical_first(query, top_k, where)
+            _record_search("lexical_fast" if anchor is not None else "hybrid")
+            embedding = anchor if anchor is not None else embed_query(query)
+            vector = _retrieve([embedding], max(top_k, HYBRID_DEPTH), where)[0]
+            return rrf_fuse([lexical, vector], top_k)
+        _record_search("vector")
+        return _retrieve([embed_query(query)], top_k, where)[0]
 
-def search_books(query, top_k=3):
-    results = collection.query(
-        query_texts=[query],
-        n_results=top_k
-    )
-    books_found = []
-    for doc_id, meta, doc, score in zip(
-        results["ids"][0],
-        results["metadatas"][0],
-        results["documents"][0],
-        results["distances"][0]
-    ):
-        books_found.append({
-            "id": doc_id,
-            "title": meta["title"],
-            "summary": doc,
-            "score": score
-        })
-    return books_found
+async def asearch_books(query, top_k=3, mode=None, where=None):
+    """Varianta asyncio: embedding async, iar interogarea (blocantă) rulează în thread."""
+    mode = (mode or SEARCH_MODE).lower()
+    where = normalize_where(where)
+    with telemetry.span("search", mode=mode, top_k=top_k):
+        if mode == "lexical":
+            _record_search("lexical")
+            # prima căutare construiește și indexul (secunde pe cataloage mari): tot în thread
+            results, _decisive = await asyncio.to_thread(
+                lambda: get_lexical_index().search(query, top_k, where=where)
+            )
+            return results
+        if mode == "hybrid":
+            lexical, anchor = await asyncio.to_thread(_lexical_first, query, top_k, where)
+            _record_search("lexical_fast" if anchor is not None else "hybrid")
+            embedding = anchor if anchor is not None else await aembed_query(query)
+            vector = (await asyncio.to_thread(_retrieve, [embedding], max(top_k, HYBRID_DEPTH), where))[0]
+            return rrf_fuse([lexical, vector], top_k)
+        _record_search("vector")
+        embedding = await aembed_query(query)
+        results = await asyncio.to_thread(_retrieve, [embedding], top_k, where)
+        return results[0]
 
 if __name__ == "__main__":
     query = input("Scrie o tema sau un context pentru căutare: ")
@@ -0,0 +1,112 @@
+# Backend-uri de căutare vectorială (ChromaDB sau index NumPy în proces)
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from backend import shards
+from backend.metadata_filter import FilterError, normalize_where
+
+# Config din .env: "chroma" (implicit) sau "numpy"
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "chroma").lower()
+
+
+class Retriever:
+    """
+    Interfața comună: primește embeddings deja calculate și întoarce, pentru
+    fiecare, top-k înregistrări {id, title, summary, score} (score = distanță,
+    mai mic = mai relevant). `where` (sintaxa Chroma) restrânge căutarea la cărțile
+    ale căror metadate se potrivesc, înainte de top-k.
+    """
+
+    name = "base"
+
+    def query(self, query_embeddings: Sequence[Sequence[float]], top_k: int = 3,
+              where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        raise NotImplementedError
+
+    def get_embeddings(self, ids: Sequence[str]) -> List[Optional[List[float]]]:
+        """Embedding-urile stocate pentru id-urile date (None dacă lipsesc)."""
+        raise NotImplementedError
+
+
+class ChromaRetriever(Retriever):
+    """
+    Colecția unică sau, cu SHARD_KEY, shard-urile alese de router după filtru:
+    interogate în paralel, iar top-k-urile lor combinate după distanță.
+    """
+
+    name = "chroma"
+
+    @staticmethod
+    def _query_one(collection, query_embeddings, top_k, where):
+        try:
+            results = collection.query(
+                query_embeddings=query_embeddings,
+                n_results=top_k,
+                where=where,
+            )
+        except ValueError as e:
+            # validarea `where` din clientul Chroma: tot o eroare a filtrului, nu a serviciului
+            if where:
+                raise FilterError(str(e)) from e
+            raise
+        out = []
+        for ids, metas, docs, scores in zip(
+            results["ids"], results["metadatas"], results["documents"], results["distances"]
+        ):
+            out.append([
+                {"id": doc_id, "title": meta["title"], "summary": doc, "score": score}
+                for doc_id, meta, doc, score in zip(ids, metas, docs, scores)
+            ])
+        return out
+
+    def query(self, query_embeddings, top_k=3, where=None):
+        query_embeddings = list(query_embeddings)
+        where = normalize_where(where)
+        names = shards.route(where)
+        per_shard = shards.fan_out(names, lambda c: self._query_one(c, query_embeddings, top_k, where))
+        if len(per_shard) == 1:
+            return per_shard[0]
+        return [shards.merge([results[i] for results in per_shard], top_k) for i in range(len(query_embeddings))]
+
+    def get_embeddings(self, ids):
+        ids = list(ids)
+        by_id: Dict[str, Any] = {}
+        # id-ul nu spune shard-ul; o căutare după id-uri e ieftină în fiecare
+        for found in shards.fan_out(shards.shard_names(), lambda c: c.get(ids=ids, include=["embeddings"])):
+            by_id.update(zip(found["ids"], found["embeddings"]))
+        return [by_id.get(doc_id) for doc_id in ids]
+
+
+class NumpyRetriever(Retriever):
+    name = "numpy"
+
+    def __init__(self, directory: Optional[str] = None):
+        from backend.numpy_index import NumpyIndex, INDEX_DIR
+        self.index = NumpyIndex(directory or INDEX_DIR)
+
+    def query(self, query_embeddings, top_k=3, where=None):
+        return self.index.search(query_embeddings, top_k, where=normalize_where(where))
+
+    def get_embeddings(self, ids):
+        return self.index.get_embeddings(ids)
+
+
+_BACKENDS = {"chroma": ChromaRetriever, "numpy": NumpyRetriever}
+_instances: Dict[str, Retriever] = {}
+_lock = threading.Lock()
+
+
+def get_retriever(name: Optional[str] = None) -> Retriever:
+    """Instanța (unică per proces) a backend-ului ales prin RETRIEVER_BACKEND."""
+    name = (name or RETRIEVER_BACKEND).lower()
+    if name not in _BACKENDS:
+        raise ValueError(f"RETRIEVER_BACKEND necunoscut: {name} (alege: {', '.join(_BACKENDS)})")
+    retriever = _instances.get(name)
+    if retriever is None:
+        with _lock:
+            retriever = _instances.get(name)
+            if retriever is None:
+                retriever = _BACKENDS[name]()
+                _instances[name] = retriever
+    return retriever
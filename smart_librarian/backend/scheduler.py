@@ -0,0 +1,441 @@
+# Planificator comun pentru apelurile OpenAI: cote per endpoint, priorități, reîncercări cu backoff
+import os
+import json
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import threading
+import contextlib
+import contextvars
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from backend import telemetry
+
+# Config din .env
+ENABLED = os.getenv("SCHEDULER", "true").lower() == "true"
+# cote RPM:TPM per endpoint (0 = nelimitat), ex. "chat=5000:2000000,images=50"; endpoint-urile
+# nelistate nu sunt limitate până când serverul își anunță cota (x-ratelimit-limit-*)
+RATE_LIMITS_SPEC = os.getenv("OPENAI_RATE_LIMITS", "")
+MAX_RETRIES = int(os.getenv("SCHEDULER_MAX_RETRIES", "6"))
+BACKOFF_BASE = float(os.getenv("SCHEDULER_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("SCHEDULER_BACKOFF_MAX", "30"))
+# câte secunde de cotă se pot acumula și consuma dintr-o dată (60 = fereastra pe minut a cotei)
+BURST_SECONDS = float(os.getenv("SCHEDULER_BURST_SECONDS", "60"))
+# partea din capacitate pe care cererile batch nu o pot consuma (rămâne pentru cele interactive)
+INTERACTIVE_RESERVE = float(os.getenv("SCHEDULER_INTERACTIVE_RESERVE", "0.2"))
+# tokeni de completare presupuși când cererea de chat nu are max_tokens
+COMPLETION_TOKENS = int(os.getenv("SCHEDULER_COMPLETION_TOKENS", "400"))
+
+INTERACTIVE, BATCH = 0, 1
+PRIORITIES = {"interactive": INTERACTIVE, "batch": BATCH}
+_PRIORITY_NAMES = {v: k for k, v in PRIORITIES.items()}
+
+# calea din URL -> numele endpoint-ului din cote
+ENDPOINTS = {
+    "chat/completions": "chat",
+    "embeddings": "embeddings",
+    "moderations": "moderations",
+    "audio/speech": "speech",
+    "audio/transcriptions": "transcriptions",
+    "images/generations": "images",
+}
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+# după un 429, rata scade multiplicativ și revine treptat la fiecare succes
+_DECREASE = 0.7
+_INCREASE = 0.01
+_MIN_FACTOR = 0.1
+# cât așteaptă între verificări cine nu e primul la rând
+_POLL = 0.05
+
+_priority: "contextvars.ContextVar[int]" = contextvars.ContextVar("scheduler_priority", default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def priority(name: str) -> Iterator[None]:
+    """with priority("batch"): ... — apelurile OpenAI din bloc cedează locul celor interactive."""
+    token = _priority.set(PRIORITIES[name])
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """"chat=500:200000,images=5" -> {"chat": (500, 200000), "images": (5, 0)}"""
+    limits: Dict[str, Tuple[float, float]] = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, quota = item.partition("=")
+        rpm, _, tpm = quota.partition(":")
+        limits[name.strip()] = (float(rpm or 0), float(tpm or 0))
+    return limits
+
+
+def _text_tokens(value: Any) -> int:
+    """Estimare ieftină (~4 caractere / token) pentru conținutul unui mesaj sau input."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value) // 4 + 1
+    if isinstance(value, list):
+        if value and all(isinstance(v, int) for v in value):
+            return len(value)  # input deja tokenizat
+        return sum(_text_tokens(v.get("text") if isinstance(v, dict) else v) for v in value)
+    return 0
+
+
+def estimate_tokens(endpoint: str, request: httpx.Request) -> int:
+    """Tokenii pe care OpenAI îi va număra în TPM pentru cerere (prompt + max_tokens la chat)."""
+    if endpoint not in ("chat", "embeddings"):
+        return 0
+    if not request.headers.get("content-type", "").startswith("application/json"):
+        return 0
+    try:
+        body = json.loads(request.content)
+    except ValueError:
+        return 0
+    if endpoint == "embeddings":
+        inputs = body.get("input")
+        return sum(_text_tokens(x) for x in (inputs if isinstance(inputs, list) else [inputs]))
+    prompt = sum(_text_tokens(m.get("content")) for m in body.get("messages", []))
+    if body.get("tools"):
+        prompt += _text_tokens(json.dumps(body["tools"]))
+    return prompt + int(body.get("max_completion_tokens") or body.get("max_tokens") or COMPLETION_TOKENS)
+
+
+def retry_after(headers: httpx.Headers) -> Optional[float]:
+    """Secundele cerute de server (retry-after-ms / retry-after: secunde sau dată HTTP)."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt: int, server_delay: Optional[float] = None) -> float:
+    """Retry-After dacă serverul l-a dat (+10% jitter), altfel exponențial cu full jitter."""
+    if server_delay is not None:
+        return min(server_delay, BACKOFF_MAX) * (1.0 + random.uniform(0.0, 0.1))
+    return random.uniform(0.0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _should_retry(response: httpx.Response) -> bool:
+    hint = response.headers.get("x-should-retry")
+    if hint in ("true", "false"):
+        return hint == "true"
+    return response.status_code in RETRYABLE_STATUS
+
+
+class _Bucket:
+    __slots__ = ("per_minute", "rate", "capacity", "level")
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.level = self.capacity
+
+    def resize(self, per_minute: float) -> None:
+        """Cota anunțată de server s-a schimbat (alt tier): aceeași rezervă, altă capacitate."""
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.level = min(self.level, self.capacity)
+
+
+class EndpointLimiter:
+    """
+    Token bucket-uri pentru cereri/minut și tokeni/minut ale unui endpoint, cu o
+    coadă de priorități: doar primul din coadă poate consuma cota, iar o cerere
+    batch pleacă doar dacă lasă neatinsă rezerva INTERACTIVE_RESERVE.
+    Cererile mai mari decât capacitatea pleacă cu bucket-ul plin și îl lasă pe minus.
+    O cotă nedată explicit e învățată din header-ele x-ratelimit-limit-* ale răspunsurilor;
+    până atunci endpoint-ul nu e limitat (429-urile sunt tratate oricum).
+    """
+
+    def __init__(self, name: str, rpm: float = 0.0, tpm: float = 0.0):
+        self.name = name
+        self.requests = _Bucket(rpm) if rpm else None
+        self.tokens = _Bucket(tpm) if tpm else None
+        self._learn = {"requests": not rpm, "tokens": not tpm}
+        self.factor = 1.0
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._waiters: List[Tuple[int, int]] = []  # heap (prioritate, ordinea sosirii)
+        self._seq = itertools.count()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.level = min(bucket.capacity, bucket.level + elapsed * bucket.rate * self.factor)
+
+    def _wait_time(self, cost: int, prio: int, now: float) -> float:
+        wait = max(0.0, self.paused_until - now)
+        for bucket, amount in ((self.requests, 1.0), (self.tokens, float(cost))):
+            if bucket is None:
+                continue
+            need = min(amount, bucket.capacity)
+            if prio != INTERACTIVE:
+                need = min(bucket.capacity, need + INTERACTIVE_RESERVE * bucket.capacity)
+            if bucket.level < need:
+                wait = max(wait, (need - bucket.level) / (bucket.rate * self.factor))
+        return wait
+
+    def _publish(self) -> None:
+        for prio, name in _PRIORITY_NAMES.items():
+            depth = sum(1 for p, _ in self._waiters if p == prio)
+            telemetry.gauge("scheduler_queue_depth", depth, endpoint=self.name, priority=name)
+
+    def _enqueue(self, prio: int) -> Tuple[int, int]:
+        entry = (prio, next(self._seq))
+        heapq.heappush(self._waiters, entry)
+        self._publish()
+        return entry
+
+    def _remove(self, entry: Tuple[int, int]) -> None:
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            self._publish()
+            self._cond.notify_all()
+
+    def _try(self, entry: Tuple[int, int], cost: int) -> float:
+        """Sub lock: 0 = cota a fost acordată, altfel cât mai trebuie așteptat."""
+        if self._waiters[0] != entry:
+            return _POLL
+        now = time.monotonic()
+        self._refill(now)
+        wait = self._wait_time(cost, entry[0], now)
+        if wait > 0:
+            return wait
+        heapq.heappop(self._waiters)
+        if self.requests is not None:
+            self.requests.level -= 1.0
+        if self.tokens is not None:
+            self.tokens.level -= cost
+        self._publish()
+        self._cond.notify_all()
+        return 0.0
+
+    def _granted(self, prio: int, started: float) -> None:
+        labels = dict(endpoint=self.name, priority=_PRIORITY_NAMES[prio])
+        telemetry.observe("scheduler_wait_seconds", time.monotonic() - started, **labels)
+        telemetry.count("scheduler_requests", **labels)
+
+    def acquire(self, cost: int, prio: int = INTERACTIVE) -> None:
+        started = time.monotonic()
+        with self._cond:
+            entry = self._enqueue(prio)
+            try:
+                while True:
+                    wait = self._try(entry, cost)
+                    if wait <= 0:
+                        break
+                    self._cond.wait(min(wait, 1.0))
+            except BaseException:
+                self._remove(entry)
+                raise
+        self._granted(prio, started)
+
+    async def aacquire(self, cost: int, prio: int = INTERACTIVE) -> None:
+        started = time.monotonic()
+        with self._lock:
+            entry = self._enqueue(prio)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try(entry, cost)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, _POLL))
+        except BaseException:
+            with self._lock:
+                self._remove(entry)
+            raise
+        self._granted(prio, started)
+
+    def on_response(self, response: httpx.Response) -> Optional[float]:
+        """Adaptează rata după răspuns; la 429 oprește endpoint-ul și întoarce pauza."""
+        now = time.monotonic()
+        with self._lock:
+            self._refill(now)
+            if response.status_code == 429:
+                delay = retry_after(response.headers)
+                pause = delay if delay is not None else backoff(0)
+                self.factor = max(_MIN_FACTOR, self.factor * _DECREASE)
+                self.paused_until = max(self.paused_until, now + pause)
+                for bucket in (self.requests, self.tokens):
+                    if bucket is not None:
+                        bucket.level = min(bucket.level, 0.0)
+                telemetry.gauge("scheduler_rate_factor", self.factor, endpoint=self.name)
+                return pause
+            if response.status_code < 400:
+                if self.factor < 1.0:
+                    self.factor = min(1.0, self.factor + _INCREASE)
+                    telemetry.gauge("scheduler_rate_factor", self.factor, endpoint=self.name)
+                self._learn_limits(response.headers)
+                # ce mai rămâne din cota pe minut, după server
+                for bucket, header in ((self.requests, "x-ratelimit-remaining-requests"),
+                                       (self.tokens, "x-ratelimit-remaining-tokens")):
+                    remaining = response.headers.get(header)
+                    if bucket is not None and remaining and remaining.isdigit():
+                        bucket.level = min(bucket.level, float(remaining))
+        return None
+
+    def _learn_limits(self, headers: httpx.Headers) -> None:
+        """Sub lock: cotele nedate în OPENAI_RATE_LIMITS, din x-ratelimit-limit-requests/-tokens."""
+        for kind in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            if not self._learn[kind] or not limit or not limit.isdigit() or int(limit) <= 0:
+                continue
+            bucket = getattr(self, kind)
+            if bucket is None:
+                setattr(self, kind, _Bucket(float(limit)))
+            elif bucket.per_minute != float(limit):
+                bucket.resize(float(limit))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "queued": {name: sum(1 for p, _ in self._waiters if p == prio)
+                           for prio, name in _PRIORITY_NAMES.items()},
+                "rate_factor": round(self.factor, 3),
+                "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 3),
+                "requests_available": round(self.requests.level, 2) if self.requests else None,
+                "tokens_available": round(self.tokens.level, 1) if self.tokens else None,
+            }
+
+
+class Scheduler:
+    """Câte un EndpointLimiter per endpoint, creat la prima cerere."""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.limits = limits if limits is not None else parse_limits(RATE_LIMITS_SPEC)
+        self._limiters: Dict[str, EndpointLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, path: str) -> EndpointLimiter:
+        name = ENDPOINTS.get(path.split("/v1/")[-1].strip("/"), "other")
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(name)
+                if limiter is None:
+                    rpm, tpm = self.limits.get(name, (0, 0))
+                    limiter = self._limiters[name] = EndpointLimiter(name, rpm, tpm)
+        return limiter
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: limiter.snapshot() for name, limiter in sorted(self._limiters.items())}
+
+
+default_scheduler = Scheduler()
+
+
+def _retry_reason(response: Optional[httpx.Response], error: Optional[Exception]) -> str:
+    return str(response.status_code) if response is not None else type(error).__name__
+
+
+class ScheduledTransport(httpx.BaseTransport):
+    """
+    Transport httpx pentru clientul OpenAI sincron: fiecare încercare așteaptă
+    cota endpoint-ului, iar 429/5xx/erorile de conexiune sunt reîncercate aici
+    (SDK-ul rulează cu max_retries=0, ca să nu se dubleze reîncercările).
+    """
+
+    def __init__(self, inner: httpx.BaseTransport, scheduler: Optional[Scheduler] = None):
+        self.inner = inner
+        self.scheduler = scheduler or default_scheduler
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        limiter = self.scheduler.limiter(request.url.path)
+        request.read()  # corpul (inclusiv multipart) trebuie să poată fi retrimis
+        cost = estimate_tokens(limiter.name, request)
+        prio = _priority.get()
+        attempt = 0
+        while True:
+            limiter.acquire(cost, prio)
+            response, error = None, None
+            try:
+                response = self.inner.handle_request(request)
+            except httpx.TransportError as e:
+                error = e
+            pause = limiter.on_response(response) if response is not None else None
+            if attempt >= MAX_RETRIES or (response is not None and not _should_retry(response)):
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                response.close()
+            telemetry.count("scheduler_retries", endpoint=limiter.name, reason=_retry_reason(response, error))
+            if pause is None:
+                # la 429 pauza e aplicată de limiter tuturor cererilor endpoint-ului
+                time.sleep(backoff(attempt, retry_after(response.headers) if response is not None else None))
+            attempt += 1
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class AsyncScheduledTransport(httpx.AsyncBaseTransport):
+    """Varianta asyncio a ScheduledTransport (clienții AsyncOpenAI)."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, scheduler: Optional[Scheduler] = None):
+        self.inner = inner
+        self.scheduler = scheduler or default_scheduler
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        limiter = self.scheduler.limiter(request.url.path)
+        await request.aread()
+        cost = estimate_tokens(limiter.name, request)
+        prio = _priority.get()
+        attempt = 0
+        while True:
+            await limiter.aacquire(cost, prio)
+            response, error = None, None
+            try:
+                response = await self.inner.handle_async_request(request)
+            except httpx.TransportError as e:
+                error = e
+            pause = limiter.on_response(response) if response is not None else None
+            if attempt >= MAX_RETRIES or (response is not None and not _should_retry(response)):
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                await response.aclose()
+            telemetry.count("scheduler_retries", endpoint=limiter.name, reason=_retry_reason(response, error))
+            if pause is None:
+                await asyncio.sleep(backoff(attempt, retry_after(response.headers) if response is not None else None))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Starea curentă per endpoint: coadă per prioritate, factorul de rată, pauza, cota disponibilă."""
+    return default_scheduler.stats()
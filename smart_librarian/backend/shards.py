@@ -0,0 +1,110 @@
+# Sharding: corpusul împărțit în colecții Chroma după un câmp din catalog, cu router pe filtre
+import os
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from backend import telemetry
+from backend.clients import COLLECTION_NAME, get_chroma_client, get_collection
+from backend.metadata_filter import key_values
+from backend.text_norm import fold
+
+# Config din .env
+# câmpul de partiționare (ex. language, genre); gol = o singură colecție, ca înainte
+SHARD_KEY = os.getenv("SHARD_KEY", "").strip()
+# shard-ul cărților fără câmpul de partiționare
+DEFAULT_SHARD = os.getenv("SHARD_DEFAULT", "other")
+# câte shard-uri sunt interogate simultan
+WORKERS = int(os.getenv("SHARD_WORKERS", "8"))
+# cât timp e refolosită lista shard-urilor existente (secunde)
+LIST_TTL = float(os.getenv("SHARD_LIST_TTL", "30"))
+
+_SEPARATOR = "__"
+_UNSAFE = re.compile(r"[^a-z0-9]+")
+
+_pool: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+_listed: Dict[str, Any] = {"at": 0.0, "names": []}
+
+
+def enabled() -> bool:
+    return bool(SHARD_KEY)
+
+
+def collection_name(value: Any) -> str:
+    """
+    Numele colecției unui shard: books__en, books__science-fiction. Chroma acceptă
+    doar [a-zA-Z0-9._-], deci valoarea e fold-uită și simplificată.
+    """
+    slug = _UNSAFE.sub("-", fold(str(value)).lower()).strip("-") or DEFAULT_SHARD
+    return f"{COLLECTION_NAME}{_SEPARATOR}{slug}"
+
+
+def name_for(metadata: Dict[str, Any]) -> str:
+    """Colecția în care stă o carte (după metadatele ei); fără sharding, colecția unică."""
+    if not enabled():
+        return COLLECTION_NAME
+    value = metadata.get(SHARD_KEY)
+    return collection_name(DEFAULT_SHARD if value is None or value == "" else value)
+
+
+def list_names() -> List[str]:
+    """Toate colecțiile din vector store (după nume)."""
+    return [c if isinstance(c, str) else c.name for c in get_chroma_client().list_collections()]
+
+
+def shard_names(refresh: bool = False) -> List[str]:
+    """Colecțiile existente: shard-urile prefixului curent, sau doar colecția unică."""
+    if not enabled():
+        return [COLLECTION_NAME]
+    now = time.monotonic()
+    if refresh or now - _listed["at"] > LIST_TTL:
+        prefix = COLLECTION_NAME + _SEPARATOR
+        _listed.update(at=now, names=sorted(n for n in list_names() if n.startswith(prefix)))
+    return list(_listed["names"])
+
+
+def route(where: Optional[Dict[str, Any]]) -> List[str]:
+    """
+    Shard-urile care pot conține rezultate pentru filtru: dacă filtrul fixează
+    câmpul de partiționare (egalitate sau $in), doar acelea; altfel toate.
+    """
+    names = shard_names()
+    if not enabled():
+        return names
+    values = key_values(where, SHARD_KEY)
+    if values is None:
+        return names
+    wanted = {collection_name(v) for v in values}
+    return [n for n in names if n in wanted]
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="shard")
+    return _pool
+
+
+def fan_out(names: List[str], fn: Callable[[Any], Any]) -> List[Any]:
+    """`fn(colecție)` pentru fiecare shard; în paralel când sunt mai multe."""
+    if len(names) <= 1:
+        return [fn(get_collection(n)) for n in names]
+
+    def run(name: str) -> Any:
+        with telemetry.span("retrieval.shard", shard=name):
+            return fn(get_collection(name))
+
+    futures = [_executor().submit(telemetry.propagate(run), n) for n in names]
+    return [f.result() for f in futures]
+
+
+def merge(per_shard: List[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+    """Top-k global din top-k-urile shard-urilor (aceeași metrică: distanța, mai mic = mai bun)."""
+    merged = [book for results in per_shard for book in results]
+    merged.sort(key=lambda book: book["score"])
+    return merged[:top_k]
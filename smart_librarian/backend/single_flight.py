@@ -0,0 +1,47 @@
+# Single-flight: cereri identice simultane împart un singur calcul (asyncio)
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from backend import telemetry
+
+
+class SingleFlight:
+    """
+    Primul apelant pentru o cheie pornește calculul; cei care sosesc cât timp
+    acesta rulează așteaptă același rezultat (sau aceeași excepție).
+    Calculul e protejat cu asyncio.shield: dacă un client se deconectează,
+    ceilalți primesc în continuare rezultatul. Nimic nu e păstrat după final —
+    pentru reutilizare ulterioară există cache-urile din backend/.
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Returnează (rezultat, shared); shared=True dacă s-a alăturat unui calcul deja pornit."""
+        future = self._inflight.get(key)
+        shared = future is not None
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        telemetry.count("single_flight_requests", group=self.name, result="shared" if shared else "leader")
+        return await asyncio.shield(future), shared
+
+    def _forget(self, key: Hashable, future: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()  # marcată ca preluată, chiar dacă toți apelanții au plecat
+
+    async def drain(self, timeout: float) -> int:
+        """Așteaptă calculele în curs (la oprire); întoarce câte nu s-au terminat la timp."""
+        pending = list(self._inflight.values())
+        if not pending:
+            return 0
+        _done, still = await asyncio.wait(pending, timeout=timeout)
+        return len(still)
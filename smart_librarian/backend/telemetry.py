@@ -0,0 +1,334 @@
+# Telemetrie: span-uri cu durată (trace JSONL) + contoare/histograme/gauge-uri (format Prometheus)
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+# Config din .env (dezactivat implicit: fiecare apel devine un simplu test de bool)
+ENABLED = os.getenv("TELEMETRY", "false").lower() == "true"
+TRACE_PATH = os.getenv("TELEMETRY_TRACE_PATH", "outputs/traces/trace.jsonl")
+# port pentru /metrics (0 = fără server; metricile rămân disponibile prin prometheus_text())
+METRICS_PORT = int(os.getenv("TELEMETRY_METRICS_PORT", "0"))
+
+# limitele bucket-urilor pentru durate (secunde)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, _Labels], float] = {}
+_histograms: Dict[Tuple[str, _Labels], list] = {}  # [counts per bucket..., +Inf, sum, count]
+_gauges: Dict[Tuple[str, _Labels], float] = {}
+_current: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("telemetry_span", default=None)
+_trace_file = None
+_trace_lock = threading.Lock()
+
+
+def _labels(labels: Dict[str, Any]) -> _Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def count(name: str, value: float = 1.0, **labels: Any) -> None:
+    """Incrementează contorul `name` (exportat ca <name>_total)."""
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def gauge(name: str, value: float, **labels: Any) -> None:
+    """Valoarea curentă a `name` (ex. lungimea unei cozi)."""
+    if not ENABLED:
+        return
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+
+def observe(name: str, seconds: float, **labels: Any) -> None:
+    """Adaugă o durată în histograma `name`."""
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+                break
+        else:
+            h[len(BUCKETS)] += 1
+        h[-2] += seconds
+        h[-1] += 1
+
+
+def record_usage(stage: str, usage: Any) -> None:
+    """Tokenii din câmpul `usage` al unui răspuns OpenAI (chat sau embeddings)."""
+    if not ENABLED or usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens", "input_tokens", "output_tokens"):
+        value = getattr(usage, kind, None)
+        if value is None and isinstance(usage, dict):
+            value = usage.get(kind)
+        if value:
+            count("openai_tokens", value, stage=stage, kind=kind.replace("_tokens", ""))
+
+
+class Span:
+    """O etapă cronometrată; atributele ajung în trace, iar durata în histograma stage_duration_seconds."""
+
+    __slots__ = ("name", "attrs", "trace_id", "span_id", "parent_id", "start", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        parent = _current.get()
+        self.name = name
+        self.attrs = attrs
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = uuid.uuid4().hex[:8]
+        self.start = 0.0
+        self._token = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = time.perf_counter() - self.start
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # închis din alt context (ex. un generator reluat din alt thread)
+            pass
+        status = "error" if exc_type else "ok"
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        observe("stage_duration_seconds", duration, stage=self.name, status=status)
+        _write_trace({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "ts": round(time.time() - duration, 6),
+            "duration_ms": round(duration * 1000.0, 3),
+            "status": status,
+            "attrs": self.attrs,
+        })
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attrs: Any):
+    """
+    with span("llm.first", model=...) as s: ...; s.set(tokens=...)
+    Span-urile deschise în interiorul altuia devin copiii lui (același trace_id).
+    """
+    if not ENABLED:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def span_iter(name: str, items: Iterator[Any], **attrs: Any) -> Iterator[Any]:
+    """
+    Parcurge generatorul `items` sub un span care durează până la epuizarea lui
+    (stream-uri, pipeline-uri streaming). Generatorul rulează în propriul context,
+    deci span-ul e părintele etapelor din el, nu și al codului apelantului dintre
+    două elemente. Valoarea returnată de generator trece mai departe (yield from).
+    """
+    if not ENABLED:
+        return (yield from items)
+    ctx = contextvars.copy_context()
+    s = Span(name, attrs)
+    ctx.run(s.__enter__)
+    exc_info: Tuple[Any, Any, Any] = (None, None, None)
+    try:
+        while True:
+            try:
+                item = ctx.run(next, items)
+            except StopIteration as stop:
+                return stop.value
+            yield item
+    except GeneratorExit:
+        # apelantul a abandonat iterația: generatorul e închis în contextul lui
+        s.set(abandoned=True)
+        ctx.run(items.close)
+        raise
+    except BaseException as e:
+        exc_info = (type(e), e, e.__traceback__)
+        raise
+    finally:
+        ctx.run(s.__exit__, *exc_info)
+
+
+def annotate(**attrs: Any) -> None:
+    """Atribute pe span-ul curent (ex. dintr-un generator parcurs cu span_iter)."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    Leagă contextul curent (span-ul, prioritatea din backend/scheduler.py) de o funcție
+    care va rula în alt thread (executor). Copierea contextului e ieftină, deci se face
+    și cu telemetria oprită.
+    """
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def _write_trace(record: Dict[str, Any]) -> None:
+    global _trace_file
+    if not TRACE_PATH:
+        return
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _trace_lock:
+        if _trace_file is None:
+            os.makedirs(os.path.dirname(TRACE_PATH) or ".", exist_ok=True)
+            _trace_file = open(TRACE_PATH, "a", encoding="utf-8", buffering=1)
+        _trace_file.write(line)
+
+
+def http_response_hook(response: Any) -> None:
+    """
+    Hook httpx (clienții din backend/clients.py): un contor per răspuns final, pe
+    endpoint și status, și bytes. Reîncercările planificatorului (backend/scheduler.py)
+    sunt numărate separat, în scheduler_retries.
+    """
+    if not ENABLED:
+        return
+    request = response.request
+    endpoint = request.url.path.split("/v1/")[-1]
+    count("openai_http_responses", endpoint=endpoint, status=response.status_code)
+    if response.status_code == 429 or response.status_code >= 500:
+        count("openai_http_retryable", endpoint=endpoint, status=response.status_code)
+    sent = request.headers.get("content-length")
+    if sent:
+        count("openai_bytes", int(sent), endpoint=endpoint, direction="sent")
+    received = response.headers.get("content-length")
+    if received:
+        count("openai_bytes", int(received), endpoint=endpoint, direction="received")
+
+
+async def ahttp_response_hook(response: Any) -> None:
+    http_response_hook(response)
+
+
+def _fmt_labels(labels: _Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " "))
+        for k, v in items
+    )
+    return "{" + body + "}"
+
+
+def prometheus_text() -> str:
+    """Toate metricile, în formatul text expus de Prometheus (/metrics)."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+        gauges = dict(_gauges)
+    lines = []
+    for name in sorted({n for n, _ in gauges}):
+        lines.append(f"# TYPE {name} gauge")
+        for (n, labels), value in sorted(gauges.items()):
+            if n == name:
+                lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+    for name in sorted({n for n, _ in counters}):
+        lines.append(f"# TYPE {name}_total counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}_total{_fmt_labels(labels)} {value:g}")
+    for name in sorted({n for n, _ in histograms}):
+        lines.append(f"# TYPE {name} histogram")
+        for (n, labels), h in sorted(histograms.items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, c in zip(BUCKETS, h):
+                cumulative += c
+                lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', f'{bound:g}'))} {cumulative}")
+            cumulative += h[len(BUCKETS)]
+            lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {h[-2]:.6f}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {h[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _gauges.clear()
+
+
+def configure(enabled: Optional[bool] = None, trace_path: Optional[str] = None) -> None:
+    """Pornește/oprește telemetria la runtime (ex. din benchmark); trace_path="" = fără trace."""
+    global ENABLED, TRACE_PATH, _trace_file
+    with _trace_lock:
+        if trace_path is not None and trace_path != TRACE_PATH:
+            if _trace_file is not None:
+                _trace_file.close()
+                _trace_file = None
+            TRACE_PATH = trace_path
+        if enabled is not None:
+            ENABLED = enabled
+
+
+_metrics_server = None
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "0.0.0.0"):
+    """Server HTTP minimal care servește prometheus_text() pe /metrics (o singură dată per proces)."""
+    global _metrics_server
+    if _metrics_server is not None or not port:
+        return _metrics_server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            payload = prometheus_text().encode("utf-8")
+            self.send_response(200 if self.path.startswith("/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):  # noqa: A002
+            pass
+
+    _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    _metrics_server.daemon_threads = True
+    threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+    return _metrics_server
+
+
+if ENABLED and METRICS_PORT:
+    start_metrics_server()
@@ -0,0 +1,29 @@
+# Normalizare text pentru chei de cache
+import re
+import unicodedata
+
+_WS = re.compile(r"\s+")
+
+def normalize_query(text: str) -> str:
+    """
+    Formă canonică a unei întrebări, folosită ca cheie de cache:
+    NFC (ș/ş, ț/ţ unificate), lowercase, spații comprimate, fără spații la capete.
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    # cedila veche (ş, ţ) -> virgula corectă (ș, ț)
+    text = text.replace("ş", "ș").replace("ţ", "ț").replace("Ş", "Ș").replace("Ţ", "Ț")
+    return _WS.sub(" ", text).strip().lower()
+
+_WORD = re.compile(r"\w+")
+
+def fold(text: str) -> str:
+    """
+    Formă fără diacritice pentru căutarea lexicală: „Micul Prinț” și
+    „micul print” devin identice (ă/â -> a, î -> i, ș/ş -> s, ț/ţ -> t).
+    """
+    decomposed = unicodedata.normalize("NFD", normalize_query(text))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def tokenize(text: str):
+    """Cuvintele (deja fold-uite) dintr-un text."""
+    return _WORD.findall(fold(text))
@@ -1,47 +1,245 @@
 # Inițializare și gestionare ChromaDB
 import os
 import json
-import openai
-import chromadb
-from chromadb.utils import embedding_functions
-from dotenv import load_dotenv
-
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+import hashlib
+from collections import defaultdict
+from typing import Dict, Any, List, Iterator, NamedTuple, Optional, Tuple
+from backend import shards
+from backend.clients import COLLECTION_NAME, get_collection, get_embedding_function
 
 # Calea catre fisierul cu rezumate
 BOOKS_PATH = "data/book_summaries.json"
 
-# Initializeaza embedding function o singura data
-openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-    api_key=openai.api_key,
-    model_name="text-embedding-3-small"
-)
+# Cate rezumate trimitem intr-un singur request de embeddings
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "512"))
+# Cate randuri scriem intr-un singur upsert/delete (sub limita de batch a Chroma)
+WRITE_BATCH_SIZE = int(os.getenv("CHROMA_WRITE_BATCH_SIZE", "5000"))
+
+# Câmpuri opționale din catalog, păstrate ca metadate (filtre `where`, sharding)
+METADATA_FIELDS = ("genre", "language", "audience", "year")
+
+# Cât citim odată din fișier când parcurgem incremental un array JSON
+READ_CHUNK_CHARS = 1 << 20
+
+def _iter_json_array(f) -> Iterator[Any]:
+    """
+    Elementele unui array JSON, unul câte unul, fără a ține tot fișierul în memorie:
+    bufferul conține doar elementul curent și restul ultimului bloc citit.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
 
-# Initializeaza ChromaDB cu embedding_function
-client = chromadb.PersistentClient(path="chroma_db")
-collection = client.get_or_create_collection(
-    "books",
-    embedding_function=openai_ef
-)
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(READ_CHUNK_CHARS)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    def skip(chars: str) -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip(" \t\r\n")
+    if buf[pos:pos + 1] != "[":
+        raise ValueError("se aștepta un array JSON")
+    pos += 1
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf):
+            raise ValueError("array JSON neterminat")
+        if buf[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        if end == len(buf) and not eof:
+            # un număr/literal poate continua în blocul următor
+            fill()
+            continue
+        yield item
+        pos = end
+
+def iter_books(path: str = BOOKS_PATH) -> Iterator[Dict[str, Any]]:
+    """
+    Cărțile din catalog, citite incremental: array JSON (ca book_summaries.json)
+    sau JSONL (o carte pe linie, recunoscut după extensia .jsonl).
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            items = (json.loads(line) for line in f if line.strip())
+        else:
+            items = _iter_json_array(f)
+        for n, book in enumerate(items, 1):
+            if not isinstance(book, dict) or not book.get("title") or not book.get("summary"):
+                raise ValueError(f"{path}: înregistrarea {n} nu are 'title' și 'summary'")
+            yield book
 
 def load_books():
-    with open(BOOKS_PATH, encoding='utf-8') as f:
-        return json.load(f)
+    return list(iter_books(BOOKS_PATH))
+
+def book_id(book: Dict[str, Any]) -> str:
+    """ID stabil derivat din titlu (nu din poziția în JSON)."""
+    return "book_" + hashlib.sha1(book["title"].encode("utf-8")).hexdigest()[:16]
+
+def content_hash(book: Dict[str, Any]) -> str:
+    """Hash pe conținutul indexat: dacă se schimbă titlul sau rezumatul, se schimbă și hash-ul."""
+    payload = f"{book['title']}\x1f{book['summary']}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def book_metadata(book: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadatele scrise în colecție: titlul, hash-ul conținutului și câmpurile opționale prezente."""
+    meta: Dict[str, Any] = {"title": book["title"], "content_hash": content_hash(book)}
+    for field in METADATA_FIELDS:
+        value = book.get(field)
+        if value is None or value == "":
+            continue
+        if not isinstance(value, (str, int, float, bool)):
+            raise ValueError(f"„{book['title']}”: câmpul '{field}' trebuie să fie text sau număr")
+        meta[field] = value
+    return meta
+
+def existing_metadata(ids: Optional[List[str]] = None) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """
+    id -> (colecția în care stă, metadatele stocate), fără documente/embeddings; pentru
+    toate cărțile sau doar pentru `ids`. Cu sharding, include și colecția unică veche,
+    ca activarea sharding-ului să mute cărțile fără embeddings noi.
+    """
+    names = shards.shard_names(refresh=True)
+    if shards.enabled() and COLLECTION_NAME in shards.list_names():
+        names.append(COLLECTION_NAME)
+    found: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    for name in names:
+        page = get_collection(name).get(ids=ids, include=["metadatas"])
+        for doc_id, meta in zip(page["ids"], page["metadatas"]):
+            found[doc_id] = (name, meta or {})
+    return found
+
+class CatalogDiff(NamedTuple):
+    embed: List[Tuple[str, Dict[str, Any], Dict[str, Any]]]   # noi / conținut modificat
+    move: List[Tuple[str, Dict[str, Any], Dict[str, Any], str]]  # același conținut, alt shard
+    update: List[Tuple[str, Dict[str, Any]]]                  # doar metadatele s-au schimbat
+    delete: List[Tuple[str, str]]                             # (id, colecție)
+
+def diff_catalog(books: List[Dict[str, Any]], existing: Dict[str, Tuple[str, Dict[str, Any]]],
+                 complete: bool = True) -> CatalogDiff:
+    """
+    Compară catalogul cu colecțiile:
+      - embed: cărți noi sau cu conținut modificat (singurele care cer embeddings)
+      - move: cărți care trebuie mutate în alt shard (embedding-ul stocat e copiat)
+      - update: cărți la care s-au schimbat doar metadatele (genre, year, ...)
+      - delete: copiile vechi ale celor mutate și, dacă `complete` (catalogul întreg),
+        id-urile care nu mai există în catalog (inclusiv vechile id-uri poziționale book_{idx})
+    """
+    wanted: Dict[str, Dict[str, Any]] = {}
+    for book in books:
+        wanted[book_id(book)] = book
+
+    diff = CatalogDiff([], [], [], [])
+    for doc_id, book in wanted.items():
+        meta = book_metadata(book)
+        target = shards.name_for(meta)
+        stored = existing.get(doc_id)
+        if stored is None or stored[1].get("content_hash") != meta["content_hash"]:
+            diff.embed.append((doc_id, book, meta))
+            if stored is not None and stored[0] != target:
+                diff.delete.append((doc_id, stored[0]))
+        elif stored[0] != target:
+            diff.move.append((doc_id, book, meta, stored[0]))
+            diff.delete.append((doc_id, stored[0]))
+        elif stored[1] != meta:
+            diff.update.append((doc_id, meta))
+    if complete:
+        diff.delete.extend((doc_id, name) for doc_id, (name, _) in existing.items() if doc_id not in wanted)
+    return diff
+
+def _stored_embeddings(moves) -> Dict[str, Any]:
+    """Embedding-urile deja calculate ale cărților mutate, citite din shard-ul vechi."""
+    by_source: Dict[str, List[str]] = defaultdict(list)
+    for doc_id, _, _, source in moves:
+        by_source[source].append(doc_id)
+    found: Dict[str, Any] = {}
+    for source, ids in by_source.items():
+        page = get_collection(source).get(ids=ids, include=["embeddings"])
+        found.update(zip(page["ids"], page["embeddings"]))
+    return found
+
+def prepare_writes(diff: CatalogDiff, embed) -> Dict[str, Dict[str, Any]]:
+    """
+    Embeddings pentru `diff.embed` (un singur request), apoi scrierile grupate pe colecții:
+    {"upsert": {colecție: rânduri}, "update": {...}, "delete": {colecție: [id-uri]}}.
+    """
+    writes: Dict[str, Dict[str, Any]] = {"upsert": {}, "update": {}, "delete": defaultdict(list)}
+
+    def add(kind: str, name: str, **columns) -> None:
+        rows = writes[kind].setdefault(name, {key: [] for key in columns})
+        for key, value in columns.items():
+            rows[key].append(value)
+
+    embeddings = embed([book["summary"] for _, book, _ in diff.embed]) if diff.embed else []
+    moved = _stored_embeddings(diff.move) if diff.move else {}
+    for (doc_id, book, meta), emb in zip(diff.embed, embeddings):
+        add("upsert", shards.name_for(meta), ids=doc_id, embeddings=emb, documents=book["summary"], metadatas=meta)
+    for doc_id, book, meta, _ in diff.move:
+        add("upsert", shards.name_for(meta), ids=doc_id, embeddings=moved[doc_id],
+            documents=book["summary"], metadatas=meta)
+    for doc_id, meta in diff.update:
+        add("update", shards.name_for(meta), ids=doc_id, metadatas=meta)
+    for doc_id, name in diff.delete:
+        writes["delete"][name].append(doc_id)
+    return writes
+
+def apply_writes(writes: Dict[str, Dict[str, Any]]) -> None:
+    """Upsert-urile înaintea ștergerilor: o carte mutată nu lipsește nici măcar temporar."""
+    for name, rows in writes["upsert"].items():
+        collection = get_collection(name)
+        for start in range(0, len(rows["ids"]), WRITE_BATCH_SIZE):
+            collection.upsert(**{key: values[start:start + WRITE_BATCH_SIZE] for key, values in rows.items()})
+    for name, rows in writes["update"].items():
+        collection = get_collection(name)
+        for start in range(0, len(rows["ids"]), WRITE_BATCH_SIZE):
+            collection.update(**{key: values[start:start + WRITE_BATCH_SIZE] for key, values in rows.items()})
+    for name, ids in writes["delete"].items():
+        collection = get_collection(name)
+        for part in _chunks(ids, WRITE_BATCH_SIZE):
+            collection.delete(ids=part)
 
 def populate_chromadb():
+    """
+    Ingestie incrementală, în bloc:
+      1) diff pe content hash și metadate între catalog și colecție (sau shard-uri)
+      2) embeddings doar pentru rezumatele noi/modificate, în batch-uri mari
+      3) upsert + update de metadate + delete în bloc, fiecare în colecția cărții
+    """
     books = load_books()
-    for idx, book in enumerate(books):
-        doc_id = f"book_{idx}"
-        docs = collection.get(ids=[doc_id])
-        if docs and docs['ids']:
-            continue
-        collection.add(
-            ids=[doc_id],
-            documents=[book['summary']],
-            metadatas=[{"title": book['title']}]
-        )
-    print("Toate cărțile au fost adăugate în ChromaDB.")
+    embed = get_embedding_function()
+    diff = diff_catalog(books, existing_metadata())
+
+    for batch in _chunks(diff.embed, EMBED_BATCH_SIZE):
+        apply_writes(prepare_writes(CatalogDiff(batch, [], [], []), embed))
+    apply_writes(prepare_writes(CatalogDiff([], diff.move, diff.update, diff.delete), embed))
+    shards.shard_names(refresh=True)
+
+    catalog_ids = {book_id(book) for book in books}
+    removed = sum(1 for doc_id, _ in diff.delete if doc_id not in catalog_ids)
+    unchanged = len(books) - len(diff.embed) - len(diff.move) - len(diff.update)
+    print(
+        f"ChromaDB sincronizat: {len(diff.embed)} adăugate/actualizate, "
+        f"{len(diff.update)} cu metadate actualizate, {len(diff.move)} mutate între shard-uri, "
+        f"{removed} șterse, {unchanged} neschimbate."
+    )
 
 if __name__ == "__main__":
     populate_chromadb()
@@ -0,0 +1,158 @@
+# Evaluare context builder: tokeni de prompt vs calitate, pe un set de întrebări etichetate
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.run_bench import percentile
+
+LABELS_PATH = ROOT / "data" / "eval_queries.jsonl"
+
+
+def read_labels(path: str) -> List[Dict[str, str]]:
+    """{"query": ..., "expected": titlul corect} pe fiecare linie."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _first_step(user_query: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Primul pas LLM (stream): timpul până la primul chunk și titlul ales (tool call sau text)."""
+    from backend.clients import get_openai_client
+    from backend.openai_chat import GET_SUMMARY_TOOL, _build_messages, _guess_title_from_answer
+    from tools.get_summary import resolve_title
+
+    messages = _build_messages(user_query, candidates)
+    started = time.perf_counter()
+    stream = get_openai_client().chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        tools=[GET_SUMMARY_TOOL],
+        tool_choice="auto",
+        temperature=0.0,
+        stream=True,
+    )
+    ttft, text, arguments = None, [], []
+    for chunk in stream:
+        if ttft is None:
+            ttft = time.perf_counter() - started
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            text.append(delta.content)
+        for tc in delta.tool_calls or []:
+            if tc.function and tc.function.arguments:
+                arguments.append(tc.function.arguments)
+    title = None
+    if arguments:
+        try:
+            title = json.loads("".join(arguments)).get("title")
+        except ValueError:
+            title = None
+    title = (resolve_title(title) or title) if title else _guess_title_from_answer("".join(text), candidates)
+    return {"ttft": ttft or 0.0, "title": title, "prompt_chars": len(messages[-1]["content"])}
+
+
+def evaluate(labels: List[Dict[str, str]], top_ks: List[int], budgets: List[int],
+             use_llm: bool = False) -> List[Dict[str, Any]]:
+    from backend import context_builder
+    from backend.rag_retriever import embed_queries, _retrieve
+
+    # o singură căutare per întrebare, la top_k maxim; top_k mai mici = prefixe ale listei
+    depth = max(top_ks)
+    embeddings = embed_queries([item["query"] for item in labels])
+    retrieved = _retrieve(embeddings, depth)
+
+    rows = []
+    for top_k in top_ks:
+        for budget in budgets:
+            context_builder.TOKEN_BUDGET = budget
+            tokens, recall, ttfts = [], 0, []
+            counts = {"duplicates": 0, "truncated": 0, "dropped": 0}
+            correct = 0
+            for item, emb, results in zip(labels, embeddings, retrieved):
+                candidates = results[:top_k]
+                ctx = context_builder.build_context(candidates, budget=budget, diversify=budget > 0)
+                tokens.append(ctx.tokens)
+                recall += any(c["title"] == item["expected"] for c in ctx.candidates)
+                for key in counts:
+                    counts[key] += getattr(ctx, key)
+                if use_llm:
+                    step = _first_step(item["query"], candidates)
+                    ttfts.append(step["ttft"])
+                    correct += step["title"] == item["expected"]
+            n = len(labels)
+            row = {
+                "top_k": top_k,
+                "budget": budget or "∞",
+                "context_tokens_avg": round(sum(tokens) / n, 1),
+                "context_tokens_p95": round(percentile(tokens, 95), 1),
+                "context_recall": round(recall / n, 3),
+                **counts,
+            }
+            if use_llm:
+                row["accuracy_at_1"] = round(correct / n, 3)
+                row["ttft_p50_ms"] = round(percentile(ttfts, 50) * 1000, 1)
+                row["ttft_p95_ms"] = round(percentile(ttfts, 95) * 1000, 1)
+            rows.append(row)
+    return rows
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    columns = list(rows[0])
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for r in rows:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in columns))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tokeni de context vs calitate pentru diferite bugete și top_k.")
+    parser.add_argument("--labels", default=str(LABELS_PATH))
+    parser.add_argument("--top-k", default="3,6,12", help="ex. 3,6,12")
+    parser.add_argument("--budgets", default="0,700,400,250", help="bugete de tokeni (0 = contextul complet, ca înainte)")
+    parser.add_argument("--llm", action="store_true",
+                        help="rulează și primul pas LLM: accuracy@1 și timpul până la primul token")
+    parser.add_argument("--fake", action="store_true",
+                        help="folosește serverul fake din bench/ (tokenii sunt reali, calitatea nu)")
+    parser.add_argument("--out", default=None, help="salvează rezultatele ca JSON")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    tmp = None
+    if args.fake:
+        from bench.fake_openai import start_server, FakeConfig
+        from bench.run_bench import _prepare_environment
+        server = start_server(FakeConfig(time_scale=0.1))
+        tmp = tempfile.TemporaryDirectory(prefix="context_eval_")
+        _prepare_environment(server.base_url, Path(tmp.name), warm_cache=False)
+        from backend.vector_store import populate_chromadb
+        populate_chromadb()
+
+    rows = evaluate(
+        read_labels(args.labels),
+        [int(k) for k in args.top_k.split(",")],
+        [int(b) for b in args.budgets.split(",")],
+        use_llm=args.llm,
+    )
+    print_table(rows)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+    if tmp is not None:
+        tmp.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
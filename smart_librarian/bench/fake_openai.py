@@ -0,0 +1,472 @@
+# Server local care imită API-ul OpenAI folosit de proiect (pentru benchmark, fără costuri)
+import re
+import sys
+import json
+import time
+import uuid
+import zlib
+import base64
+import random
+import struct
+import argparse
+import threading
+from collections import Counter
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Latențe implicite (ms), apropiate de cele observate pe API-ul real
+DEFAULT_LATENCY = {
+    "moderations": "lognormal:180:0.35",
+    "chat": "lognormal:450:0.4",          # până la primul token / răspunsul complet
+    "chat_chunk": "fixed:12",             # între chunk-urile unui stream
+    "embeddings": "lognormal:120:0.3",
+    "speech": "lognormal:700:0.3",
+    "transcriptions": "lognormal:900:0.3",
+    "images": "lognormal:6000:0.25",
+}
+
+# Cuvinte care fac întrebarea „nepotrivită” pentru moderare / detectorul LLM
+FLAG_WORDS = ("idiot", "prost", "dracu", "fuck", "shit")
+
+MODERATION_CATEGORIES = (
+    "harassment", "harassment/threatening", "hate", "hate/threatening", "self-harm",
+    "self-harm/intent", "self-harm/instructions", "sexual", "sexual/minors",
+    "violence", "violence/graphic", "illicit", "illicit/violent",
+)
+
+_CANDIDATE_LINE = re.compile(r"^\d+\. (.+?) — ", re.MULTILINE)
+_WORD = re.compile(r"\w+")
+
+
+class LatencySpec:
+    """
+    Distribuție de latență, în milisecunde:
+      "fixed:50", "uniform:20:80", "normal:200:40", "lognormal:<mediană>:<sigma>", "0"
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        parts = str(spec).split(":")
+        self.kind = parts[0] if len(parts) > 1 else "fixed"
+        self.args = [float(x) for x in (parts[1:] if len(parts) > 1 else parts)]
+
+    def sample_ms(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return rng.uniform(self.args[0], self.args[1])
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(self.args[0], self.args[1]))
+        if self.kind == "lognormal":
+            return self.args[0] * float(np.exp(rng.gauss(0.0, self.args[1])))
+        raise ValueError(f"distribuție necunoscută: {self.spec}")
+
+
+class FakeConfig:
+    """Latențe, rate de eroare și scară de timp pentru fiecare endpoint."""
+
+    def __init__(
+        self,
+        latency: Optional[Dict[str, str]] = None,
+        errors: Optional[Dict[str, float]] = None,
+        error_codes: Tuple[int, ...] = (429, 500, 503),
+        time_scale: float = 1.0,
+        embedding_dim: int = 1536,
+        seed: int = 0,
+        rpm: Optional[Dict[str, float]] = None,
+    ):
+        self.latency = {k: LatencySpec(v) for k, v in {**DEFAULT_LATENCY, **(latency or {})}.items()}
+        self.errors = {k: float(v) for k, v in (errors or {}).items()}
+        self.error_codes = error_codes
+        # cotă de cereri pe minut per endpoint, ca la API-ul real: peste ea -> 429 + retry-after-ms
+        self.rpm = {k: float(v) for k, v in (rpm or {}).items() if float(v) > 0}
+        self._quota: Dict[str, List[float]] = {k: [max(1.0, v / 60.0), time.monotonic()] for k, v in self.rpm.items()}
+        self.time_scale = time_scale
+        self.embedding_dim = embedding_dim
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def delay(self, endpoint: str) -> None:
+        spec = self.latency.get(endpoint)
+        if spec is None:
+            return
+        with self._rng_lock:
+            ms = spec.sample_ms(self.rng)
+        time.sleep(ms * self.time_scale / 1000.0)
+
+    def injected_error(self, endpoint: str) -> Optional[int]:
+        rate = self.errors.get(endpoint, 0.0)
+        with self._rng_lock:
+            if rate and self.rng.random() < rate:
+                return self.rng.choice(self.error_codes)
+        return None
+
+    def rate_limited(self, endpoint: str) -> Optional[float]:
+        """None dacă cererea intră în cotă, altfel câte secunde până la următorul loc liber."""
+        rpm = self.rpm.get(endpoint)
+        if rpm is None:
+            return None
+        rate, capacity = rpm / 60.0, max(1.0, rpm / 60.0)
+        with self._rng_lock:
+            bucket = self._quota[endpoint]
+            now = time.monotonic()
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return None
+            return (1.0 - bucket[0]) / rate
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": {k: v.spec for k, v in self.latency.items()},
+            "errors": self.errors,
+            "rpm": self.rpm,
+            "time_scale": self.time_scale,
+        }
+
+
+# --- conținut fals, dar determinist ---
+
+@lru_cache(maxsize=50000)
+def _token_vector(token: str, dim: int) -> np.ndarray:
+    seed = zlib.crc32(token.encode("utf-8"))
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def fake_embedding(text: str, dim: int) -> np.ndarray:
+    """Feature hashing pe cuvinte: texte cu cuvinte comune au vectori apropiați."""
+    tokens = _WORD.findall(text.lower()) or [text]
+    vec = np.sum([_token_vector(t, dim) for t in tokens], axis=0)
+    return vec / (np.linalg.norm(vec) or 1.0)
+
+
+def _flagged(text: str) -> bool:
+    low = text.lower()
+    return any(w in low for w in FLAG_WORDS)
+
+
+def _tiny_png() -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    raw = zlib.compress(b"\x00\xcc\xaa\x66")
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", raw) + chunk(b"IEND", b""))
+
+
+PNG_B64 = base64.b64encode(_tiny_png()).decode("ascii")
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def _chat_reply(body: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Alege răspunsul ca modelul real, pentru fluxurile din proiect:
+      - detectorul de profanitate (filters.py) -> "ALLOW"/"BLOCK"
+      - tool forțat recommend_book (modul "single") -> tool call cu titlu + argumentare
+      - get_summary_by_title disponibil și încă neapelat -> tool call pe primul candidat
+      - altfel -> text final
+    """
+    messages = body.get("messages", [])
+    system = next((_message_text(m) for m in messages if m.get("role") == "system"), "")
+    user = "\n".join(_message_text(m) for m in messages if m.get("role") == "user")
+    if "profanity detector" in system:
+        return ("BLOCK" if _flagged(user) else "ALLOW"), []
+
+    titles = _CANDIDATE_LINE.findall(user)
+    title = titles[0] if titles else "1984"
+    tool_names = [t.get("function", {}).get("name") for t in body.get("tools") or []]
+    forced = body.get("tool_choice")
+    if isinstance(forced, dict) and forced.get("function", {}).get("name") == "recommend_book":
+        enum = (body["tools"][tool_names.index("recommend_book")]["function"]["parameters"]
+                ["properties"]["title"].get("enum") or [title])
+        args = {"title": enum[0], "justification": f"„{enum[0]}” se potrivește cu temele din întrebare."}
+        return "", [{"name": "recommend_book", "arguments": json.dumps(args, ensure_ascii=False)}]
+    already_called = any(m.get("role") == "tool" for m in messages)
+    if "get_summary_by_title" in tool_names and not already_called:
+        return "", [{"name": "get_summary_by_title", "arguments": json.dumps({"title": title}, ensure_ascii=False)}]
+    return (
+        f"Îți recomand „{title}”. Cartea atinge temele căutate, are personaje memorabile "
+        f"și o poveste care te ține în priză până la final."
+    ), []
+
+
+def _pieces(text: str, size: int = 12) -> Iterator[str]:
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeOpenAIServer"
+
+    def log_message(self, format, *args):  # noqa: A002 - semnătura din BaseHTTPRequestHandler
+        pass
+
+    # --- utilitare HTTP ---
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, payload: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _json(self, obj: Any, status: int = 200, headers: Optional[Dict[str, str]] = None):
+        self._send(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json", headers)
+
+    def _chunked(self, parts: Iterator[bytes], content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for part in parts:
+            if part:
+                self.wfile.write(f"{len(part):x}\r\n".encode("ascii") + part + b"\r\n")
+                self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _error(self, status: int, retry_after: float = 0.05):
+        headers = {"retry-after-ms": str(max(1, int(retry_after * 1000)))} if status == 429 else {}
+        kind = "rate_limit_exceeded" if status == 429 else "server_error"
+        self._json({"error": {"message": f"eroare injectată ({status})", "type": kind, "code": kind}},
+                   status=status, headers=headers)
+
+    # --- rutare ---
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/health"):
+            return self._json({"status": "ok"})
+        if self.path.rstrip("/").endswith("/stats"):
+            return self._json(self.server.snapshot())
+        self._json({"error": {"message": "not found"}}, status=404)
+
+    def do_POST(self):
+        routes = {
+            "/moderations": ("moderations", self._moderations),
+            "/chat/completions": ("chat", self._chat),
+            "/embeddings": ("embeddings", self._embeddings),
+            "/audio/speech": ("speech", self._speech),
+            "/audio/transcriptions": ("transcriptions", self._transcriptions),
+            "/images/generations": ("images", self._images),
+        }
+        route = next((r for suffix, r in routes.items() if self.path.endswith(suffix)), None)
+        raw = self._body()
+        if route is None:
+            return self._json({"error": {"message": f"endpoint necunoscut: {self.path}"}}, status=404)
+        endpoint, handler = route
+        config = self.server.config
+        retry_after = config.rate_limited(endpoint)
+        if retry_after is not None:
+            self.server.count(endpoint, None, rate_limited=True)
+            return self._error(429, retry_after)
+        status = config.injected_error(endpoint)
+        self.server.count(endpoint, status)
+        if status is not None:
+            config.delay(endpoint)
+            return self._error(status)
+        body = json.loads(raw) if raw and endpoint != "transcriptions" else {}
+        handler(body)
+
+    # --- endpoint-uri ---
+
+    def _moderations(self, body):
+        self.server.config.delay("moderations")
+        inputs = body.get("input", "")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        results = []
+        for text in inputs:
+            flagged = _flagged(str(text))
+            results.append({
+                "flagged": flagged,
+                "categories": {c: (flagged and c == "harassment") for c in MODERATION_CATEGORIES},
+                "category_scores": {c: (0.9 if flagged and c == "harassment" else 0.001) for c in MODERATION_CATEGORIES},
+            })
+        self._json({"id": f"modr-{uuid.uuid4().hex[:12]}", "model": body.get("model", "omni-moderation-latest"),
+                    "results": results})
+
+    def _chat(self, body):
+        config = self.server.config
+        text, calls = _chat_reply(body)
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()),
+                "model": body.get("model", "gpt-4o-mini")}
+        tool_calls = [
+            {"id": f"call_{uuid.uuid4().hex[:10]}", "type": "function", "function": c} for c in calls
+        ]
+        finish = "tool_calls" if tool_calls else "stop"
+
+        if not body.get("stream"):
+            config.delay("chat")
+            message: Dict[str, Any] = {"role": "assistant", "content": text or None}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return self._json({**base, "object": "chat.completion",
+                               "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+                               "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150}})
+
+        def event(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> bytes:
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        def stream() -> Iterator[bytes]:
+            config.delay("chat")
+            yield event({"role": "assistant", "content": ""})
+            for piece in _pieces(text):
+                config.delay("chat_chunk")
+                yield event({"content": piece})
+            for i, call in enumerate(tool_calls):
+                yield event({"tool_calls": [{"index": i, "id": call["id"], "type": "function",
+                                             "function": {"name": call["function"]["name"], "arguments": ""}}]})
+                for piece in _pieces(call["function"]["arguments"]):
+                    config.delay("chat_chunk")
+                    yield event({"tool_calls": [{"index": i, "function": {"arguments": piece}}]})
+            yield event({}, finish)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {**base, "object": "chat.completion.chunk", "choices": [],
+                         "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150}}
+                yield f"data: {json.dumps(usage)}\n\n".encode("utf-8")
+            yield b"data: [DONE]\n\n"
+
+        self._chunked(stream(), "text/event-stream")
+
+    def _embeddings(self, body):
+        self.server.config.delay("embeddings")
+        inputs = body.get("input", "")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        dim = int(body.get("dimensions") or self.server.config.embedding_dim)
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(inputs):
+            vec = fake_embedding(str(text), dim)
+            emb: Any = base64.b64encode(vec.astype("<f4").tobytes()).decode("ascii") if as_base64 else vec.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": emb})
+        tokens = sum(len(str(t).split()) for t in inputs)
+        self._json({"object": "list", "data": data, "model": body.get("model", "text-embedding-3-small"),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+    def _speech(self, body):
+        config = self.server.config
+        size = max(2048, 120 * len(body.get("input", "")))  # ~ dimensiunea unui MP3 real
+        payload = b"ID3\x04\x00\x00\x00\x00\x00\x00" + bytes(size)
+
+        def parts() -> Iterator[bytes]:
+            config.delay("speech")
+            for i in range(0, len(payload), 4096):
+                yield payload[i:i + 4096]
+
+        self._chunked(parts(), "audio/mpeg")
+
+    def _transcriptions(self, body):
+        self.server.config.delay("transcriptions")
+        self._json({"text": "Vreau o carte despre prietenie și magie"})
+
+    def _images(self, body):
+        self.server.config.delay("images")
+        n = int(body.get("n") or 1)
+        self._json({"created": int(time.time()), "data": [{"b64_json": PNG_B64} for _ in range(n)]})
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: FakeConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self._counts: Counter = Counter()
+        self._errors: Counter = Counter()
+        self._limited: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # clientul poate închide conexiunea la mijlocul unui stream (ex. cerere anulată)
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+    def count(self, endpoint: str, error: Optional[int], rate_limited: bool = False) -> None:
+        with self._lock:
+            self._counts[endpoint] += 1
+            if error is not None:
+                self._errors[endpoint] += 1
+            if rate_limited:
+                self._limited[endpoint] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": dict(self._counts),
+                "injected_errors": dict(self._errors),
+                "rate_limited": dict(self._limited),
+            }
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_server(config: Optional[FakeConfig] = None, host: str = "127.0.0.1", port: int = 0) -> FakeOpenAIServer:
+    """Pornește serverul într-un thread daemon; port=0 alege un port liber."""
+    server = FakeOpenAIServer((host, port), config or FakeConfig())
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+
+
+def parse_pairs(values: List[str]) -> Dict[str, str]:
+    """["chat=fixed:100", "images=0"] -> {"chat": "fixed:100", "images": "0"}"""
+    out: Dict[str, str] = {}
+    for item in values or []:
+        key, _, value = item.partition("=")
+        out[key.strip()] = value.strip()
+    return out
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", action="append", metavar="ENDPOINT=SPEC",
+                        help="ex. chat=lognormal:450:0.4, embeddings=fixed:80 (ms)")
+    parser.add_argument("--errors", action="append", metavar="ENDPOINT=RATE",
+                        help="rată de erori injectate (429/500/503), ex. chat=0.02")
+    parser.add_argument("--rpm", action="append", metavar="ENDPOINT=RPM",
+                        help="cotă de cereri pe minut (peste ea: 429 cu retry-after-ms), ex. chat=600")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="multiplică toate latențele (ex. 0.1 pentru rulări rapide)")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        latency=parse_pairs(args.latency),
+        errors={k: float(v) for k, v in parse_pairs(args.errors).items()},
+        rpm={k: float(v) for k, v in parse_pairs(args.rpm).items()},
+        time_scale=args.time_scale,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server local care imită API-ul OpenAI.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    server = FakeOpenAIServer((args.host, args.port), config_from_args(args))
+    print(f"Fake OpenAI pe {server.base_url} (OPENAI_BASE_URL={server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
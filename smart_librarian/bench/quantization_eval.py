@@ -0,0 +1,174 @@
+# Re-encodarea indexului (dimensiuni reduse, float16/int8/binary): recall@k și latență vs float32 complet
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.run_bench import percentile
+from bench.context_eval import LABELS_PATH, read_labels, print_table
+
+_VECTOR_FILES = ("embeddings.npy", "scales.npy")
+
+
+def parse_variants(spec: str) -> List[Tuple[str, str]]:
+    """„float16,int8,int8:none,binary:float32” -> [(dtype, rerank_dtype)]."""
+    from backend.numpy_index import DTYPES, RERANK_DTYPES, RERANK_DTYPE
+
+    variants = []
+    for item in spec.split(","):
+        dtype, _, rerank = item.strip().partition(":")
+        rerank = rerank or RERANK_DTYPE
+        if dtype not in DTYPES or rerank not in RERANK_DTYPES:
+            raise ValueError(f"variantă necunoscută: {item} (format DTYPE[:RERANK], DTYPE din {', '.join(DTYPES)})")
+        variants.append((dtype, rerank))
+    return variants
+
+
+def _bytes_per_vector(directory: Path, count: int) -> Tuple[float, float]:
+    """(octeți parcurși la fiecare căutare, octeți pe disc) per vector, fără header-ele .npy."""
+    scanned = disk = 0
+    for name in ("embeddings.npy", "scales.npy", "rerank.npy"):
+        path = directory / name
+        if not path.exists():
+            continue
+        size = np.load(path, mmap_mode="r").nbytes
+        disk += size
+        if name in _VECTOR_FILES:
+            scanned += size
+    return scanned / count, disk / count
+
+
+def _run(index, queries: np.ndarray, top_k: int) -> Tuple[List[List[str]], List[float]]:
+    ids, latencies = [], []
+    index.search(queries[:1], top_k)  # încălzire: paginile mmap, cache-urile BLAS
+    for q in queries:
+        started = time.perf_counter()
+        results = index.search(q[None, :], top_k)[0]
+        latencies.append(time.perf_counter() - started)
+        ids.append([r["id"] for r in results])
+    return ids, latencies
+
+
+def evaluate(
+    data: Tuple[List[str], List[str], List[str], np.ndarray, List[Dict[str, Any]]],
+    queries: np.ndarray,
+    variants: List[Tuple[str, str]],
+    dims: List[int],
+    top_k: int,
+    workdir: Path,
+) -> List[Dict[str, Any]]:
+    from backend.numpy_index import NumpyIndex
+
+    ids, titles, summaries, embeddings, metadatas = data
+    native = embeddings.shape[1]
+    n = len(ids)
+
+    def build(name: str, dtype: str, dim: int, rerank: str):
+        directory = workdir / name
+        NumpyIndex.build(str(directory), ids, titles, summaries, embeddings, dtype=dtype, dim=dim,
+                         rerank_dtype=rerank, metadatas=metadatas)
+        return NumpyIndex(str(directory)), directory
+
+    baseline, base_dir = build("baseline", "float32", 0, "none")
+    truth, base_lat = _run(baseline, queries, top_k)
+    base_p50 = percentile(base_lat, 50)
+    base_scan, base_disk = _bytes_per_vector(base_dir, n)
+
+    rows = [{
+        "variant": "float32", "dim": native, f"recall@{top_k}": 1.0,
+        "p50_ms": round(base_p50 * 1000, 3), "p95_ms": round(percentile(base_lat, 95) * 1000, 3),
+        "speedup": 1.0, "scan_bytes": int(base_scan), "disk_bytes": int(base_disk), "disk_ratio": 1.0,
+    }]
+    for dim in dims:
+        dim = dim or native
+        if dim > native:
+            continue
+        for dtype, rerank in variants:
+            if dtype == "float32" and dim == native:
+                continue
+            name = f"{dtype}-{rerank}-{dim}"
+            index, directory = build(name, dtype, 0 if dim == native else dim, rerank)
+            found, lat = _run(index, queries, top_k)
+            recall = np.mean([len(set(a) & set(b)) / max(1, len(b)) for a, b in zip(found, truth)])
+            scan, disk = _bytes_per_vector(directory, n)
+            label = dtype if dtype in ("float32", "float16") else f"{dtype}+{rerank}"
+            rows.append({
+                "variant": label, "dim": dim, f"recall@{top_k}": round(float(recall), 4),
+                "p50_ms": round(percentile(lat, 50) * 1000, 3), "p95_ms": round(percentile(lat, 95) * 1000, 3),
+                "speedup": round(base_p50 / max(percentile(lat, 50), 1e-9), 2),
+                "scan_bytes": int(scan), "disk_bytes": int(disk), "disk_ratio": round(disk / base_disk, 3),
+            })
+    return rows
+
+
+def _queries(embeddings: np.ndarray, sample: int, noise: float, labels: Optional[str], seed: int) -> np.ndarray:
+    """
+    Întrebările de test: vectori de cărți din index (cu zgomot, ca să nu fie identici
+    cu documentul) și, opțional, întrebările etichetate trecute prin modelul de embeddings.
+    """
+    rng = np.random.default_rng(seed)
+    parts = []
+    if sample:
+        rows = rng.choice(len(embeddings), size=min(sample, len(embeddings)), replace=False)
+        q = embeddings[rows]
+        q = q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+        parts.append(q + rng.normal(0.0, noise / np.sqrt(q.shape[1]), q.shape).astype(np.float32))
+    if labels:
+        from backend.rag_retriever import embed_queries
+        parts.append(np.asarray(embed_queries([item["query"] for item in read_labels(labels)]), dtype=np.float32))
+    if not parts:
+        raise ValueError("nicio întrebare de test: --sample 0 și fără --labels")
+    return np.concatenate(parts)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Re-encodează colecția Chroma existentă în variante reduse/cuantizate și compară cu float32 complet."
+    )
+    parser.add_argument("--variants", default="float16,int8,int8:none,binary",
+                        help="DTYPE[:RERANK], DTYPE = float32|float16|int8|binary, RERANK = float32|float16|none")
+    parser.add_argument("--dims", default="0,768,512,256", help="dimensiuni păstrate (0 = cea nativă)")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=500, help="câte cărți din index devin întrebări de test")
+    parser.add_argument("--noise", type=float, default=0.5, help="zgomotul adăugat întrebărilor din index")
+    parser.add_argument("--labels", nargs="?", const=str(LABELS_PATH), default=None,
+                        help="adaugă întrebările etichetate (apel de embeddings)")
+    parser.add_argument("--rescore-factor", type=int, default=None, help="suprascrie NUMPY_INDEX_RESCORE_FACTOR")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="salvează rezultatele ca JSON")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    from backend import numpy_index
+    if args.rescore_factor is not None:
+        numpy_index.RESCORE_FACTOR = args.rescore_factor
+
+    data = numpy_index.read_chroma()
+    queries = _queries(data[3], args.sample, args.noise, args.labels, args.seed)
+    print(f"{len(data[0])} cărți × {data[3].shape[1]} dimensiuni, {len(queries)} întrebări, "
+          f"rescoring top_k × {numpy_index.RESCORE_FACTOR}\n")
+    with tempfile.TemporaryDirectory(prefix="quantization_eval_") as tmp:
+        rows = evaluate(data, queries, parse_variants(args.variants),
+                        [int(d) for d in args.dims.split(",")], args.top_k, Path(tmp))
+    print_table(rows)
+    print("\nscan_bytes = octeți citiți per vector la fiecare căutare (RAM fierbinte); "
+          "disk_bytes include copia pentru rescoring")
+    print("Varianta aleasă: python -m backend.numpy_index --dtype DTYPE --dim DIM [--rerank-dtype R]")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
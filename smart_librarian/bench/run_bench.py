@@ -0,0 +1,371 @@
+# Benchmark end-to-end: latență p50/p95/p99 pe etape, contra serverului fake OpenAI
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import platform
+import subprocess
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.fake_openai import add_server_arguments, config_from_args, start_server  # noqa: E402
+
+RESULTS_DIR = ROOT / "bench" / "results"
+BASELINE_PATH = ROOT / "bench" / "baseline.json"
+SCENARIOS = ("moderate", "search", "recommend", "cli", "streamlit")
+
+# Întrebările din README, folosite pe rând
+QUERIES = [
+    "Vreau o carte despre libertate și control social",
+    "Ce recomanzi pentru cineva care iubește povești de război?",
+    "Ce este 1984?",
+    "Recomandă-mi o carte despre prietenie și magie",
+    "O carte clasică de dragoste",
+    "Ce îmi recomanzi dacă iubesc poveștile fantastice?",
+]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Percentilă cu interpolare liniară între rangurile vecine."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * p / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def summarize(samples: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """Secunde -> milisecunde, pe fiecare etapă."""
+    out = {}
+    for stage, values in samples.items():
+        ms = [v * 1000.0 for v in values]
+        out[stage] = {
+            "n": len(ms),
+            "p50": round(percentile(ms, 50), 2),
+            "p95": round(percentile(ms, 95), 2),
+            "p99": round(percentile(ms, 99), 2),
+            "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+            "max": round(max(ms), 2) if ms else 0.0,
+        }
+    return out
+
+
+class StageTimer:
+    """Durata fiecărei etape dintr-o singură cerere (plus "total")."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = time.perf_counter() - t0
+
+    def mark(self, name: str) -> None:
+        """Timpul scurs de la începutul cererii (ex. primul token)."""
+        self.stages[name] = time.perf_counter() - self.started
+
+    def finish(self) -> Dict[str, float]:
+        self.stages["total"] = time.perf_counter() - self.started
+        return self.stages
+
+
+# --- scenarii: fiecare primește întrebarea și un StageTimer ---
+
+def _scenario_moderate(query: str, timer: StageTimer, tmp: Path) -> None:
+    from backend.filters import moderate_text
+    with timer.stage("moderation"):
+        moderate_text(query)
+
+
+def _scenario_search(query: str, timer: StageTimer, tmp: Path) -> None:
+    from backend.rag_retriever import search_books
+    with timer.stage("search"):
+        search_books(query)
+
+
+def _scenario_recommend(query: str, timer: StageTimer, tmp: Path) -> None:
+    from backend.openai_chat import recommend_with_summary
+    with timer.stage("recommend"):
+        recommend_with_summary(query, bypass_cache=True)
+
+
+def _streamed_answer(query: str, timer: StageTimer) -> Optional[Dict[str, Any]]:
+    """Fluxul comun CLI/Streamlit: moderare + recomandare, cu primul token marcat."""
+    from backend.pipeline import moderated_recommend, stream_moderated_recommend, STREAMING
+
+    if not STREAMING:
+        with timer.stage("pipeline"):
+            blocked, _msg, out = moderated_recommend(query)
+        return None if blocked else out
+    out = None
+    with timer.stage("pipeline"):
+        for event in stream_moderated_recommend(query):
+            if event["type"] == "delta" and "first_token" not in timer.stages:
+                timer.mark("first_token")
+            elif event["type"] == "done":
+                out = event["result"]
+    return out
+
+
+def _scenario_cli(query: str, timer: StageTimer, tmp: Path) -> None:
+    from extras.text_to_speech import synthesize_to_mp3_streaming
+    out = _streamed_answer(query, timer)
+    if out is None:
+        return
+    with timer.stage("tts"):
+        synthesize_to_mp3_streaming(out["answer"], str(tmp / f"cli_{time.perf_counter_ns()}.mp3"))
+
+
+def _scenario_streamlit(query: str, timer: StageTimer, tmp: Path) -> None:
+    from extras.text_to_speech import synthesize_to_mp3
+    from extras.image_gen import generate_book_image
+    out = _streamed_answer(query, timer)
+    if out is None:
+        return
+    tag = time.perf_counter_ns()
+
+    def timed(name: str, fn: Callable, *args) -> None:
+        with timer.stage(name):
+            fn(*args)
+
+    # ca în frontend/streamlit_app.py: imagine + audio în paralel
+    with timer.stage("post"), ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(timed, "tts", synthesize_to_mp3, out["answer"], str(tmp / f"st_{tag}.mp3"))]
+        if out.get("recommended_title"):
+            futures.append(pool.submit(
+                timed, "image", generate_book_image, out["recommended_title"],
+                "watercolor poster", None, str(tmp / f"st_{tag}.png"),
+            ))
+        for f in futures:
+            f.result()
+
+
+_RUNNERS = {
+    "moderate": _scenario_moderate,
+    "search": _scenario_search,
+    "recommend": _scenario_recommend,
+    "cli": _scenario_cli,
+    "streamlit": _scenario_streamlit,
+}
+
+
+def _server_stats(base_url: str) -> Dict[str, Any]:
+    try:
+        with urllib.request.urlopen(base_url.rstrip("/") + "/stats", timeout=5) as resp:
+            return json.loads(resp.read())
+    except OSError:
+        return {}
+
+
+def _diff_counts(after: Dict[str, int], before: Dict[str, int]) -> Dict[str, int]:
+    return {k: v - before.get(k, 0) for k, v in after.items() if v - before.get(k, 0)}
+
+
+def run_scenario(
+    name: str,
+    concurrency: int,
+    requests: int,
+    base_url: str,
+    tmp: Path,
+    unique_queries: bool = True,
+) -> Dict[str, Any]:
+    runner = _RUNNERS[name]
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: List[str] = []
+
+    def one(i: int) -> None:
+        query = QUERIES[i % len(QUERIES)]
+        if unique_queries:
+            # altă întrebare la fiecare cerere: cache-urile nu ascund latența reală
+            query = f"{query} (c{concurrency}, cererea {i})"
+        timer = StageTimer()
+        try:
+            runner(query, timer, tmp)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            return
+        for stage, seconds in timer.finish().items():
+            samples[stage].append(seconds)
+
+    before = _server_stats(base_url).get("requests", {})
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    after = _server_stats(base_url).get("requests", {})
+
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "api_calls": _diff_counts(after, before),
+        "stages": summarize(samples),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regresiile (p50/p95/p99 mai mari cu peste `tolerance`) față de baseline."""
+    regressions = []
+    for key, run in current["runs"].items():
+        old_run = baseline.get("runs", {}).get(key)
+        if not old_run:
+            continue
+        for stage, stats in run["stages"].items():
+            old = old_run["stages"].get(stage)
+            if not old:
+                continue
+            for p in ("p50", "p95", "p99"):
+                if old[p] > 0 and (stats[p] - old[p]) / old[p] > tolerance:
+                    regressions.append(
+                        f"{key} {stage} {p}: {old[p]:.1f} -> {stats[p]:.1f} ms "
+                        f"(+{100 * (stats[p] - old[p]) / old[p]:.0f}%)"
+                    )
+    return regressions
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\n{'scenariu':<10} {'conc':>4} {'etapă':<12} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    for run in result["runs"].values():
+        for stage, s in run["stages"].items():
+            print(f"{run['scenario']:<10} {run['concurrency']:>4} {stage:<12} {s['n']:>5} "
+                  f"{s['p50']:>9.1f} {s['p95']:>9.1f} {s['p99']:>9.1f}")
+        print(f"{'':<10} {'':>4} -> {run['throughput_rps']} cereri/s, {run['errors']} erori, "
+              f"apeluri API: {run['api_calls']}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _prepare_environment(base_url: str, tmp: Path, warm_cache: bool) -> None:
+    """Setat înainte de primul import din backend/extras (config-ul se citește la import)."""
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "sk-bench"
+    os.environ["CHROMA_PATH"] = str(tmp / "chroma_db")
+    os.environ["EMBED_CACHE_PATH"] = str(tmp / "query_embeddings.sqlite")
+    os.environ["ARTIFACT_CACHE_DIR"] = str(tmp / "artifacts")
+    # serverul fake nu are cote (decât cu --rpm), iar timpii lui sunt scalați de --time-scale:
+    # cu planificatorul pornit s-ar măsura așteptarea în cozi, nu pipeline-ul
+    os.environ.setdefault("SCHEDULER", "false")
+    if not warm_cache:
+        os.environ["EMBED_CACHE_DISK"] = "false"
+        os.environ["MODERATION_CACHE_SIZE"] = "0"
+        os.environ["ARTIFACT_CACHE"] = "false"
+        os.environ["ANSWER_CACHE"] = "false"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Smart Librarian contra unui server fake OpenAI.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"din: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,4,16", help="niveluri de concurență, ex. 1,4,16")
+    parser.add_argument("--requests", type=int, default=30, help="cereri per scenariu și nivel")
+    parser.add_argument("--server-url", default=None,
+                        help="folosește un server deja pornit (python -m bench.fake_openai) în loc de unul intern")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="păstrează cache-urile și repetă aceleași întrebări")
+    parser.add_argument("--out", default=str(RESULTS_DIR / "latest.json"))
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true", help="scrie rezultatele și ca baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="regresie = creștere peste acest procent")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"scenarii necunoscute: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    server = None
+    config = config_from_args(args)
+    if args.server_url:
+        base_url = args.server_url
+    else:
+        server = start_server(config)
+        base_url = server.base_url
+
+    os.chdir(ROOT)  # căile din data/ sunt relative la rădăcina proiectului
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp_dir:
+        tmp = Path(tmp_dir)
+        _prepare_environment(base_url, tmp, args.warm_cache)
+
+        from backend.vector_store import populate_chromadb
+        populate_chromadb()
+
+        result: Dict[str, Any] = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "server": base_url if args.server_url else config.describe(),
+                "requests": args.requests,
+                "warm_cache": args.warm_cache,
+                "env": {k: os.getenv(k) for k in (
+                    "RECOMMEND_MODE", "SEARCH_MODE", "RETRIEVER_BACKEND", "SPECULATIVE_PIPELINE", "STREAM_ANSWERS"
+                )},
+            },
+            "runs": {},
+        }
+        for name in scenarios:
+            # o cerere de încălzire: clienții, colecția și indexurile se creează leneș
+            _RUNNERS[name](QUERIES[0], StageTimer(), tmp)
+            for level in levels:
+                run = run_scenario(name, level, args.requests, base_url, tmp, not args.warm_cache)
+                result["runs"][f"{name}@c{level}"] = run
+                print(f"  {name} @ {level}: {run['throughput_rps']} cereri/s, {run['errors']} erori")
+
+    if server is not None:
+        server.shutdown()
+
+    print_report(result)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\nRezultate: {out}")
+
+    exit_code = 0
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Baseline salvat: {baseline_path}")
+    elif baseline_path.exists():
+        regressions = compare(result, json.loads(baseline_path.read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print(f"\nRegresii față de {baseline_path} (toleranță {args.tolerance:.0%}):")
+            for line in regressions:
+                print("  " + line)
+            exit_code = 1
+        else:
+            print(f"Fără regresii față de {baseline_path}.")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
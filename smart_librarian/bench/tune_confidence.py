@@ -0,0 +1,122 @@
+# Ajustarea pragurilor pentru fast path-ul de încredere (backend/confidence.py)
+import os
+import sys
+import json
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bench.context_eval import LABELS_PATH, read_labels, print_table
+
+
+def measure(labels: List[Dict[str, str]], depth: int = 3) -> List[Dict[str, Any]]:
+    """Pentru fiecare întrebare: distanța primului candidat, marja față de al doilea și dacă e corect."""
+    from backend.rag_retriever import embed_queries, _retrieve
+
+    embeddings = embed_queries([item["query"] for item in labels])
+    points = []
+    for item, results in zip(labels, _retrieve(embeddings, depth)):
+        if not results:
+            continue
+        top = results[0]["score"]
+        margin = results[1]["score"] - top if len(results) > 1 else float("inf")
+        points.append({"top": top, "margin": margin, "correct": results[0]["title"] == item["expected"]})
+    return points
+
+
+def _frange(start: float, stop: float, step: float) -> List[float]:
+    n = int(round((stop - start) / step))
+    return [round(start + i * step, 4) for i in range(n + 1)]
+
+
+def grid(points: List[Dict[str, Any]], distances: List[float], margins: List[float]) -> List[Dict[str, Any]]:
+    """Acoperirea (cât trece pe fast path) și precizia (cât din ce trece e corect) pe fiecare pereche de praguri."""
+    rows = []
+    for max_distance in distances:
+        for min_margin in margins:
+            passed = [p for p in points if p["top"] <= max_distance and p["margin"] >= min_margin]
+            correct = sum(p["correct"] for p in passed)
+            rows.append({
+                "max_distance": max_distance,
+                "min_margin": min_margin,
+                "coverage": round(len(passed) / len(points), 3) if points else 0.0,
+                "precision": round(correct / len(passed), 3) if passed else 1.0,
+                "passed": len(passed),
+                "wrong": len(passed) - correct,
+            })
+    return rows
+
+
+def best(rows: List[Dict[str, Any]], target: float) -> Optional[Dict[str, Any]]:
+    """Acoperirea maximă cu precizie >= target; la egalitate, pragurile cele mai stricte."""
+    ok = [r for r in rows if r["passed"] and r["precision"] >= target]
+    if not ok:
+        return None
+    return max(ok, key=lambda r: (r["coverage"], r["precision"], -r["max_distance"], r["min_margin"]))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Caută pragurile CONFIDENCE_* cu acoperire maximă la o precizie țintă, pe întrebări etichetate."
+    )
+    parser.add_argument("--labels", default=str(LABELS_PATH))
+    parser.add_argument("--target", type=float, default=0.95, help="precizia minimă acceptată pe fast path")
+    parser.add_argument("--distances", default="0.2:1.2:0.05", help="start:stop:pas pentru CONFIDENCE_MAX_DISTANCE")
+    parser.add_argument("--margins", default="0:0.5:0.025", help="start:stop:pas pentru CONFIDENCE_MIN_MARGIN")
+    parser.add_argument("--all", action="store_true", help="afișează toată grila, nu doar frontiera")
+    parser.add_argument("--fake", action="store_true",
+                        help="folosește serverul fake din bench/ (embedding-uri aleatoare: doar pentru probă)")
+    parser.add_argument("--out", default=None, help="salvează grila ca JSON")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    tmp = None
+    if args.fake:
+        from bench.fake_openai import start_server, FakeConfig
+        from bench.run_bench import _prepare_environment
+        server = start_server(FakeConfig(time_scale=0.1))
+        tmp = tempfile.TemporaryDirectory(prefix="tune_confidence_")
+        _prepare_environment(server.base_url, Path(tmp.name), warm_cache=False)
+        from backend.vector_store import populate_chromadb
+        populate_chromadb()
+
+    points = measure(read_labels(args.labels))
+    rows = grid(points,
+                _frange(*(float(x) for x in args.distances.split(":"))),
+                _frange(*(float(x) for x in args.margins.split(":"))))
+    if args.all:
+        print_table(rows)
+    else:
+        # frontiera: pentru fiecare distanță, marja minimă care atinge ținta
+        frontier = []
+        for d in sorted({r["max_distance"] for r in rows}):
+            choice = best([r for r in rows if r["max_distance"] == d], args.target)
+            if choice:
+                frontier.append(choice)
+        print_table(frontier)
+
+    correct = sum(p["correct"] for p in points)
+    print(f"\n{len(points)} întrebări, primul candidat corect la {correct} ({correct / max(1, len(points)):.0%})")
+    choice = best(rows, args.target)
+    if choice is None:
+        print(f"Nicio pereche de praguri nu atinge precizia {args.target:.0%}; lăsați CONFIDENCE_GATE=false.")
+    else:
+        print(f"Acoperire {choice['coverage']:.0%} la precizie {choice['precision']:.0%}:\n")
+        print("CONFIDENCE_GATE=true")
+        print(f"CONFIDENCE_MAX_DISTANCE={choice['max_distance']:g}")
+        print(f"CONFIDENCE_MIN_MARGIN={choice['min_margin']:g}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"points": points, "grid": rows}, f, ensure_ascii=False, indent=2, default=str)
+    if tmp is not None:
+        tmp.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
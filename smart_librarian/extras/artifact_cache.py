@@ -0,0 +1,129 @@
+# Cache adresat prin conținut pentru artefacte (MP3 din TTS, PNG din generare imagini)
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from backend import telemetry
+
+# Config din .env
+ENABLED = os.getenv("ARTIFACT_CACHE", "true").lower() == "true"
+CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", "outputs/cache/artifacts")
+MAX_MB = float(os.getenv("ARTIFACT_CACHE_MAX_MB", "500"))
+
+
+class ArtifactCache:
+    """
+    Fișierele sunt stocate ca <root>/<hash[:2]>/<hash>.<ext>, unde hash-ul
+    acoperă toate intrările care influențează rezultatul (text, voce, model, ...).
+    - scrieri atomice (fișier temporar în același director + os.replace)
+    - buget de disc cu evicție LRU (mtime e actualizat la fiecare hit)
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = int(MAX_MB * 1024 * 1024)):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # calculat leneș la prima scriere
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(kind: str, **inputs: Any) -> str:
+        payload = json.dumps({"kind": kind, **inputs}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, ext: str) -> Path:
+        return self.root / key[:2] / f"{key}.{ext}"
+
+    def get(self, key: str, ext: str) -> Optional[Path]:
+        """Calea artefactului dacă există (și îl marchează ca folosit recent)."""
+        path = self._path(key, ext)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            telemetry.count("cache_requests", cache="artifact", kind=ext, result="miss")
+            return None
+        with self._lock:
+            self.hits += 1
+        telemetry.count("cache_requests", cache="artifact", kind=ext, result="hit")
+        return path
+
+    def get_bytes(self, key: str, ext: str) -> Optional[bytes]:
+        path = self.get(key, ext)
+        return path.read_bytes() if path is not None else None
+
+    def put_bytes(self, key: str, ext: str, data: bytes) -> Path:
+        path = self._path(key, ext)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._account(len(data))
+        return path
+
+    def put_file(self, key: str, ext: str, src: str) -> Path:
+        """Copiază în cache un fișier deja scris (ex. MP3 produs în streaming)."""
+        return self.put_bytes(key, ext, Path(src).read_bytes())
+
+    def materialize(self, cached: Path, out_path: str) -> str:
+        """Copiază artefactul din cache la calea cerută de apelant."""
+        out = Path(out_path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(cached, out)
+        return str(out)
+
+    def _scan(self):
+        files = []
+        for p in self.root.glob("*/*"):
+            if p.suffix == ".tmp":
+                continue
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        return files
+
+    def _account(self, added: int) -> None:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            else:
+                self._size += added
+            if self._size <= self.max_bytes:
+                return
+            # LRU: ștergem cele mai vechi până intrăm în buget
+            for _, size, p in sorted(self._scan()):
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    p.unlink()
+                    self._size -= size
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+default_cache: Optional[ArtifactCache] = ArtifactCache() if ENABLED else None
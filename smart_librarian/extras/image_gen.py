@@ -1,22 +1,14 @@
 # Generare imagine cu AI
-import os, base64
+import os, base64, asyncio
 from pathlib import Path
 from typing import Optional
-from dotenv import load_dotenv
-from openai import OpenAI
+from backend import telemetry
+from backend.clients import get_openai_client, get_async_openai_client
+from extras import artifact_cache
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+IMAGE_MODEL = "gpt-image-1"
 
-# Notă: pentru generare imagine, în SDK v1 se folosește images.generate cu modelul "gpt-image-1".
-# Returnăm calea PNG-ului salvat pe disc.
-def generate_book_image(
-    title: str,
-    style_hint: str = "watercolor poster",
-    extra_prompt: Optional[str] = None,
-    out_path: str = "outputs/images/recommendation.png",
-    size: str = "1024x1024",
-) -> str:
+def _build_prompt(title: str, style_hint: str, extra_prompt: Optional[str]) -> str:
     assert title and title.strip(), "Lipsește titlul pentru generarea imaginii."
     prompt = (
         f"Create a single, tasteful cover-style illustration representing the book '{title}'. "
@@ -24,17 +16,73 @@ def generate_book_image(
     )
     if extra_prompt and extra_prompt.strip():
         prompt += f" Extra details: {extra_prompt.strip()}"
+    return prompt
 
-    result = client.images.generate(
-        model="gpt-image-1",
-        prompt=prompt,
-        size=size
+def _cache_key(title: str, style_hint: str, extra_prompt: Optional[str], size: str) -> str:
+    return artifact_cache.ArtifactCache.key(
+        "image",
+        model=IMAGE_MODEL,
+        title=title.strip(),
+        style_hint=style_hint,
+        extra_prompt=(extra_prompt or "").strip(),
+        size=size,
     )
-    b64 = result.data[0].b64_json
-    img_bytes = base64.b64decode(b64)
 
+def _save_png(b64: str, out_path: str, key: Optional[str] = None) -> str:
+    img_bytes = base64.b64decode(b64)
     out = Path(out_path)
     out.parent.mkdir(parents=True, exist_ok=True)
     with open(out, "wb") as f:
         f.write(img_bytes)
+    if key and artifact_cache.default_cache:
+        artifact_cache.default_cache.put_bytes(key, "png", img_bytes)
     return str(out)
+
+def _cached_image(key: str) -> Optional[Path]:
+    cache = artifact_cache.default_cache
+    return cache.get(key, "png") if cache else None
+
+# Notă: pentru generare imagine, în SDK v1 se folosește images.generate cu modelul "gpt-image-1".
+# Returnăm calea PNG-ului salvat pe disc.
+def generate_book_image(
+    title: str,
+    style_hint: str = "watercolor poster",
+    extra_prompt: Optional[str] = None,
+    out_path: str = "outputs/images/recommendation.png",
+    size: str = "1024x1024",
+) -> str:
+    prompt = _build_prompt(title, style_hint, extra_prompt)
+    key = _cache_key(title, style_hint, extra_prompt, size)
+    hit = _cached_image(key)
+    if hit is not None:
+        return artifact_cache.default_cache.materialize(hit, out_path)
+
+    with telemetry.span("image", model=IMAGE_MODEL, size=size):
+        result = get_openai_client().images.generate(
+            model=IMAGE_MODEL,
+            prompt=prompt,
+            size=size
+        )
+    return _save_png(result.data[0].b64_json, out_path, key)
+
+async def agenerate_book_image(
+    title: str,
+    style_hint: str = "watercolor poster",
+    extra_prompt: Optional[str] = None,
+    out_path: str = "outputs/images/recommendation.png",
+    size: str = "1024x1024",
+) -> str:
+    """Varianta asyncio a generate_book_image (AsyncOpenAI)."""
+    prompt = _build_prompt(title, style_hint, extra_prompt)
+    key = _cache_key(title, style_hint, extra_prompt, size)
+    hit = _cached_image(key)
+    if hit is not None:
+        return await asyncio.to_thread(artifact_cache.default_cache.materialize, hit, out_path)
+
+    with telemetry.span("image", model=IMAGE_MODEL, size=size):
+        result = await get_async_openai_client().images.generate(
+            model=IMAGE_MODEL,
+            prompt=prompt,
+            size=size
+        )
+    return await asyncio.to_thread(_save_png, result.data[0].b64_json, out_path, key)
@@ -1,11 +1,8 @@
 # Speech to text
 import os
 from typing import Optional
-from dotenv import load_dotenv
-from openai import OpenAI
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from backend import telemetry
+from backend.clients import get_openai_client, get_async_openai_client
 
 DEFAULT_STT_MODEL = os.getenv("STT_MODEL", "gpt-4o-mini-transcribe")
 
@@ -17,8 +14,9 @@ def transcribe_audio(file_path: str, model: Optional[str] = None) -> str:
     if not os.path.isfile(file_path):
         raise FileNotFoundError(f"Nu găsesc fișierul audio: {file_path}")
 
-    with open(file_path, "rb") as f:
-        resp = client.audio.transcriptions.create(
+    with open(file_path, "rb") as f, \
+            telemetry.span("stt", model=model, bytes=os.path.getsize(file_path)):
+        resp = get_openai_client().audio.transcriptions.create(
             model=model,
             file=f,               # detectează automat tipul
             # language="ro",     # poți fixa limba; altfel auto-detect
@@ -26,3 +24,19 @@ def transcribe_audio(file_path: str, model: Optional[str] = None) -> str:
         )
     # SDK v1: resp.text conține transcrierea
     return resp.text.strip()
+
+
+async def atranscribe_audio(file_path: str, model: Optional[str] = None) -> str:
+    """Varianta asyncio a transcribe_audio (AsyncOpenAI)."""
+    model = model or DEFAULT_STT_MODEL
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"Nu găsesc fișierul audio: {file_path}")
+
+    with open(file_path, "rb") as f, \
+            telemetry.span("stt", model=model, bytes=os.path.getsize(file_path)):
+        resp = await get_async_openai_client().audio.transcriptions.create(
+            model=model,
+            file=f,
+            response_format="json"
+        )
+    return resp.text.strip()
@@ -1,15 +1,25 @@
 # Text to Speech
 import os
+import re
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
-from dotenv import load_dotenv
-from openai import OpenAI
-
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from typing import Optional, Iterable, Iterator, AsyncIterable, AsyncIterator, Union
+from backend import telemetry
+from backend.clients import get_openai_client, get_async_openai_client
+from extras import artifact_cache
 
 DEFAULT_TTS_MODEL = os.getenv("TTS_MODEL", "gpt-4o-mini-tts")
 DEFAULT_TTS_VOICE = os.getenv("TTS_VOICE", "alloy")
+# streaming: câte fraze se sintetizează în paralel și lungimea minimă a unui fragment
+STREAM_WORKERS = int(os.getenv("TTS_STREAM_WORKERS", "3"))
+STREAM_MIN_CHARS = int(os.getenv("TTS_STREAM_MIN_CHARS", "60"))
+STREAM_CHUNK_BYTES = 4096
+
+# sfârșit de frază: . ! ? … urmat (opțional) de ghilimele/paranteze și spațiu
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'»”)\]]*\s+")
 
 def synthesize_to_mp3(
     text: str,
@@ -24,17 +34,297 @@ def synthesize_to_mp3(
     voice = voice or DEFAULT_TTS_VOICE
     model = model or DEFAULT_TTS_MODEL
 
+    # Același text + voce + model -> același MP3, fără apel de rețea
+    cache = artifact_cache.default_cache
+    key = cache.key("tts", text=text, voice=voice, model=model) if cache else None
+    if cache:
+        hit = cache.get(key, "mp3")
+        if hit is not None:
+            return cache.materialize(hit, out_path)
+
     # Creează folderul de output dacă nu există
     out_file = Path(out_path)
     out_file.parent.mkdir(parents=True, exist_ok=True)
 
     # Non-streaming: scriem direct conținutul în fișier
-    resp = client.audio.speech.create(
-        model=model,
-        voice=voice,
-        input=text
-    )
+    with telemetry.span("tts", model=model, chars=len(text)) as s:
+        resp = get_openai_client().audio.speech.create(
+            model=model,
+            voice=voice,
+            input=text
+        )
+        s.set(bytes=len(resp.content))
     with open(out_file, "wb") as f:
         f.write(resp.content)
+    if cache:
+        cache.put_bytes(key, "mp3", resp.content)
+
+    return str(out_file)
+
+
+async def asynthesize_to_mp3(
+    text: str,
+    out_path: str = "output.mp3",
+    voice: Optional[str] = None,
+    model: Optional[str] = None,
+) -> str:
+    """Varianta asyncio a synthesize_to_mp3 (AsyncOpenAI; scrierea pe disc în thread)."""
+    assert text and text.strip(), "Text gol pentru TTS."
+    voice = voice or DEFAULT_TTS_VOICE
+    model = model or DEFAULT_TTS_MODEL
+
+    cache = artifact_cache.default_cache
+    key = cache.key("tts", text=text, voice=voice, model=model) if cache else None
+    if cache:
+        hit = cache.get(key, "mp3")
+        if hit is not None:
+            return await asyncio.to_thread(cache.materialize, hit, out_path)
+
+    out_file = Path(out_path)
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+
+    with telemetry.span("tts", model=model, chars=len(text)) as s:
+        resp = await get_async_openai_client().audio.speech.create(
+            model=model,
+            voice=voice,
+            input=text
+        )
+        s.set(bytes=len(resp.content))
+    await asyncio.to_thread(out_file.write_bytes, resp.content)
+    if cache:
+        await asyncio.to_thread(cache.put_bytes, key, "mp3", resp.content)
+    return str(out_file)
+
+
+TextSource = Union[str, Iterable[str]]
+
+
+class _SentenceBuffer:
+    """Acumulează fragmente de text și scoate fraze complete imediat ce apar."""
+
+    def __init__(self, min_chars: int):
+        self.min_chars = min_chars
+        self.buf = ""
+        self.pending = ""
+
+    def feed(self, chunk: str) -> Iterator[str]:
+        self.buf += chunk
+        while True:
+            m = _SENTENCE_END.search(self.buf)
+            if not m:
+                return
+            self.pending += self.buf[:m.end()]
+            self.buf = self.buf[m.end():]
+            # frazele foarte scurte sunt lipite de următoarea, ca să nu facem un apel TTS pentru „Da.”
+            if len(self.pending.strip()) >= self.min_chars:
+                yield self.pending.strip()
+                self.pending = ""
+
+    def flush(self) -> Iterator[str]:
+        rest = (self.pending + self.buf).strip()
+        self.buf = self.pending = ""
+        if rest:
+            yield rest
+
+
+def split_sentences(chunks: TextSource, min_chars: int = STREAM_MIN_CHARS) -> Iterator[str]:
+    """
+    Primește text (sau fragmente care sosesc treptat, ex. delta-uri LLM) și emite
+    fraze complete imediat ce apar.
+    """
+    if isinstance(chunks, str):
+        chunks = [chunks]
+    sentences = _SentenceBuffer(min_chars)
+    for chunk in chunks:
+        yield from sentences.feed(chunk)
+    yield from sentences.flush()
+
+
+def _speech_worker(text: str, voice: str, model: str, out: "queue.Queue", stop: threading.Event) -> None:
+    """Sintetizează un fragment și pune bucățile de MP3 în coada lui, pe măsură ce sosesc."""
+    try:
+        with telemetry.span("tts.sentence", model=model, chars=len(text)) as s, \
+                get_openai_client().audio.speech.with_streaming_response.create(
+                    model=model,
+                    voice=voice,
+                    input=text,
+                    response_format="mp3",
+                ) as resp:
+            sent = 0
+            for data in resp.iter_bytes(STREAM_CHUNK_BYTES):
+                if stop.is_set():
+                    break
+                sent += len(data)
+                out.put(data)
+            s.set(bytes=sent)
+    except Exception as e:
+        out.put(e)
+    finally:
+        out.put(None)
 
+
+def stream_speech(
+    text: TextSource,
+    voice: Optional[str] = None,
+    model: Optional[str] = None,
+    max_workers: int = STREAM_WORKERS,
+) -> Iterator[bytes]:
+    """
+    Generator de bytes MP3 pentru redare/scriere progresivă.
+    Textul e împărțit în fraze pe măsură ce sosește; până la `max_workers` fraze
+    se sintetizează în paralel, dar bytes-ii sunt emiși strict în ordinea frazelor,
+    iar prima frază e transmisă în timp ce încă se sintetizează.
+    """
+    voice = voice or DEFAULT_TTS_VOICE
+    model = model or DEFAULT_TTS_MODEL
+    stop = threading.Event()
+    inflight: "queue.Queue[queue.Queue]" = queue.Queue()
+    slots = threading.Semaphore(max_workers)
+
+    def schedule(pool: ThreadPoolExecutor) -> None:
+        # ține cel mult max_workers fraze „în zbor” înaintea consumatorului
+        try:
+            for sentence in split_sentences(text):
+                slots.acquire()
+                if stop.is_set():
+                    return
+                out: "queue.Queue" = queue.Queue()
+                inflight.put(out)
+                pool.submit(telemetry.propagate(_speech_worker), sentence, voice, model, out, stop)
+        except Exception as e:
+            failed: "queue.Queue" = queue.Queue()
+            failed.put(e)
+            inflight.put(failed)
+        finally:
+            inflight.put(None)
+
+    with ThreadPoolExecutor(max_workers=max_workers + 1, thread_name_prefix="tts") as pool:
+        pool.submit(telemetry.propagate(schedule), pool)
+        try:
+            while True:
+                out = inflight.get()
+                if out is None:
+                    break
+                while True:
+                    data = out.get()
+                    if data is None:
+                        break
+                    if isinstance(data, Exception):
+                        raise data
+                    yield data
+                slots.release()
+        finally:
+            stop.set()
+            slots.release()
+
+
+def synthesize_to_mp3_streaming(
+    text: TextSource,
+    out_path: str = "output.mp3",
+    voice: Optional[str] = None,
+    model: Optional[str] = None,
+) -> str:
+    """Ca synthesize_to_mp3, dar scrie pe disc fiecare bucată imediat ce e produsă."""
+    voice = voice or DEFAULT_TTS_VOICE
+    model = model or DEFAULT_TTS_MODEL
+    # doar textul complet are o cheie stabilă; fragmentele care sosesc treptat nu se cache-uiesc
+    cache = artifact_cache.default_cache if isinstance(text, str) else None
+    key = cache.key("tts_stream", text=text, voice=voice, model=model) if cache else None
+    if cache:
+        hit = cache.get(key, "mp3")
+        if hit is not None:
+            return cache.materialize(hit, out_path)
+
+    out_file = Path(out_path)
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_file, "wb") as f:
+        for data in stream_speech(text, voice=voice, model=model):
+            f.write(data)
+            f.flush()
+    if cache:
+        cache.put_file(key, "mp3", str(out_file))
     return str(out_file)
+
+
+async def _aiter_text(text: Union[TextSource, AsyncIterable[str]]) -> AsyncIterator[str]:
+    if isinstance(text, str):
+        yield text
+    elif hasattr(text, "__aiter__"):
+        async for chunk in text:
+            yield chunk
+    else:
+        for chunk in text:
+            yield chunk
+
+
+async def _asplit_sentences(text: Union[TextSource, AsyncIterable[str]],
+                            min_chars: int = STREAM_MIN_CHARS) -> AsyncIterator[str]:
+    """Varianta async a split_sentences, alimentată incremental."""
+    sentences = _SentenceBuffer(min_chars)
+    async for chunk in _aiter_text(text):
+        for sentence in sentences.feed(chunk):
+            yield sentence
+    for sentence in sentences.flush():
+        yield sentence
+
+
+async def astream_speech(
+    text: Union[TextSource, AsyncIterable[str]],
+    voice: Optional[str] = None,
+    model: Optional[str] = None,
+    max_workers: int = STREAM_WORKERS,
+) -> AsyncIterator[bytes]:
+    """Iterator async de bytes MP3; aceeași ordonare și paralelism ca stream_speech."""
+    voice = voice or DEFAULT_TTS_VOICE
+    model = model or DEFAULT_TTS_MODEL
+    inflight: "asyncio.Queue[Optional[asyncio.Queue]]" = asyncio.Queue()
+    slots = asyncio.Semaphore(max_workers)
+    tasks = []
+
+    async def worker(sentence: str, out: asyncio.Queue) -> None:
+        try:
+            async with get_async_openai_client().audio.speech.with_streaming_response.create(
+                model=model,
+                voice=voice,
+                input=sentence,
+                response_format="mp3",
+            ) as resp:
+                async for data in resp.iter_bytes(STREAM_CHUNK_BYTES):
+                    await out.put(data)
+        except Exception as e:
+            await out.put(e)
+        finally:
+            await out.put(None)
+
+    async def schedule() -> None:
+        try:
+            async for sentence in _asplit_sentences(text):
+                await slots.acquire()
+                out: asyncio.Queue = asyncio.Queue()
+                await inflight.put(out)
+                tasks.append(asyncio.ensure_future(worker(sentence, out)))
+        except Exception as e:
+            failed: asyncio.Queue = asyncio.Queue()
+            await failed.put(e)
+            await inflight.put(failed)
+        finally:
+            await inflight.put(None)
+
+    scheduler = asyncio.ensure_future(schedule())
+    try:
+        while True:
+            out = await inflight.get()
+            if out is None:
+                break
+            while True:
+                data = await out.get()
+                if data is None:
+                    break
+                if isinstance(data, Exception):
+                    raise data
+                yield data
+            slots.release()
+    finally:
+        scheduler.cancel()
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,33 @@
+# Client HTTP pentru frontend/api_server.py (Streamlit ca thin client)
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+# Config din .env: dacă e setat, Streamlit nu mai rulează pipeline-ul local
+API_URL = os.getenv("API_URL", "").rstrip("/")
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "120"))
+
+_client: Optional[httpx.Client] = None
+
+
+def _http() -> httpx.Client:
+    global _client
+    if _client is None:
+        _client = httpx.Client(base_url=API_URL, timeout=API_TIMEOUT)
+    return _client
+
+
+def moderated_recommend(
+    user_query: str,
+    top_k: int = 3,
+    where: Optional[Dict[str, Any]] = None,
+) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
+    """Același contract ca backend.pipeline.moderated_recommend, dar prin POST /recommend."""
+    body: Dict[str, Any] = {"query": user_query, "top_k": top_k}
+    if where:
+        body["filters"] = where
+    resp = _http().post("/recommend", json=body)
+    resp.raise_for_status()
+    data = resp.json()
+    return data["blocked"], data["message"], data["result"]
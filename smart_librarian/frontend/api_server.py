@@ -0,0 +1,147 @@
+# Serviciu HTTP (JSON): moderare + recomandare, cu coalescing pentru întrebări identice
+import os
+import sys
+import json
+import time
+import threading
+import argparse
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Asigură-te că rădăcina proiectului e în sys.path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+
+from backend import telemetry
+from backend.filters import amoderate_text
+from backend.metadata_filter import FilterError, normalize_where
+from backend.pipeline import amoderated_recommend
+from backend.single_flight import SingleFlight
+from backend.text_norm import normalize_query
+
+# Config din .env
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+# după SIGTERM: cât timp /health răspunde 503 și instanța încă primește cereri, ca load
+# balancer-ul să o scoată din rotație înainte să se închidă socket-ul (secunde)
+DRAIN_DELAY = float(os.getenv("API_DRAIN_DELAY", "5"))
+# cât așteaptă apoi oprirea după cererile în curs, în total (secunde)
+SHUTDOWN_GRACE = float(os.getenv("API_SHUTDOWN_GRACE", "30"))
+MAX_QUERY_CHARS = int(os.getenv("API_MAX_QUERY_CHARS", "2000"))
+
+
+class RecommendRequest(BaseModel):
+    query: str = Field(..., min_length=1, max_length=MAX_QUERY_CHARS)
+    top_k: int = Field(3, ge=1, le=20)
+    # filtru pe metadatele catalogului (sintaxa `where` din Chroma), ex. {"language": "en"}
+    filters: Optional[Dict[str, Any]] = None
+
+
+class ModerateRequest(BaseModel):
+    text: str = Field(..., min_length=1, max_length=MAX_QUERY_CHARS)
+
+
+_recommendations = SingleFlight("recommend")
+# deadline = momentul (time.monotonic) până la care se așteaptă cererile în curs
+_state: Dict[str, Any] = {"draining": False, "deadline": None}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # oprire: calculele deja pornite sunt lăsate să se termine, din ce a rămas din
+    # SHUTDOWN_GRACE după ce uvicorn a așteptat conexiunile deschise
+    _state["draining"] = True
+    deadline = _state["deadline"]
+    grace = SHUTDOWN_GRACE if deadline is None else max(0.0, deadline - time.monotonic())
+    unfinished = await _recommendations.drain(grace)
+    if unfinished:
+        print(f"[api] oprire: {unfinished} recomandări neterminate după {SHUTDOWN_GRACE:g}s")
+
+
+app = FastAPI(title="Smart Librarian API", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health() -> JSONResponse:
+    body = {"status": "draining" if _state["draining"] else "ok", "in_flight": len(_recommendations)}
+    return JSONResponse(body, status_code=503 if _state["draining"] else 200)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    return telemetry.prometheus_text()
+
+
+@app.post("/moderate")
+async def moderate(req: ModerateRequest) -> Dict[str, Any]:
+    blocked, message, _raw = await amoderate_text(req.text)
+    return {"blocked": blocked, "message": message}
+
+
+@app.post("/recommend")
+async def recommend(req: RecommendRequest) -> Dict[str, Any]:
+    """
+    {"query", "top_k", "filters"?} -> {"blocked", "message", "result", "coalesced"}.
+    Întrebările identice după normalizare (majuscule, spații, ș/ş) sosite cât timp
+    prima încă rulează primesc același rezultat, fără un al doilea pipeline.
+    """
+    key = (normalize_query(req.query), req.top_k, json.dumps(req.filters, sort_keys=True, ensure_ascii=False))
+    try:
+        where = normalize_where(req.filters)
+        (blocked, message, result), shared = await _recommendations.do(
+            key, lambda: amoderated_recommend(req.query, top_k=req.top_k, where=where)
+        )
+    except FilterError as e:
+        # validat aici sau respins mai târziu de retriever: tot 422
+        raise HTTPException(status_code=422, detail=f"filters: {e}")
+    return {"blocked": blocked, "message": message, "result": result, "coalesced": shared}
+
+
+def main(argv: Optional[list] = None) -> None:
+    import uvicorn
+
+    class _Server(uvicorn.Server):
+        _drain_timer: Optional[threading.Timer] = None
+
+        def handle_exit(self, sig, frame):
+            # SIGTERM/SIGINT: /health trece imediat pe 503, dar cererile sunt servite în
+            # continuare DRAIN_DELAY secunde; abia apoi uvicorn închide socket-ul și
+            # așteaptă cererile în curs. Un al doilea semnal sare peste pauză.
+            if not _state["draining"] and DRAIN_DELAY > 0:
+                _state["draining"] = True
+                self._drain_timer = threading.Timer(DRAIN_DELAY, self._shutdown, (sig, frame))
+                self._drain_timer.daemon = True
+                self._drain_timer.start()
+                return
+            if self._drain_timer is not None:
+                self._drain_timer.cancel()
+            self._shutdown(sig, frame)
+
+        def _shutdown(self, sig, frame):
+            _state["draining"] = True
+            if _state["deadline"] is None:
+                _state["deadline"] = time.monotonic() + SHUTDOWN_GRACE
+            super().handle_exit(sig, frame)
+
+    parser = argparse.ArgumentParser(description="Smart Librarian ca serviciu HTTP.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args(argv)
+    config = uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        timeout_graceful_shutdown=int(SHUTDOWN_GRACE),
+    )
+    _Server(config).run()
+
+
+if __name__ == "__main__":
+    main()
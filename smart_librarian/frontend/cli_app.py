@@ -7,9 +7,8 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from backend.filters import moderate_text
-from backend.openai_chat import recommend_with_summary
-from extras.text_to_speech import synthesize_to_mp3
+from backend.pipeline import moderated_recommend, stream_moderated_recommend, STREAMING
+from extras.text_to_speech import synthesize_to_mp3_streaming
 from extras.speech_to_text import transcribe_audio
 
 
@@ -35,6 +34,36 @@ def ask_voice() -> str | None:
         return None
 
 
+def print_answer(q: str) -> dict | None:
+    """Rulează fluxul complet și afișează răspunsul la final."""
+    blocked, msg, out = moderated_recommend(q)
+    if blocked:
+        print("\n[Moderation] " + msg)
+        return None
+    print("\n=== Recomandare ===")
+    print(out["answer"])
+    return out
+
+
+def stream_answer(q: str) -> dict | None:
+    """Rulează fluxul complet și afișează răspunsul token cu token."""
+    out = None
+    started = False
+    for event in stream_moderated_recommend(q):
+        if event["type"] == "blocked":
+            print("\n[Moderation] " + event["message"])
+            return None
+        if event["type"] == "delta":
+            if not started:
+                print("\n=== Recomandare ===")
+                started = True
+            print(event["text"], end="", flush=True)
+        elif event["type"] == "done":
+            out = event["result"]
+    print()
+    return out
+
+
 def main():
     print("=== Smart Librarian (CLI) — text / voice ===")
     print("Comenzi: t = text, v = voice din fișier, exit = ieșire")
@@ -57,17 +86,11 @@ def main():
                 print("Opțiune necunoscută. Alege 't' (text) sau 'v' (voice).")
                 continue
 
-            # Moderation (pasul 5)
-            blocked, msg, _raw = moderate_text(q)
-            if blocked:
-                print("\n[Moderation] " + msg)
+            # Moderation (pasul 5) + RAG + GPT + Tool (pasul 3-4), pornite speculativ
+            out = stream_answer(q) if STREAMING else print_answer(q)
+            if out is None:
                 continue
 
-            # RAG + GPT + Tool (pasul 3-4)
-            out = recommend_with_summary(q)
-            print("\n=== Recomandare ===")
-            print(out["answer"])
-
             # TTS (pasul 6)
             want_tts = input("\nGenerezi MP3 pentru acest răspuns? (y/n): ").strip().lower()
             if want_tts == "y":
@@ -75,7 +98,7 @@ def main():
                 out_dir.mkdir(parents=True, exist_ok=True)
                 out_file = out_dir / "recommendation.mp3"
                 try:
-                    path = synthesize_to_mp3(out["answer"], str(out_file))
+                    path = synthesize_to_mp3_streaming(out["answer"], str(out_file))
                     print(f"[OK] MP3 salvat la: {path}")
                 except Exception as e:
                     print(f"[TTS] Eroare: {e}")
@@ -1,5 +1,8 @@
 # Interfață Streamlit
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 
 # Asigură-te că rădăcina proiectului e în sys.path
@@ -8,12 +11,16 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 import streamlit as st
-from backend.filters import moderate_text
-from backend.openai_chat import recommend_with_summary
+from backend.pipeline import moderated_recommend, stream_moderated_recommend, STREAMING
+from frontend import api_client
 from extras.text_to_speech import synthesize_to_mp3
 from extras.speech_to_text import transcribe_audio
 from extras.image_gen import generate_book_image
 
+# Timeout-uri per task pentru post-procesare (secunde)
+IMAGE_TIMEOUT = float(os.getenv("POST_IMAGE_TIMEOUT", "120"))
+AUDIO_TIMEOUT = float(os.getenv("POST_AUDIO_TIMEOUT", "90"))
+
 # Încercăm să importăm componenta de microfon din browser
 try:
     from streamlit_mic_recorder import mic_recorder
@@ -21,6 +28,37 @@ try:
 except Exception:
     MIC_AVAILABLE = False
 
+@st.cache_resource
+def _post_pool() -> ThreadPoolExecutor:
+    """Pool comun (pe proces) pentru imagine + TTS; supraviețuiește re-rulărilor scriptului."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="post")
+
+
+def _iter_post_results(tasks):
+    """
+    Emite (nume, rezultat, eroare) pe măsură ce task-urile se termină.
+    Un task care depășește timeout-ul propriu e raportat ca eroare, fără să-l afecteze pe celălalt.
+    """
+    started = time.monotonic()
+    pending = set(tasks)
+    while pending:
+        now = time.monotonic() - started
+        expired = [f for f in pending if now >= tasks[f][1]]
+        for fut in expired:
+            pending.discard(fut)
+            fut.cancel()
+            yield tasks[fut][0], None, f"timeout după {tasks[fut][1]:g}s"
+        if not pending:
+            break
+        next_deadline = min(tasks[f][1] for f in pending) - now
+        done, pending = wait(pending, timeout=max(0.0, next_deadline), return_when=FIRST_COMPLETED)
+        for fut in done:
+            try:
+                yield tasks[fut][0], fut.result(), None
+            except Exception as e:
+                yield tasks[fut][0], None, e
+
+
 st.set_page_config(page_title="Smart Librarian", page_icon="📚", layout="centered")
 st.title("📚 Smart Librarian (RAG + GPT + Tool + TTS + STT + Image)")
 
@@ -154,63 +192,104 @@ if submitted and st.session_state.get("user_query_input", "").strip():
     # Reset afișări anterioare per-rundă
     st.session_state["last_image_path"] = None
 
-    # Moderation (pasul 5)
-    blocked, msg, _raw = moderate_text(st.session_state["user_query_input"])
-    if blocked:
-        st.warning(msg)
+    # Moderation (pasul 5) + recomandare, pornite speculativ; nimic nu se afișează dacă e blocată
+    out = None
+    if api_client.API_URL:
+        # thin client: pipeline-ul rulează în serviciul HTTP (frontend/api_server.py)
+        with st.spinner("Caut în bibliotecă și pregătesc rezumatul..."):
+            blocked, msg, out = api_client.moderated_recommend(st.session_state["user_query_input"])
+        if blocked:
+            st.warning(msg)
+        else:
+            st.subheader("Recomandare + Rezumat complet")
+            st.write(out["answer"])
+    elif STREAMING:
+        # răspunsul apare token cu token într-un placeholder
+        answer_box = None
+        streamed = ""
+        for event in stream_moderated_recommend(st.session_state["user_query_input"]):
+            if event["type"] == "blocked":
+                st.warning(event["message"])
+                break
+            if answer_box is None:
+                st.subheader("Recomandare + Rezumat complet")
+                answer_box = st.empty()
+            if event["type"] == "delta":
+                streamed += event["text"]
+                answer_box.markdown(streamed + "▌")
+            elif event["type"] == "done":
+                out = event["result"]
+                answer_box.markdown(out["answer"])
     else:
         with st.spinner("Caut în bibliotecă și pregătesc rezumatul..."):
-            out = recommend_with_summary(st.session_state["user_query_input"])
+            blocked, msg, out = moderated_recommend(st.session_state["user_query_input"])
+        if blocked:
+            st.warning(msg)
+        else:
+            st.subheader("Recomandare + Rezumat complet")
+            st.write(out["answer"])
+
+    if out is not None:
+        # === Post-procesare: imagine + audio pornite în paralel; textul e deja afișat ===
+        # ordinea pe pagină rămâne: imagine, candidați, audio — sloturile se umplu când termină fiecare
+        image_slot = st.empty() if OPT_GEN_IMAGE else None
+
+        # === Candidați RAG ===
+        with st.expander("Candidați RAG"):
+            for b in out["candidates"]:
+                st.markdown(f"**{b['title']}**  \n{b['summary']}")
+
+        audio_slot = st.empty() if OPT_GEN_AUDIO else None
 
-        st.subheader("Recomandare + Rezumat complet")
-        st.write(out["answer"])
+        pool = _post_pool()
+        tasks = {}  # future -> (nume, timeout)
 
         # === Imagine — respectă checkbox-ul curent (default True) ===
-        img_path = None
         if OPT_GEN_IMAGE:
             rec_title = out.get("recommended_title") or (out["candidates"][0]["title"] if out.get("candidates") else None)
             if not rec_title:
-                st.info("Nu am reușit să identific titlul recomandat.")
+                image_slot.info("Nu am reușit să identific titlul recomandat.")
             else:
-                with st.spinner(f"Generez o imagine pentru „{rec_title}”..."):
-                    try:
-                        img_dir = ROOT / "outputs" / "images"
-                        img_dir.mkdir(parents=True, exist_ok=True)
-                        img_path = generate_book_image(
-                            title=rec_title,
-                            style_hint=OPT_IMG_STYLE,
-                            extra_prompt=OPT_IMG_EXTRA,
-                            out_path=str(img_dir / "recommendation.png"),
-                            size="1024x1024"
-                        )
-                        st.session_state["last_image_path"] = img_path
-                        st.success("Imagine generată.")
-                    except Exception as e:
-                        st.error(f"Eroare la generarea imaginii: {e}")
-
-        if img_path or st.session_state.get("last_image_path"):
-            show_path = img_path or st.session_state.get("last_image_path")
-            st.image(str(show_path), caption="Imagine generată", use_container_width=True)
-            with open(show_path, "rb") as f:
-                st.download_button("Descarcă imaginea", data=f.read(), file_name="recommendation.png", mime="image/png")
-
-        # === Candidați RAG ===
-        with st.expander("Candidați RAG"):
-            for b in out["candidates"]:
-                st.markdown(f"**{b['title']}**  \n{b['summary']}")
+                img_dir = ROOT / "outputs" / "images"
+                img_dir.mkdir(parents=True, exist_ok=True)
+                fut = pool.submit(
+                    generate_book_image,
+                    title=rec_title,
+                    style_hint=OPT_IMG_STYLE,
+                    extra_prompt=OPT_IMG_EXTRA,
+                    out_path=str(img_dir / "recommendation.png"),
+                    size="1024x1024"
+                )
+                tasks[fut] = ("image", IMAGE_TIMEOUT)
+                image_slot.info(f"Generez o imagine pentru „{rec_title}”...")
 
         # === Audio — respectă checkbox-ul curent (default True) ===
         if OPT_GEN_AUDIO:
-            try:
-                audio_dir = ROOT / "outputs" / "audio"
-                audio_dir.mkdir(parents=True, exist_ok=True)
-                audio_path = audio_dir / "recommendation.mp3"
-                path_str = synthesize_to_mp3(out["answer"], str(audio_path), voice=OPT_VOICE)
+            audio_dir = ROOT / "outputs" / "audio"
+            audio_dir.mkdir(parents=True, exist_ok=True)
+            fut = pool.submit(synthesize_to_mp3, out["answer"], str(audio_dir / "recommendation.mp3"), voice=OPT_VOICE)
+            tasks[fut] = ("audio", AUDIO_TIMEOUT)
+            audio_slot.info("Generez audio-ul...")
 
-                st.success("Am generat audio-ul.")
-                with open(path_str, "rb") as f:
+        # fiecare task își afișează rezultatul (sau eroarea/timeout-ul) independent de celălalt
+        for name, result, error in _iter_post_results(tasks):
+            if name == "image":
+                if error:
+                    image_slot.error(f"Eroare la generarea imaginii: {error}")
+                    continue
+                st.session_state["last_image_path"] = result
+                with image_slot.container():
+                    st.success("Imagine generată.")
+                    st.image(str(result), caption="Imagine generată", use_container_width=True)
+                    with open(result, "rb") as f:
+                        st.download_button("Descarcă imaginea", data=f.read(), file_name="recommendation.png", mime="image/png")
+            else:
+                if error:
+                    audio_slot.error(f"Eroare la TTS: {error}")
+                    continue
+                with open(result, "rb") as f:
                     audio_bytes = f.read()
-                st.audio(audio_bytes, format="audio/mp3")
-                st.download_button("Descarcă MP3", data=audio_bytes, file_name="recommendation.mp3")
-            except Exception as e:
-                st.error(f"Eroare la TTS: {e}")
+                with audio_slot.container():
+                    st.success("Am generat audio-ul.")
+                    st.audio(audio_bytes, format="audio/mp3")
+                    st.download_button("Descarcă MP3", data=audio_bytes, file_name="recommendation.mp3")
@@ -0,0 +1,202 @@
+# Catalog de rezumate complete, citit leneș dintr-un fișier JSONL (index de offset-uri)
+import os
+import re
+import json
+import bisect
+import threading
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend import telemetry
+from backend.text_norm import fold
+
+# Config din .env
+CATALOG_PATH = os.getenv("CATALOG_PATH", "data/book_full_summaries.jsonl")
+# scorul Dice minim pe trigrame pentru potrivirea aproximativă a titlului
+FUZZY_THRESHOLD = float(os.getenv("TITLE_FUZZY_THRESHOLD", "0.6"))
+
+_NON_WORD = re.compile(r"[\W_]+")
+_ARTICLES = ("the", "a", "an")
+
+
+def normalize_title(title: str) -> str:
+    """
+    Cheia unui titlu: fără diacritice, fără punctuație, lowercase, fără articolul
+    inițial („The Hobbit” == „hobbit” == „the  hobbit!”).
+    """
+    words = _NON_WORD.sub(" ", fold(title)).split()
+    if len(words) > 1 and words[0] in _ARTICLES:
+        words = words[1:]
+    return " ".join(words)
+
+
+def _trigrams(key: str) -> List[str]:
+    padded = f"  {key} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class CatalogStore:
+    """
+    Ține în memorie doar titlurile și poziția fiecărei linii în fișier; rezumatul
+    e citit de pe disc (seek + readline) abia când e cerut. Rezolvarea unui titlu:
+      1) cheie normalizată (dict, O(len(titlu)))
+      2) prefix unic al unui titlu (bisect pe cheile sortate)
+      3) trigrame (index inversat construit la primul miss), scor Dice >= FUZZY_THRESHOLD
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._titles: List[str] = []
+        self._offsets = array("q")
+        self._by_key: Dict[str, int] = {}
+        self._sorted_keys: List[str] = []
+        self._trigram_index: Optional[Dict[str, array]] = None
+        self._gram_counts = array("I")
+
+    def _load(self) -> None:
+        """Scanează fișierul o singură dată (și din nou doar dacă s-a modificat)."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime and (self._titles or mtime is None):
+            return
+        with self._lock:
+            if mtime == self._mtime and (self._titles or mtime is None):
+                return
+            titles: List[str] = []
+            keys: List[str] = []
+            offsets = array("q")
+            if mtime is not None:
+                titles, keys, offsets = self._read_sidecar(mtime) or self._scan(mtime)
+            by_key: Dict[str, int] = {}
+            for row, key in enumerate(keys):
+                # la titluri duplicate, prima apariție câștigă
+                by_key.setdefault(key, row)
+            self._titles, self._offsets, self._by_key = titles, offsets, by_key
+            self._sorted_keys = sorted(by_key)
+            self._trigram_index = None
+            self._mtime = mtime
+
+    def _sidecar_path(self) -> str:
+        return self.path + ".idx.json"
+
+    def _read_sidecar(self, mtime: float):
+        """Indexul titlu -> offset salvat la scanarea anterioară, dacă e încă valid."""
+        try:
+            with open(self._sidecar_path(), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("mtime") != mtime or data.get("size") != os.path.getsize(self.path):
+            return None
+        return data["titles"], data["keys"], array("q", data["offsets"])
+
+    def _scan(self, mtime: float):
+        """O trecere prin fișier: doar titlurile, cheile și offset-urile rămân în memorie."""
+        titles: List[str] = []
+        offsets = array("q")
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    titles.append(json.loads(line)["title"])
+                    offsets.append(offset)
+                offset += len(line)
+        keys = [normalize_title(t) for t in titles]
+        sidecar = self._sidecar_path()
+        try:
+            tmp = sidecar + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({
+                    "mtime": mtime,
+                    "size": os.path.getsize(self.path),
+                    "titles": titles,
+                    "keys": keys,
+                    "offsets": offsets.tolist(),
+                }, f, ensure_ascii=False)
+            os.replace(tmp, sidecar)
+        except OSError:
+            pass  # fără drept de scriere: data viitoare scanăm din nou
+        return titles, keys, offsets
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._titles)
+
+    def _fuzzy_index(self) -> Dict[str, array]:
+        if self._trigram_index is None:
+            with self._lock:
+                if self._trigram_index is None:
+                    index: Dict[str, array] = defaultdict(lambda: array("I"))
+                    counts = array("I", bytes(4 * len(self._titles)))
+                    for key, row in self._by_key.items():
+                        grams = _trigrams(key)
+                        counts[row] = len(grams)
+                        for gram in grams:
+                            index[gram].append(row)
+                    self._gram_counts = counts
+                    self._trigram_index = dict(index)
+        return self._trigram_index
+
+    def _resolve_row(self, title: str) -> Optional[int]:
+        row, method = self._match_row(title)
+        telemetry.count("title_resolve", method=method)
+        return row
+
+    def _match_row(self, title: str) -> Tuple[Optional[int], str]:
+        """(rândul, metoda: exact / prefix / fuzzy / miss)."""
+        self._load()
+        key = normalize_title(title or "")
+        if not key:
+            return None, "miss"
+        row = self._by_key.get(key)
+        if row is not None:
+            return row, "exact"
+
+        # prefix: „lord of the rings” -> „lord of the rings the fellowship of the ring”
+        i = bisect.bisect_left(self._sorted_keys, key)
+        matches = []
+        while i < len(self._sorted_keys) and self._sorted_keys[i].startswith(key) and len(matches) < 2:
+            matches.append(self._sorted_keys[i])
+            i += 1
+        if len(matches) == 1:
+            return self._by_key[matches[0]], "prefix"
+
+        # trigrame: greșeli de tastare, „&” vs „and”, cuvinte lipsă
+        grams = _trigrams(key)
+        index = self._fuzzy_index()
+        postings = [np.frombuffer(index[g], dtype=np.uint32) for g in grams if g in index]
+        if not postings:
+            return None, "miss"
+        shared = np.bincount(np.concatenate(postings), minlength=len(self._titles))
+        scores = 2.0 * shared / (len(grams) + np.frombuffer(self._gram_counts, dtype=np.uint32))
+        best = int(np.argmax(scores))
+        if scores[best] < FUZZY_THRESHOLD:
+            return None, "miss"
+        return best, "fuzzy"
+
+    def resolve_title(self, title: str) -> Optional[str]:
+        """Titlul canonic din catalog pentru un titlu aproximativ, sau None."""
+        row = self._resolve_row(title)
+        return self._titles[row] if row is not None else None
+
+    def get_summary(self, title: str) -> Optional[str]:
+        row = self._resolve_row(title)
+        if row is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[row])
+            return json.loads(f.readline())["summary"]
+
+
+default_store = CatalogStore()
+
+
+def resolve_title(title: str) -> Optional[str]:
+    return default_store.resolve_title(title)